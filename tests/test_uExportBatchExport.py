@@ -0,0 +1,78 @@
+'''
+uExportBatch.batchExport reports with a stub scene worker instead of mayapy, plain python:
+python -m unittest discover -s tests
+'''
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uExportBatch
+
+#'scene --scene path flags...', scenes with 'bad' in the name crash without a result
+STUB_SCENE_WORKER = '''
+import sys, json
+scene = sys.argv[sys.argv.index('--scene') + 1]
+if 'bad' in scene:
+    print 'crashed'
+    sys.exit(1)
+print %r + json.dumps({'scene':scene, 'ok':True, 'open':0.0, 'elapsed':0.0, 'flags':sys.argv[4:],
+                       'nodes':[{'node':'uExport', 'status':'exported', 'outputs':[], 'elapsed':0.0}]})
+''' % uExportBatch.RESULT_PREFIX
+
+
+class TestBatchExport(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.stub = os.path.join(self.folder, 'stubWorker.py')
+        with open(self.stub, 'w') as f:
+            f.write(STUB_SCENE_WORKER)
+        self.scenes = [os.path.join(self.folder, name + '.ma') for name in ('hero', 'bad', 'villain')]
+        self.report = os.path.join(self.folder, 'report.json')
+        self.oldWorker = os.environ.get('UEXPORT_WORKER')
+
+    def tearDown(self):
+        if self.oldWorker is None:
+            os.environ.pop('UEXPORT_WORKER', None)
+        else:
+            os.environ['UEXPORT_WORKER'] = self.oldWorker
+        shutil.rmtree(self.folder)
+
+    def batch(self, worker, **kwargs):
+        os.environ['UEXPORT_WORKER'] = worker
+        return uExportBatch.batchExport(self.scenes, workers=2, report=self.report, log=lambda jobId, line: None, **kwargs)
+
+    def test_report_per_scene_and_options(self):
+        report = self.batch('"' + sys.executable + '" "' + self.stub + '"', clips=True, incremental=True)
+        self.assertEqual(report['summary']['scenes'], 3)
+        self.assertEqual(report['summary']['scenesFailed'], 1)
+        self.assertEqual(report['summary']['exported'], 2)
+        self.assertEqual(report['options']['clips'], True)
+        self.assertEqual(report['scenes'][0]['flags'], ['--incremental', '--clips'])
+        self.assertEqual(report['scenes'][1]['error'], 'worker died, see log')
+        self.assertEqual(report['scenes'][1]['log'], ['crashed'])
+        with open(self.report) as f:
+            self.assertEqual(json.load(f)['summary'], report['summary'])
+
+    def test_clips_default_off_in_the_report(self):
+        report = self.batch('"' + sys.executable + '" "' + self.stub + '"')
+        self.assertEqual(report['options']['clips'], False)
+        self.assertEqual(report['scenes'][0]['flags'], [])
+
+    def test_worker_that_cannot_start_fails_its_scenes_and_still_writes_the_report(self):
+        report = self.batch(os.path.join(self.folder, 'no_mayapy'))
+        self.assertEqual(report['summary']['scenesFailed'], 3)
+        for sceneReport in report['scenes']:
+            self.assertFalse(sceneReport['ok'])
+            self.assertTrue(sceneReport['error'].startswith('could not start worker: '))
+            self.assertEqual(sceneReport['returncode'], None)
+        self.assertTrue(os.path.isfile(self.report))
+
+
+if __name__ == '__main__':
+    unittest.main()
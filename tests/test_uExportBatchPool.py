@@ -0,0 +1,94 @@
+'''
+uExportBatch.WorkerPool with a stub worker script instead of mayapy, plain python:
+python -m unittest discover -s tests
+'''
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uExportBatch
+
+#args: jobName sleepSeconds returncode [noresult]
+STUB_WORKER = '''
+import sys, time, json
+name, sleep, code = sys.argv[1], float(sys.argv[2]), int(sys.argv[3])
+print 'working on ' + name
+sys.stdout.flush()
+time.sleep(sleep)
+if 'noresult' not in sys.argv:
+    print %r + json.dumps({'ok':code == 0, 'fbx':name + '.fbx', 'started':time.time() - sleep})
+sys.exit(code)
+''' % uExportBatch.RESULT_PREFIX
+
+
+class TestWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.stub = os.path.join(self.folder, 'stubWorker.py')
+        with open(self.stub, 'w') as f:
+            f.write(STUB_WORKER)
+        self.command = [sys.executable, self.stub]
+        self.lines = []
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def log(self, jobId, line):
+        self.lines.append((jobId, line))
+
+    def test_results_and_logs_per_job(self):
+        pool = uExportBatch.WorkerPool(maxWorkers=2, command=self.command, log=self.log)
+        results = pool.run([('LOD1', ['lod1', '0', '0']), ('LOD2', ['lod2', '0', '0'])])
+        self.assertEqual(sorted(results), ['LOD1', 'LOD2'])
+        self.assertEqual(results['LOD1']['returncode'], 0)
+        self.assertEqual(results['LOD1']['result']['fbx'], 'lod1.fbx')
+        self.assertEqual(results['LOD2']['log'], ['working on lod2'])
+        self.assertTrue(('LOD1', 'working on lod1') in self.lines)
+        #the result line is not logged
+        self.assertFalse([line for jobId, line in self.lines if line.startswith(uExportBatch.RESULT_PREFIX)])
+
+    def test_jobs_run_in_parallel_up_to_max_workers(self):
+        pool = uExportBatch.WorkerPool(maxWorkers=2, command=self.command, log=self.log)
+        start = time.time()
+        results = pool.run([(str(i), [str(i), '1', '0']) for i in range(0, 4)])
+        elapsed = time.time() - start
+        self.assertEqual(len(results), 4)
+        #4 one second jobs on 2 workers: two rounds, not four and not one
+        self.assertTrue(elapsed < 3.5, elapsed)
+        starts = sorted([results[jobId]['result']['started'] for jobId in results])
+        self.assertTrue(starts[2] - starts[0] > 0.5)
+
+    def test_crashed_worker_has_no_result(self):
+        pool = uExportBatch.WorkerPool(maxWorkers=2, command=self.command, log=self.log)
+        results = pool.run([('bad', ['bad', '0', '3', 'noresult']), ('good', ['good', '0', '0'])])
+        self.assertEqual(results['bad']['returncode'], 3)
+        self.assertEqual(results['bad']['result'], None)
+        self.assertTrue(results['good']['result']['ok'])
+
+    def test_missing_executable_fails_the_jobs_instead_of_raising(self):
+        pool = uExportBatch.WorkerPool(maxWorkers=2, command=[os.path.join(self.folder, 'no_mayapy')], log=self.log)
+        results = pool.run([('LOD1', ['lod1', '0', '0']), ('LOD2', ['lod2', '0', '0']), ('LOD3', ['lod3', '0', '0'])])
+        self.assertEqual(sorted(results), ['LOD1', 'LOD2', 'LOD3'])
+        for jobId in results:
+            self.assertEqual(results[jobId]['returncode'], None)
+            self.assertEqual(results[jobId]['result'], None)
+            self.assertTrue(results[jobId]['startError'])
+        self.assertEqual(len(self.lines), 3)
+
+    def test_worker_command_from_the_environment(self):
+        os.environ['UEXPORT_WORKER'] = '"' + sys.executable + '" "' + self.stub + '"'
+        try:
+            self.assertEqual(uExportBatch.getWorkerCommand(), self.command)
+        finally:
+            del os.environ['UEXPORT_WORKER']
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+'''
+openForWrite/addFiles round trips against uExportFakes.FakeP4, plain python:
+python -m unittest discover -s tests
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uExportP4
+from uExportFakes import FakeP4
+
+ROOT = '//depot/ArtSource/'
+
+
+class TestOpenForWrite(unittest.TestCase):
+    def setUp(self):
+        self.p4 = FakeP4()
+        self.known = []
+        self.new = []
+        for i in range(0, 10):
+            depotFile = ROOT + 'export/char' + str(i) + '.fbx'
+            if i < 7:
+                self.p4.depotFiles[depotFile] = 'edit'
+                self.known.append(self.p4.clientFile(depotFile))
+            else:
+                self.new.append(self.p4.clientFile(depotFile))
+
+    def test_one_fstat_and_one_edit_for_the_whole_plan(self):
+        opened, toAdd = uExportP4.openForWrite(self.p4, self.known + self.new)
+        self.assertEqual([call[0] for call in self.p4.calls], ['fstat', 'edit'])
+        self.assertEqual(sorted(opened), sorted(self.known))
+        self.assertEqual(sorted(toAdd), sorted(self.new))
+        self.assertEqual(sorted(self.p4.calls[1][1:]), sorted(self.known))
+
+    def test_changelist_is_passed_to_edit(self):
+        uExportP4.openForWrite(self.p4, self.known, changelist=1234)
+        self.assertEqual(self.p4.calls[1][:3], ('edit', '-c', '1234'))
+
+    def openFirst(self, fstat):
+        #fstat reports the first known file as open in this client
+        def run(cmd, *args):
+            results = fstat(cmd, *args)
+            if cmd == 'fstat':
+                for result in results:
+                    if result['clientFile'] == self.known[0]:
+                        result['action'] = 'edit'
+            return results
+        return run
+
+    def test_files_already_open_are_not_edited_again(self):
+        self.p4.run = self.openFirst(self.p4.run)
+        opened, toAdd = uExportP4.openForWrite(self.p4, self.known)
+        self.assertEqual(sorted(opened), sorted(self.known))
+        self.assertTrue(self.known[0] not in self.p4.calls[1])
+
+    def test_deleted_heads_are_added_again(self):
+        self.p4.depotFiles[ROOT + 'export/char0.fbx'] = 'delete'
+        opened, toAdd = uExportP4.openForWrite(self.p4, self.known)
+        self.assertEqual(toAdd, [self.known[0]])
+
+    def test_nothing_to_open_costs_nothing(self):
+        self.assertEqual(uExportP4.openForWrite(self.p4, []), ([], []))
+        opened, toAdd = uExportP4.openForWrite(self.p4, self.new)
+        self.assertEqual([call[0] for call in self.p4.calls], ['fstat'])
+        self.assertEqual(opened, [])
+
+    def test_sort_for_write_keeps_already_open_files_apart(self):
+        self.p4.run = self.openFirst(self.p4.run)
+        toEdit, alreadyOpen, toAdd = uExportP4.sortForWrite(self.p4, self.known + self.new)
+        self.assertEqual(alreadyOpen, [self.known[0]])
+        self.assertEqual(sorted(toEdit), sorted(self.known[1:]))
+        self.assertEqual(sorted(toAdd), sorted(self.new))
+        self.assertEqual([call[0] for call in self.p4.calls], ['fstat'])
+
+    def test_revert_unchanged_in_one_command(self):
+        uExportP4.revertUnchanged(self.p4, self.known)
+        self.assertEqual(self.p4.calls, [('revert', '-a') + tuple(self.known)])
+        self.assertEqual(uExportP4.revertUnchanged(self.p4, []), [])
+        self.assertEqual(len(self.p4.calls), 1)
+
+    def test_big_plans_are_batched(self):
+        depotFiles = [ROOT + 'big/' + str(i) + '.fbx' for i in range(0, uExportP4.P4_BATCH + 10)]
+        self.p4.depotFiles.update(dict([(depotFile, 'edit') for depotFile in depotFiles]))
+        paths = [self.p4.clientFile(depotFile) for depotFile in depotFiles]
+        uExportP4.openForWrite(self.p4, paths)
+        self.assertEqual([call[0] for call in self.p4.calls], ['fstat', 'fstat', 'edit', 'edit'])
+
+
+class TestAddFiles(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_only_written_files_are_added_in_one_command(self):
+        written = []
+        for i in range(0, 3):
+            path = os.path.join(self.folder, 'char' + str(i) + '.fbx')
+            open(path, 'w').close()
+            written.append(path)
+        p4 = FakeP4()
+        added = uExportP4.addFiles(p4, written + [os.path.join(self.folder, 'failed.fbx')], changelist=7)
+        self.assertEqual(added, written)
+        self.assertEqual(p4.calls, [('add', '-c', '7') + tuple(written)])
+
+    def test_nothing_written_costs_nothing(self):
+        p4 = FakeP4()
+        self.assertEqual(uExportP4.addFiles(p4, [os.path.join(self.folder, 'failed.fbx')]), [])
+        self.assertEqual(p4.roundTrips, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
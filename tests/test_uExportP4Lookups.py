@@ -0,0 +1,130 @@
+'''
+getP4Locations/getWorkspaces against uExportFakes.FakeP4, plain python:
+python -m unittest discover -s tests
+'''
+
+import os
+import sys
+import socket
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uExportP4
+from uExportFakes import FakeP4
+
+ROOT = '//depot/ArtSource/'
+
+
+class FakeP4Factory(object):
+    '''
+    p4Class for P4Pool that keeps every connection it made
+    '''
+    def __init__(self, depotFiles):
+        self.depotFiles = depotFiles
+        self.made = []
+
+    def __call__(self):
+        p4 = FakeP4(self.depotFiles)
+        self.made.append(p4)
+        return p4
+
+    @property
+    def roundTrips(self):
+        return sum([p4.roundTrips for p4 in self.made])
+
+
+class TestP4Locations(unittest.TestCase):
+    def setUp(self):
+        depotFiles = dict([(ROOT + 'chars/asset' + str(i) + '_LOD0.fbx', 'edit') for i in range(0, 20)])
+        self.names = ['asset' + str(i) + '_LOD0.fbx' for i in range(0, 20)]
+        self.factory = FakeP4Factory(depotFiles)
+        self.pool = uExportP4.P4Pool(p4Class=self.factory)
+        self.cache = uExportP4.TTLCache()
+
+    def lookup(self, names):
+        return uExportP4.getP4Locations(names, root=ROOT, pool=self.pool, cache=self.cache, debug=0)
+
+    def test_one_files_and_one_describe_for_all_names(self):
+        locations = self.lookup(self.names)
+        self.assertEqual(len(self.factory.made), 1)
+        self.assertEqual([call[0] for call in self.factory.made[0].calls], ['files', 'describe'])
+        self.assertEqual(locations['asset3_LOD0.fbx'], ['fake', ROOT + 'chars/asset3_LOD0.fbx', 'fake change 1', '1'])
+
+    def test_cached_lookups_make_no_round_trips(self):
+        self.lookup(self.names)
+        trips = self.factory.roundTrips
+        for i in range(0, 5):
+            self.assertEqual(self.lookup(self.names)['asset0_LOD0.fbx'][1], ROOT + 'chars/asset0_LOD0.fbx')
+        self.assertEqual(self.factory.roundTrips, trips)
+
+    def test_missing_files_are_cached_too(self):
+        self.assertEqual(self.lookup(['nothere.fbx']), {'nothere.fbx':False})
+        trips = self.factory.roundTrips
+        self.assertEqual(self.lookup(['nothere.fbx']), {'nothere.fbx':False})
+        self.assertEqual(self.factory.roundTrips, trips)
+
+    def test_only_uncached_names_are_looked_up(self):
+        self.lookup(self.names[:10])
+        self.lookup(self.names)
+        filesCalls = [call for call in self.factory.made[0].calls if call[0] == 'files']
+        self.assertEqual(len(filesCalls), 2)
+        self.assertEqual(len(filesCalls[1]) - 1, 10)
+
+    def test_expired_entries_are_fetched_again_on_the_pooled_connection(self):
+        self.cache.ttl = -1
+        self.lookup(self.names)
+        self.lookup(self.names)
+        self.assertEqual(len(self.factory.made), 1)
+        self.assertEqual(self.factory.roundTrips, 4)
+
+    def test_dropped_connection_is_reopened(self):
+        self.lookup(self.names[:1])
+        self.factory.made[0].disconnect()
+        self.lookup(self.names[1:2])
+        self.assertEqual(len(self.factory.made), 2)
+        self.assertTrue(self.factory.made[1].connected())
+
+    def test_one_connection_per_client(self):
+        with self.pool.connection() as p4:
+            first = p4
+        with self.pool.connection('other_ws') as p4:
+            self.assertEqual(p4.client, 'other_ws')
+        with self.pool.connection() as p4:
+            self.assertTrue(p4 is first)
+        self.assertEqual(len(self.factory.made), 2)
+        self.pool.close()
+        self.assertFalse(first.connected())
+
+    def test_no_server_returns_false_for_everything(self):
+        class Offline(FakeP4):
+            def connect(self):
+                raise Exception('no server')
+        pool = uExportP4.P4Pool(p4Class=Offline)
+        locations = uExportP4.getP4Locations(self.names[:2], root=ROOT, pool=pool, cache=self.cache, debug=0)
+        self.assertEqual(locations, dict([(name, False) for name in self.names[:2]]))
+
+    def test_workspaces_are_cached_per_host(self):
+        host = socket.gethostname()
+        self.assertEqual(uExportP4.getWorkspaces(host, pool=self.pool, cache=self.cache), ['fake_ws'])
+        self.assertEqual(uExportP4.getWorkspaces(host, pool=self.pool, cache=self.cache), ['fake_ws'])
+        self.assertEqual(self.factory.roundTrips, 1)
+        self.assertEqual(uExportP4.getWorkspaces('elsewhere', pool=self.pool, cache=self.cache), [])
+
+
+class TestP4Worker(unittest.TestCase):
+    def test_callback_gets_the_result_off_the_calling_thread(self):
+        done = threading.Event()
+        got = []
+        def callback(result):
+            got.append((result, threading.current_thread().name))
+            done.set()
+        worker = uExportP4.P4Worker()
+        worker.submit(lambda a, b: a + b, args=(1, 2), callback=callback)
+        self.assertTrue(done.wait(5))
+        self.assertEqual(got, [(3, 'uExportP4Worker')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+'''
+resolveTextures round trips against uExportFakes.FakeP4, plain python:
+python -m unittest discover -s tests
+'''
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uExportP4
+from uExportFakes import FakeP4, legacyResolveTextures, buildFakeTextureDepot
+
+ROOT = '//depot/ArtSource/'
+
+
+class TestResolveTextures(unittest.TestCase):
+    def resolve(self, p4, missingFileDict, **kwargs):
+        return uExportP4.resolveTextures(p4, missingFileDict, ROOT, debug=0, **kwargs)
+
+    def test_three_round_trips_whatever_the_texture_count(self):
+        for textures in (5, 50, 400):
+            depotFiles, missingFileDict = buildFakeTextureDepot(textures=textures, root=ROOT)
+            p4 = FakeP4(depotFiles)
+            resolved = self.resolve(p4, missingFileDict)
+            self.assertEqual([call[0] for call in p4.calls], ['files', 'fstat', 'sync'])
+            self.assertEqual(len([f for f in resolved if resolved[f]['status'] == 'FOUND']), textures)
+
+    def test_fewer_round_trips_than_the_per_texture_loop(self):
+        depotFiles, missingFileDict = buildFakeTextureDepot(textures=50, root=ROOT)
+        legacyP4 = FakeP4(depotFiles)
+        legacyResolveTextures(legacyP4, missingFileDict, ROOT)
+        batchedP4 = FakeP4(depotFiles)
+        self.resolve(batchedP4, missingFileDict)
+        self.assertTrue(legacyP4.roundTrips >= 3 * 50)
+        self.assertEqual(batchedP4.roundTrips, 3)
+
+    def test_big_scenes_are_batched(self):
+        depotFiles, missingFileDict = buildFakeTextureDepot(textures=uExportP4.P4_BATCH * 2 + 1, dupes=0, root=ROOT)
+        p4 = FakeP4(depotFiles)
+        self.resolve(p4, missingFileDict)
+        self.assertEqual([call[0] for call in p4.calls], ['files'] * 3 + ['fstat'] * 3 + ['sync'] * 3)
+        self.assertTrue(max([len(call) - 1 for call in p4.calls]) <= uExportP4.P4_BATCH + 1)
+
+    def test_dupes_resolve_to_the_matching_folder(self):
+        depotFiles, missingFileDict = buildFakeTextureDepot(textures=10, dupes=1.0, root=ROOT)
+        resolved = self.resolve(FakeP4(depotFiles), missingFileDict)
+        self.assertEqual(resolved['tex_3.tga']['depotFile'], ROOT + 'char3/textures/tex_3.tga')
+        self.assertEqual(resolved['tex_3.tga']['clientFile'], 'C:/ws/depot/ArtSource/char3/textures/tex_3.tga')
+
+    def test_deleted_heads_and_missing_files(self):
+        depotFiles = {ROOT + 'a/textures/gone.tga':'delete', ROOT + 'a/textures/ok.tga':'edit'}
+        missingFileDict = {'gone.tga':{'path':'D:/a/textures/'}, 'ok.tga':{'path':'D:/a/textures/'},
+                           'never.tga':{'path':'D:/a/textures/'}}
+        p4 = FakeP4(depotFiles)
+        resolved = self.resolve(p4, missingFileDict)
+        self.assertEqual(resolved['ok.tga']['status'], 'FOUND')
+        self.assertEqual(resolved['never.tga']['status'], 'NOT FOUND')
+        self.assertNotEqual(resolved['gone.tga']['status'], 'FOUND')
+        self.assertEqual(p4.calls[-1], ('sync', '-f', ROOT + 'a/textures/ok.tga'))
+
+    def test_parallel_sync_and_no_sync(self):
+        depotFiles, missingFileDict = buildFakeTextureDepot(textures=5, root=ROOT)
+        p4 = FakeP4(depotFiles)
+        self.resolve(p4, missingFileDict, parallel=4)
+        self.assertEqual(p4.calls[-1][:3], ('sync', '-f', '--parallel=threads=4'))
+        p4 = FakeP4(depotFiles)
+        self.resolve(p4, missingFileDict, sync=False)
+        self.assertEqual([call[0] for call in p4.calls], ['files', 'fstat'])
+
+    def test_nothing_missing_costs_nothing(self):
+        p4 = FakeP4()
+        self.assertEqual(self.resolve(p4, {}), {})
+        self.assertEqual(p4.roundTrips, 0)
+
+
+class TestPickDepotFile(unittest.TestCase):
+    def test_grandparent_breaks_ties(self):
+        candidates = ['//d/hero/tex/a.tga', '//d/villain/tex/a.tga']
+        self.assertEqual(uExportP4.pickDepotFile(candidates, 'tex', 'villain'), '//d/villain/tex/a.tga')
+        self.assertEqual(uExportP4.pickDepotFile(candidates, 'other', 'villain'), None)
+        self.assertEqual(uExportP4.pickDepotFile(candidates[:1], 'other', None), candidates[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
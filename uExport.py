@@ -12,9 +12,14 @@ uExportToolWindow = ue.show()
 
 import os
 import re
+import sys
 import time
 import stat
 import types
+import marshal
+import getpass
+import hashlib
+import tempfile
 
 from cStringIO import StringIO
 import xml.etree.ElementTree as xml
@@ -25,16 +30,19 @@ import maya.cmds as cmds
 import maya.OpenMayaUI as openMayaUI
 import maya.mel as mel
 
+import uExportCore
+import uExportP4
+from uExportCore import uExport, attrExists, msgConnect, findRelatedSkinCluster
+from uExportTreeModel import uExportTreeItem, uExportTreeModel
+
 # legacy support
 from Qtpy.Qt import QtWidgets, QtCore, QtGui
 
 mayaApi = cmds.about(api=True)
 if mayaApi >= 201700:
     import shiboken2 as shiboken
-    import pyside2uic as pysideuic
 else:
     import shiboken
-    import pysideuic
 
 def show():
     global uExportToolWindow
@@ -47,27 +55,120 @@ def show():
     uExportToolWindow.show()
     return uExportToolWindow
 
-def loadUiType(uiFile):
-    """
-    Pyside lacks the "loadUiType" command, so we have to convert the ui file to py code in-memory first
-    and then execute it in a special frame to retrieve the form_class.
-    http://tech-artists.org/forum/showthread.php?3035-PySide-in-Maya-2013 (ChrisE)
-    """
+def getUiCacheDir():
+    '''
+    Per user folder the compiled .ui forms are cached in, set UEXPORT_UI_CACHE to override (farm workers etc)
+    '''
+    if os.environ.get('UEXPORT_UI_CACHE'):
+        return os.environ['UEXPORT_UI_CACHE']
+    if os.name == 'nt' and os.environ.get('LOCALAPPDATA'):
+        return os.path.join(os.environ['LOCALAPPDATA'], 'uExport_uiCache')
+    return os.path.join(tempfile.gettempdir(), 'uExport_uiCache_' + getpass.getuser())
+
+def isPrivatePath(path):
+    '''
+    The cache is executed, so only trust files and folders that are ours, not symlinks, and not writable by others
+    '''
+    st = os.lstat(path)
+    if stat.S_ISLNK(st.st_mode):
+        return False
+    if hasattr(os, 'geteuid'):
+        if st.st_uid != os.geteuid() or st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            return False
+    return True
+
+def makeUiCacheDir(cacheDir):
+    if not os.path.isdir(cacheDir):
+        os.makedirs(cacheDir, 0700)
+    if not isPrivatePath(cacheDir):
+        raise OSError('UI cache folder is not private to this user: ' + cacheDir)
+
+def getUiCacheKey(uiFile):
+    '''
+    The cache key is the .ui file contents plus everything that changes the compiled form:
+    the Qt binding and its version, the Qt version, and the python version (marshal is not portable)
+    '''
+    binding = QtWidgets.__name__.split('.')[0]
+    bindingVer = getattr(sys.modules.get(binding), '__version__', '')
+    with open(uiFile, 'rb') as f:
+        uiHash = hashlib.sha1(f.read()).hexdigest()
+    keyStr = '|'.join([uiHash, binding, str(bindingVer), QtCore.qVersion(), sys.version])
+    return hashlib.sha1(keyStr).hexdigest()
+
+def compileUiFile(uiFile):
+    '''
+    Runs pysideuic on the .ui file and returns (widget_class, form_class, codeObject)
+    '''
+    if mayaApi >= 201700:
+        import pyside2uic as pysideuic
+    else:
+        import pysideuic
+
     parsed = xml.parse(uiFile)
     widget_class = parsed.find('widget').get('class')
     form_class = parsed.find('class').text
 
     with open(uiFile, 'r') as f:
         o = StringIO()
-        frame = {}
-
         pysideuic.compileUi(f, o, indent=0)
         pyc = compile(o.getvalue(), '<string>', 'exec')
-        exec pyc in frame
+    return widget_class, form_class, pyc
 
-        #Fetch the base_class and form class based on their type in the xml from designer
-        form_class = frame['Ui_%s'%form_class]
-        base_class = eval('QtWidgets.%s'%widget_class)
+def loadUiType(uiFile, useCache=True):
+    """
+    Pyside lacks the "loadUiType" command, so we have to convert the ui file to py code in-memory first
+    and then execute it in a special frame to retrieve the form_class.
+    http://tech-artists.org/forum/showthread.php?3035-PySide-in-Maya-2013 (ChrisE)
+
+    The compiled form is cached on disk (see getUiCacheDir) keyed by getUiCacheKey, so only the
+    first import after the .ui or the Qt binding changes pays for pysideuic.
+    """
+    start = time.time()
+    compiled = None
+    cacheFile = None
+    cacheState = 'no cache'
+
+    if useCache:
+        try:
+            cacheDir = getUiCacheDir()
+            makeUiCacheDir(cacheDir)
+            cacheFile = os.path.join(cacheDir, 'uExport_ui_' + getUiCacheKey(uiFile) + '.bin')
+            if os.path.isfile(cacheFile) and isPrivatePath(cacheFile):
+                with open(cacheFile, 'rb') as f:
+                    compiled = marshal.load(f)
+                if not (isinstance(compiled, tuple) and len(compiled) == 3 and isinstance(compiled[2], types.CodeType)):
+                    raise ValueError('unexpected UI cache contents in ' + cacheFile)
+                cacheState = 'warm cache'
+        except Exception as e:
+            print 'loadUiType>>> Could not read UI cache, recompiling:', e
+            compiled = None
+
+    if not compiled:
+        compiled = compileUiFile(uiFile)
+        if cacheFile:
+            cacheState = 'cold cache'
+            try:
+                #write to a temp file first so a half written cache is never picked up,
+                #then replace whatever was there (a stale or unreadable cache)
+                tmpFile = cacheFile + '.' + str(os.getpid())
+                with os.fdopen(os.open(tmpFile, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0600), 'wb') as f:
+                    marshal.dump(compiled, f)
+                if os.name == 'nt' and os.path.lexists(cacheFile):
+                    os.remove(cacheFile)
+                os.rename(tmpFile, cacheFile)
+            except Exception as e:
+                print 'loadUiType>>> Could not write UI cache:', e
+
+    widget_class, form_class, pyc = compiled
+    frame = {}
+    exec pyc in frame
+
+    #Fetch the base_class and form class based on their type in the xml from designer
+    form_class = frame['Ui_%s'%form_class]
+    base_class = eval('QtWidgets.%s'%widget_class)
+
+    elapsed = (time.time() - start)
+    print 'uExport>>> Loaded UI form (' + cacheState + ') in %.3f seconds.' % elapsed
     return form_class, base_class
 
 def getMayaWindow():
@@ -88,90 +189,6 @@ else:
     cmds.error('Cannot find UI file: ' + uiFile)
 
 
-
-#these are used by both classes below, this method is usually in the utils lib at Epic
-def attrExists(attr):
-    if '.' in attr:
-        node, att = attr.split('.')
-        return cmds.attributeQuery(att, node=node, ex=1)
-    else:
-        cmds.warning('attrExists: No attr passed in: ' + attr)
-        return False
-
-def msgConnect(attribFrom, attribTo, debug=0):
-    # TODO needs a mode to dump all current connections (overwrite/force)
-    objFrom, attFrom = attribFrom.split('.')
-    objTo, attTo = attribTo.split('.')
-    if debug: print 'msgConnect>>> Locals:', locals()
-    if not attrExists(attribFrom):
-        cmds.addAttr(objFrom, longName=attFrom, attributeType='message')
-    if not attrExists(attribTo):
-        cmds.addAttr(objTo, longName=attTo, attributeType='message')
-
-    # check that both atts, if existing are msg atts
-    for a in (attribTo, attribFrom):
-        if cmds.getAttr(a, type=1) != 'message':
-            cmds.warning('msgConnect: Attr, ' + a + ' is not a message attribute. CONNECTION ABORTED.')
-            return False
-
-    try:
-        return cmds.connectAttr(attribFrom, attribTo, f=True)
-    except Exception as e:
-        print e
-        return False
-
-def findRelatedSkinCluster(skinObject):
-    '''Python implementation of MEL command: http://takkun.nyamuuuu.net/blog/archives/592'''
-
-    skinShape = None
-    skinShapeWithPath = None
-    hiddenShape = None
-    hiddenShapeWithPath = None
-
-    cpTest = cmds.ls( skinObject, typ="controlPoint" )
-    if len( cpTest ):
-        skinShape = skinObject
-
-    else:
-        rels = cmds.listRelatives( skinObject )
-        if rels == None: return False
-        for r in rels :
-            cpTest = cmds.ls( "%s|%s" % ( skinObject, r ), typ="controlPoint" )
-            if len( cpTest ) == 0:
-                continue
-
-            io = cmds.getAttr( "%s|%s.io" % ( skinObject, r ) )
-            if io:
-                continue
-
-            visible = cmds.getAttr( "%s|%s.v" % ( skinObject, r ) )
-            if not visible:
-                hiddenShape = r
-                hiddenShapeWithPath = "%s|%s" % ( skinObject, r )
-                continue
-
-            skinShape = r
-            skinShapeWithPath = "%s|%s" % ( skinObject, r )
-            break
-
-    if skinShape:
-        if len( skinShape ) == 0:
-            if len( hiddenShape ) == 0:
-                return None
-
-            else:
-                skinShape = hiddenShape
-                skinShapeWithPath = hiddenShapeWithPath
-
-    clusters = cmds.ls( typ="skinCluster" )
-    for c in clusters:
-        geom = cmds.skinCluster( c, q=True, g=True )
-        for g in geom:
-            if g == skinShape or g == skinShapeWithPath:
-                return c
-
-    return None
-
 def getParents(item):
      parents = []
      current_item = item
@@ -184,339 +201,6 @@ def getParents(item):
          current_parent = current_item.parent()
      return parents
 
-########################################################################
-## UEXPORT CLASS
-########################################################################
-
-class uExport(object):
-    '''
-    Just a little basket to store things.
-    TODO: Add properties to get/set values
-    TODO: add logic to check that meshes exist across LODs
-    '''
-    def __init__(self, node):
-
-        #update for new LOD attrs instead of just rendermeshes
-        if not attrExists(node + '.rendermeshes_LOD0'):
-            if attrExists(node + '.rendermesh'):
-                if cmds.listConnections(node + '.rendermesh'):
-                    lod0meshes = cmds.listConnections(node + '.rendermesh')
-                    for mesh in lod0meshes:
-                        msgConnect(node + '.rendermeshes_LOD0', mesh + '.uExport')
-                    cmds.deleteAttr(node, at='rendermesh')
-                else:
-                    cmds.addAttr(node, longName='rendermeshes_LOD0', attributeType='message')
-            else:
-                cmds.addAttr(node, longName='rendermeshes_LOD0', attributeType='message')
-
-            #add the other lod attrs
-            cmds.addAttr(node, longName='rendermeshes_LOD1', attributeType='message')
-            cmds.addAttr(node, longName='rendermeshes_LOD2', attributeType='message')
-            cmds.addAttr(node, longName='rendermeshes_LOD3', attributeType='message')
-            cmds.addAttr(node, longName='rendermeshes_LOD4', attributeType='message')
-
-        #TODO: don't assume 4 LODs
-        if not attrExists(node + '.export_script_LOD0'):
-            cmds.addAttr(node, longName='export_script_LOD0', dt='string')
-            cmds.addAttr(node, longName='export_script_LOD1', dt='string')
-            cmds.addAttr(node, longName='export_script_LOD2', dt='string')
-            cmds.addAttr(node, longName='export_script_LOD3', dt='string')
-            cmds.addAttr(node, longName='export_script_LOD4', dt='string')
-
-        if not attrExists(node + '.fbx_name_LOD0'):
-            cmds.addAttr(node, longName='fbx_name_LOD0', dt='string')
-            cmds.addAttr(node, longName='fbx_name_LOD1', dt='string')
-            cmds.addAttr(node, longName='fbx_name_LOD2', dt='string')
-            cmds.addAttr(node, longName='fbx_name_LOD3', dt='string')
-            cmds.addAttr(node, longName='fbx_name_LOD4', dt='string')
-
-        self.export_root = cmds.listConnections(node + '.export_root')
-
-        self.version = cmds.getAttr(node + '.uexport_ver')
-        self.node = node
-        self.name = node.split('|')[-1]
-        self.asset_name = node
-        self.folder_path = None
-        self.fbxPropertiesDict = None
-
-
-        if attrExists(node + '.asset_name'):
-            self.asset_name = cmds.getAttr(node + '.asset_name')
-        if attrExists(node + '.fbx_name'):
-            self.fbx_name = cmds.getAttr(node + '.fbx_name')
-        if attrExists(node + '.folder_path'):
-            self.folder_path = cmds.getAttr(node + '.folder_path')
-
-        #ART MetaData
-        #TO DO: Move to properties
-        if attrExists(node + '.joint_mover_template'):
-            self.joint_mover_template = cmds.getAttr(node + '.joint_mover_template')
-        if attrExists(node + '.skeleton_template'):
-            self.skeleton_template = cmds.getAttr(node + '.skeleton_template')
-        if attrExists(node + '.pre_script'):
-            self.pre_script = cmds.getAttr(node + '.pre_script')
-        if attrExists(node + '.post_script'):
-            self.post_script = cmds.getAttr(node + '.post_script')
-        if attrExists(node + '.export_file'):
-            self.export_file = cmds.getAttr(node + '.export_file')
-        if attrExists(node + '.anim_file'):
-            self.anim_file = cmds.getAttr(node + '.anim_file')
-        if attrExists(node + '.skeleton_uasset'):
-            self.skeleton_uasset = cmds.getAttr(node + '.skeleton_uasset')
-        if attrExists(node + '.skelmesh_uasset'):
-            self.skelmesh_uasset = cmds.getAttr(node + '.skelmesh_uasset')
-        if attrExists(node + '.physics_uasset'):
-            self.physics_uasset = cmds.getAttr(node + '.physics_uasset')
-        if attrExists(node + '.thumbnail_large'):
-            self.thumbnail_large = cmds.getAttr(node + '.thumbnail_large')
-        if attrExists(node + '.thumbnail_small'):
-            self.thumbnail_small = cmds.getAttr(node + '.thumbnail_small')
-
-    ## Built in methods
-    ########################################################################
-    def getLodDicts(self):
-        lodDicts = {}
-        lodDicts[0] = {'meshes':self.rendermeshes_LOD0, 'export_script':self.export_script_LOD0, 'fbx_name':self.fbx_name_LOD0}
-        lodDicts[1] = {'meshes':self.rendermeshes_LOD1, 'export_script':self.export_script_LOD1, 'fbx_name':self.fbx_name_LOD1}
-        lodDicts[2] = {'meshes':self.rendermeshes_LOD2, 'export_script':self.export_script_LOD2, 'fbx_name':self.fbx_name_LOD2}
-        lodDicts[3] = {'meshes':self.rendermeshes_LOD3, 'export_script':self.export_script_LOD3, 'fbx_name':self.fbx_name_LOD3}
-        lodDicts[4] = {'meshes':self.rendermeshes_LOD4, 'export_script':self.export_script_LOD4, 'fbx_name':self.fbx_name_LOD4}
-        return lodDicts
-
-    def getShaderDict(self):
-        shaderDict = {}
-        for mesh in self.rendermeshes_ALL:
-            for shader in self.getAssocShaders(mesh):
-                if shader not in shaderDict.keys():
-                    shaderDict[shader] = [mesh]
-                else:
-                    shaderDict[shader].append(mesh)
-        if shaderDict:
-            return shaderDict
-        else:
-            return False
-
-    def getAssocShaders(self, mesh):
-        shapes = cmds.listRelatives(mesh, shapes=1, f=True)
-        shadingGrps = cmds.listConnections(shapes,type='shadingEngine')
-        shaders = cmds.ls(cmds.listConnections(shadingGrps),materials=1)
-        return shaders
-
-    def connectRenderMeshes(self, renderMeshes, LOD=0):
-        try:
-            cmds.undoInfo(openChunk=True)
-            lodAttr = None
-            if LOD >=0 or LOD <=4:
-                lodAttr = self.node + '.rendermeshes_LOD' + str(LOD)
-                conns = cmds.listConnections(lodAttr, plugs=1, destination=1)
-                if conns:
-                    for conn in cmds.listConnections(lodAttr, plugs=1, destination=1):
-                        cmds.disconnectAttr(lodAttr, conn)
-            if lodAttr:
-                for mesh in renderMeshes:
-                    msgConnect(lodAttr, mesh + '.uExport')
-            else:
-                cmds.error('connectRenderMeshes>>> please specify a LOD integer (0-4) for your meshes')
-
-        except Exception as e:
-            print e
-        finally:
-            cmds.undoInfo(closeChunk=True)
-
-    def getFbxExportPropertiesDict(self):
-        if not attrExists(self.node + '.fbxPropertiesDict'):
-            cmds.addAttr(self.node, longName='fbxPropertiesDict', dt='string')
-            self.fbxPropertiesDict = {'animInterpolation':'quaternion', 'upAxis':'default', 'triangulation':False}
-            cmds.setAttr(self.node + '.fbxPropertiesDict', json.dumps(self.fbxPropertiesDict), type='string')
-            return self.fbxPropertiesDict
-        else:
-            self.fbxPropertiesDict = json.loads(cmds.getAttr(self.node + '.fbxPropertiesDict'))
-            return self.fbxPropertiesDict
-
-    ## Properties
-    ########################################################################
-
-    #return and set the rendermeshes per LOD
-    @property
-    def rendermeshes_LOD0(self):
-        conns = cmds.listConnections(self.node + '.rendermeshes_LOD0')
-        if conns:
-            return conns
-        else: return []
-    @rendermeshes_LOD0.setter
-    def rendermeshes_LOD0(self, meshes):
-        self.connectRenderMeshes(meshes, LOD=0)
-
-    @property
-    def rendermeshes_LOD1(self):
-        conns = cmds.listConnections(self.node + '.rendermeshes_LOD1')
-        if conns:
-            return conns
-        else: return []
-    @rendermeshes_LOD1.setter
-    def rendermeshes_LOD1(self, meshes):
-        self.connectRenderMeshes(meshes, LOD=1)
-
-    @property
-    def rendermeshes_LOD2(self):
-        conns = cmds.listConnections(self.node + '.rendermeshes_LOD2')
-        if conns:
-            return conns
-        else: return []
-    @rendermeshes_LOD2.setter
-    def rendermeshes_LOD2(self, meshes):
-        self.connectRenderMeshes(meshes, LOD=2)
-
-    @property
-    def rendermeshes_LOD3(self):
-        conns = cmds.listConnections(self.node + '.rendermeshes_LOD3')
-        if conns:
-            return conns
-        else: return []
-    @rendermeshes_LOD3.setter
-    def rendermeshes_LOD3(self, meshes):
-        self.connectRenderMeshes(meshes, LOD=3)
-
-    @property
-    def rendermeshes_LOD4(self):
-        conns = cmds.listConnections(self.node + '.rendermeshes_LOD4')
-        if conns:
-            return conns
-        else: return []
-    @rendermeshes_LOD4.setter
-    def rendermeshes_LOD4(self, meshes):
-        self.connectRenderMeshes(meshes, LOD=4)
-
-    #number of lods
-    @property
-    def lodNum(self):
-        att = self.node + '.lodNum'
-        if attrExists(att):
-            return cmds.getAttr(att)
-        else:
-            cmds.addAttr(self.node, ln='lodNum', at='byte')
-            cmds.setAttr(att, 4)
-            return cmds.getAttr(att)
-
-    @lodNum.setter
-    def lodNum(self, meshes):
-        att = self.node + '.lodNum'
-        if attrExists(att):
-            return cmds.setAttr(att)
-        else:
-            cmds.addAttr(self.node, ln='lodNum', at='byte')
-            cmds.setAttr(att, 4)
-            return cmds.setAttr(att)
-
-    #return ALL lod geometry
-    @property
-    def rendermeshes_ALL(self):
-        meshes = []
-        meshes.extend(self.rendermeshes_LOD0)
-        meshes.extend(self.rendermeshes_LOD1)
-        meshes.extend(self.rendermeshes_LOD2)
-        meshes.extend(self.rendermeshes_LOD3)
-        meshes.extend(self.rendermeshes_LOD4)
-        return meshes
-
-    #return and set export script paths
-    @property
-    def export_script_LOD0(self):
-        return cmds.getAttr(self.node + '.export_script_LOD0')
-    @export_script_LOD0.setter
-    def export_script_LOD0(self, path):
-        cmds.setAttr(self.node + '.export_script_LOD0', path, type='string')
-
-    @property
-    def export_script_LOD1(self):
-        return cmds.getAttr(self.node + '.export_script_LOD1')
-    @export_script_LOD1.setter
-    def export_script_LOD1(self, path):
-        cmds.setAttr(self.node + '.export_script_LOD1', path, type='string')
-
-    @property
-    def export_script_LOD2(self):
-        return cmds.getAttr(self.node + '.export_script_LOD2')
-    @export_script_LOD2.setter
-    def export_script_LOD2(self, path):
-        cmds.setAttr(self.node + '.export_script_LOD2', path, type='string')
-
-    @property
-    def export_script_LOD3(self):
-        return cmds.getAttr(self.node + '.export_script_LOD3')
-    @export_script_LOD3.setter
-    def export_script_LOD3(self, path):
-        cmds.setAttr(self.node + '.export_script_LOD3', path, type='string')
-
-    @property
-    def export_script_LOD4(self):
-        return cmds.getAttr(self.node + '.export_script_LOD4')
-    @export_script_LOD4.setter
-    def export_script_LOD4(self, path):
-        cmds.setAttr(self.node + '.export_script_LOD4', path, type='string')
-
-
-    #return and set fbx export names
-    @property
-    def fbx_name_LOD0(self):
-        return cmds.getAttr(self.node + '.fbx_name_LOD0')
-    @fbx_name_LOD0.setter
-    def fbx_name_LOD0(self, name):
-        cmds.setAttr(self.node + '.fbx_name_LOD0', name, type='string')
-
-    @property
-    def fbx_name_LOD1(self):
-        return cmds.getAttr(self.node + '.fbx_name_LOD1')
-    @fbx_name_LOD1.setter
-    def fbx_name_LOD1(self, name):
-        cmds.setAttr(self.node + '.fbx_name_LOD1', name, type='string')
-
-    @property
-    def fbx_name_LOD2(self):
-        return cmds.getAttr(self.node + '.fbx_name_LOD2')
-    @fbx_name_LOD2.setter
-    def fbx_name_LOD2(self, name):
-        cmds.setAttr(self.node + '.fbx_name_LOD2', name, type='string')
-
-    @property
-    def fbx_name_LOD3(self):
-        return cmds.getAttr(self.node + '.fbx_name_LOD3')
-    @fbx_name_LOD3.setter
-    def fbx_name_LOD3(self, name):
-        cmds.setAttr(self.node + '.fbx_name_LOD3', name, type='string')
-
-    @property
-    def fbx_name_LOD4(self):
-        return cmds.getAttr(self.node + '.fbx_name_LOD4')
-    @fbx_name_LOD4.setter
-    def fbx_name_LOD4(self, path):
-        cmds.setAttr(self.node + '.fbx_name_LOD4', path, type='string')
-
-
-    #return joints
-    @property
-    def joints(self):
-        if self.export_root:
-            returnMe = []
-            children = cmds.listRelatives(self.export_root, type='joint',allDescendents=True)
-            if children:
-                returnMe.extend(children)
-
-            returnMe.append(self.export_root[0])
-            return returnMe
-    @joints.setter
-    def joints(self):
-        print 'Joints returned by walking hierarchy from the root, not directly settable.'
-
-    #return fbxExportDict
-    @property
-    def fbxExportProperties(self):
-        return self.getFbxExportPropertiesDict()
-    @fbxExportProperties.setter
-    def fbxExportProperties(self, dict):
-        self.fbxPropertiesDict = dict
-        cmds.setAttr(self.node + '.fbxPropertiesDict', json.dumps(self.fbxPropertiesDict), type='string')
-
 ########################################################################
 ## UEXPORT TOOL
 ########################################################################
@@ -537,14 +221,17 @@ class uExportTool(base_class, form_class):
     jointLoc = None
 
     iconLib = {}
-    iconPath = os.environ.get('MAYA_LOCATION', None) + '/icons/'
-    iconLib['joint'] = QtGui.QIcon(QtGui.QPixmap(iconPath + 'kinJoint.png'))
-    iconLib['ikHandle'] = QtGui.QIcon(QtGui.QPixmap(iconPath + 'kinHandle.png'))
-    iconLib['transform'] = QtGui.QIcon(QtGui.QPixmap(iconPath + 'orientJoint.png'))
 
-    def __init__(self, parent=getMayaWindow()):
+    #P4 lookups finish on uExportP4.p4Worker's thread, these bring the results back to the UI thread
+    p4LocationsFound = QtCore.Signal(object, object)
+    p4WorkspacesFound = QtCore.Signal(object)
+
+    def __init__(self, parent=None):
         self.closeExistingWindow()
+        if parent is None:
+            parent = getMayaWindow()
         super(uExportTool, self).__init__(parent)
+        self.loadIcons()
 
 
         self.setupUi(self)
@@ -558,21 +245,35 @@ class uExportTool(base_class, form_class):
         self.export_BTN.clicked.connect(self.export_FN)
         self.createUexportNode_BTN.clicked.connect(self.createUexportNode_FN)
         self.replaceUnknownNodes.clicked.connect(self.replaceUnknownNodes_FN)
-        self.refreshBTN.clicked.connect(self.refreshUI)
+        self.refreshBTN.clicked.connect(lambda *args: self.refreshUI(full=True))
+        self.sidecar_CHK.setChecked(uExportCore.sidecarWriter.installed)
+        self.sidecar_CHK.toggled.connect(self.sidecar_FN)
         self.getTexturesP4BTN.clicked.connect(self.getTexturesP4_FN)
 
         # TODO: Add save settings, setting p4 menu for now
         self.p4CHK.setChecked(False)
 
         self.workSpaceCMB.currentIndexChanged.connect(self.workspaceSelected)
+        self.p4LocationsFound.connect(self.setP4FileItems)
+        self.p4WorkspacesFound.connect(self.setP4Workspaces)
+
+        #tree models, children are only built when a branch is expanded
+        self.export_model = uExportTreeModel(['NAME'], parent=self)
+        self.export_tree.setModel(self.export_model)
+        self.export_model.itemsInserted.connect(functools.partial(self.treeItemsInserted, self.export_tree, self.export_model))
+        self.export_tree.expanded.connect(functools.partial(self.treeItemExpanded, self.export_model, expanded=True))
+        self.export_tree.collapsed.connect(functools.partial(self.treeItemExpanded, self.export_model, expanded=False))
+
+        self.missing_model = uExportTreeModel(['FILE', 'INFO', 'PATH', 'NODE'], parent=self)
+        self.missingFilesTree.setModel(self.missing_model)
 
         #context menu
         self.export_tree.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
         self.export_tree.customContextMenuRequested.connect(self.openMenu)
 
-        self.export_tree.itemClicked.connect(self.check_status)
-        self.export_tree.itemClicked.connect(self.itemClicked)
-        self.missingFilesTree.itemClicked.connect(self.itemClicked)
+        self.export_tree.clicked.connect(self.check_status)
+        self.export_tree.clicked.connect(functools.partial(self.itemClicked, self.export_model))
+        self.missingFilesTree.clicked.connect(functools.partial(self.itemClicked, self.missing_model))
 
 
         #check for p4 lib
@@ -591,19 +292,25 @@ class uExportTool(base_class, form_class):
         self.mousePress = None
 
         self.snapRoot_CMB.setHidden(True)
-        self.refreshUI()
+        self.uNodes = []
+        self.nodeFingerprints = {}
+        self.refreshUI(full=True, useSidecar=True)
 
 ## GENERAL
 ########################################################################
 
     #quick mesh check
     def isMesh(self, node):
-        rels = cmds.listRelatives(node, children=True, s=True)
-        if rels:
-            for shp in rels:
-                if cmds.nodeType(shp)=='mesh':
-                    return True
-        return False
+        return uExportCore.isMesh(node)
+
+    #icons are loaded on first window open, not on import
+    def loadIcons(self):
+        if uExportTool.iconLib:
+            return
+        iconPath = os.environ.get('MAYA_LOCATION', '') + '/icons/'
+        uExportTool.iconLib['joint'] = QtGui.QIcon(QtGui.QPixmap(iconPath + 'kinJoint.png'))
+        uExportTool.iconLib['ikHandle'] = QtGui.QIcon(QtGui.QPixmap(iconPath + 'kinHandle.png'))
+        uExportTool.iconLib['transform'] = QtGui.QIcon(QtGui.QPixmap(iconPath + 'orientJoint.png'))
 
     def setOutlinerToShowAssetContents(self):
         mel.eval('outlinerEditor -e -showContainerContents 1 outlinerPanel1; outlinerEditor -e \
@@ -636,74 +343,16 @@ class uExportTool(base_class, form_class):
                 cmds.rename(new, 'SkeletonSettings_Cache')
 
     def fbxVersion(self):
-        for plugin in cmds.pluginInfo(q=True, listPlugins=True):
-            if "fbxmaya" in plugin:
-                return cmds.pluginInfo(plugin, q=True, version=True)
+        return uExportCore.fbxVersion()
 
     def replaceUnknownNodes_FN(self):
         self.convertSkelSettingsToNN()
 
     def isBlendshape(self, mesh):
-        future = cmds.listHistory(mesh, future=1)
-        isShape = False
-        for node in future:
-            if cmds.nodeType(node) == 'blendShape':
-                return True
-        return False
+        return uExportCore.isBlendshape(mesh)
 
-    def LOD_transferWeights(meshes, jointsToRemove, jointToTransferTo, debug=1, pruneWeights=0.001, *args):
-        '''
-        Original function by Charles Anderson @ Epic Games
-        '''
-        for mesh in meshes:
-
-            # Find the skin cluster for the current mesh
-            cluster = findCluster(mesh)
-
-            if debug:
-                print "MESH: ", mesh
-                print "CLUSTER: ", cluster
-
-            # Prune weights on the current mesh
-            if pruneWeights:
-                cmds.skinPercent(cluster, mesh, prw=pruneWeights)
-
-            # Find all of the current influences on the current skin cluster.
-            meshInfluences = cmds.skinCluster(cluster, q=True, inf=True)
-            #print "Current Influences: ", meshInfluences
-
-            for joint in jointsToRemove:
-                if joint in meshInfluences:
-                    #print "Current Joint: ", joint
-
-                    # If the jointToTransferTo is not already an influence on the current mesh then add it.
-                    currentInfluences = cmds.skinCluster(cluster, q=True, inf=True)
-                    if jointToTransferTo not in currentInfluences:
-                        cmds.skinCluster(cluster, e=True, wt=0, ai=jointToTransferTo)
-
-                    # Now transfer all of the influences we want to remove onto the jointToTransferTo.
-                    for x in range(cmds.polyEvaluate(mesh, v=True)):
-                        #print "TRANSFERRING DATA....."
-                        value = cmds.skinPercent(cluster, (mesh+".vtx["+str(x)+"]"), t=joint, q=True)
-                        if value > 0:
-                            cmds.skinPercent(cluster, (mesh+".vtx["+str(x)+"]"), tmw=[joint, jointToTransferTo])
-
-            # Remove unused influences
-            currentInfluences = cmds.skinCluster(cluster, q=True, inf=True)
-            #print "Current Influences: ", currentInfluences
-            influencesToRemove = []
-            weightedInfs = cmds.skinCluster(cluster, q=True, weightedInfluence=True)
-            #print "Weighted Influences: ", weightedInfs
-            for inf in currentInfluences:
-                #print "Influence: ", inf
-                if inf not in weightedInfs:
-                    #print "Update Influences to Remove List: ", inf
-                    influencesToRemove.append(inf)
-
-            #print "ToRemove Influences: ", influencesToRemove
-            if influencesToRemove != []:
-                for inf in influencesToRemove:
-                    cmds.skinCluster(cluster, e=True, ri=inf)
+    def LOD_transferWeights(self, meshes, jointsToRemove, jointToTransferTo, debug=1, pruneWeights=0.001, *args):
+        return uExportCore.transferWeights(meshes, jointsToRemove, jointToTransferTo, debug=debug, pruneWeights=pruneWeights)
 
 ## UI RELATED
 ########################################################################
@@ -719,9 +368,11 @@ class uExportTool(base_class, form_class):
     #contextual menus
     def openMenu(self, position):
         menu = QtWidgets.QMenu()
-        clickedWid = self.export_tree.itemAt(position)
+        clickedWid = self.itemAt(self.export_tree, position)
+        if not clickedWid:
+            return
 
-        if 'P4_FILE_LIST' in self.export_tree.itemAt(position).text(0):
+        if 'P4_FILE_LIST' in clickedWid.text(0):
             checkOut = menu.addAction("Check out files")
             pos = self.export_tree.mapToGlobal(position)
             action = menu.exec_(pos)
@@ -761,8 +412,35 @@ class uExportTool(base_class, form_class):
                     uNode.connectRenderMeshes(newMeshes, LOD=lod)
                     self.refreshUI()
 
-        if not self.export_tree.itemAt(position).parent():
+        if clickedWid.text(0).startswith('ANIMATION'):
+            addClip = menu.addAction("Add clip from current time range")
+
+            pos = self.export_tree.mapToGlobal(position)
+            action = menu.exec_(pos)
+
+            if action == addClip:
+                uNode = clickedWid.parent().uExport
+                name, ok = QtWidgets.QInputDialog.getText(self, 'Add clip', 'Clip name:')
+                if ok and name:
+                    uNode.addAnimClip(str(name), cmds.playbackOptions(min=True, q=True), cmds.playbackOptions(max=True, q=True))
+                    self.refreshUI()
+
+        if clickedWid.text(0).startswith('CLIP: '):
+            setRange = menu.addAction("Set time range to clip")
+            removeClip = menu.addAction("Remove clip")
+
+            pos = self.export_tree.mapToGlobal(position)
+            action = menu.exec_(pos)
+
+            if action == setRange:
+                cmds.playbackOptions(min=clickedWid.clip['start'], max=clickedWid.clip['end'])
+            elif action == removeClip:
+                clickedWid.uExport.removeAnimClip(clickedWid.clip['name'])
+                self.refreshUI()
+
+        if not clickedWid.parent():
             rootRewire = menu.addAction("Re-wire root joint attr to current selected joint")
+            upgradeNodes = menu.addAction("Upgrade uExport nodes to version " + uExportCore.UEXPORT_VER)
 
             meshSubmenu = menu.addMenu('EDIT RENDERMESHES >>')
 
@@ -786,17 +464,20 @@ class uExportTool(base_class, form_class):
 
             if action:
                 if action == rootRewire:
-                    index = self.export_tree.selectedIndexes()[0]
-                    uExportNode = self.export_tree.itemFromIndex(index).uExport.node
+                    index = self.export_tree.selectionModel().selectedIndexes()[0]
+                    uExportNode = self.export_model.itemFromIndex(index).uExport.node
                     root = cmds.ls(sl=1)
                     if len(root) == 1:
                         self.connectRoot(uExportNode, root[0])
                     else:
                         cmds.error('Select a single joint, you == fail, bro. ' + str(root))
 
+                elif action == upgradeNodes:
+                    uExportCore.migrateExportNodes()
+
                 elif action in (addLOD0, addLOD1, addLOD2, addLOD3, addLOD4):
-                    for index in self.export_tree.selectedIndexes():
-                        uExportNode = self.export_tree.itemFromIndex(index).uExport
+                    for index in self.export_tree.selectionModel().selectedIndexes():
+                        uExportNode = self.export_model.itemFromIndex(index).uExport
                         meshes = cmds.ls(sl=1)
                         #TODO: check if theyre actually meshes
                         if action == addLOD0: uExportNode.rendermeshes_LOD0 = meshes
@@ -806,8 +487,8 @@ class uExportTool(base_class, form_class):
                         if action == addLOD4: uExportNode.rendermeshes_LOD4 = meshes
 
                 elif action in (addScriptLOD0, addScriptLOD1, addScriptLOD2, addScriptLOD3, addScriptLOD4):
-                    for index in self.export_tree.selectedIndexes():
-                        uExportNode = self.export_tree.itemFromIndex(index).uExport
+                    for index in self.export_tree.selectionModel().selectedIndexes():
+                        uExportNode = self.export_model.itemFromIndex(index).uExport
 
                         fileName,_ = QtWidgets.QFileDialog.getOpenFileName(self,
                         "Choose a Python Script", '',
@@ -822,301 +503,418 @@ class uExportTool(base_class, form_class):
 
                 self.refreshUI()
 
-    def refreshUI(self):
+    def refreshUI(self, full=False, useSidecar=False):
+        '''
+        Only rebuilds the uExport branches whose fingerprint (names, root, LOD connections, scripts, fbx settings)
+        changed since the last refresh. full=True, the refresh button, rebuilds everything incl. missing files.
+        Expansion, check and selection state are kept either way.
+        useSidecar paints from the scene's .uexport.json when the scene is unchanged since it was saved.
+        '''
         start = time.time()
 
-        self.export_tree.clear()
-        self.missingFilesTree.clear()
-        self.uNodes = []
-        for node in self.getExportNodes():
-            self.uNodes.append(uExport(node))
-        self.buildExportTree(self.uNodes)
-        self.buildMissingFilesTree()
+        selModel = self.export_tree.selectionModel()
+        selected = [self.export_model.keyPath(self.export_model.itemFromIndex(index)) for index in selModel.selectedIndexes()]
 
+        snapshots = {}
+        sidecar = uExportCore.getSidecarSnapshots() if useSidecar else None
+        if sidecar is not None:
+            nodes = [snap.node for snap in sidecar]
+            snapshots = dict([(snap.node, snap) for snap in sidecar])
+        else:
+            nodes = self.getExportNodes()
+            for node in nodes:
+                snapshots[node] = uExportCore.getNodeSnapshot(node)
+        fingerprints = dict([(node, uExportCore.getNodeFingerprint(snapshots[node])) for node in nodes])
+
+        oldNodes = dict([(uNode.node, uNode) for uNode in self.uNodes])
+        if full:
+            rebuild = nodes
+        else:
+            rebuild = [node for node in nodes if self.nodeFingerprints.get(node) != fingerprints[node]]
 
-        if self.p4CHK.isChecked():
-            if self.perforce:
-                self.getTexturesP4BTN.setEnabled(True)
-                self.getP4Workspaces()
+        #pull out the branches that go away or get rebuilt
+        if full:
+            for i in range(0, self.export_model.topLevelItemCount()):
+                self.export_model.saveState(self.export_model.topLevelItem(i))
+            self.export_model.clear()
+        else:
+            for i in reversed(range(0, self.export_model.topLevelItemCount())):
+                item = self.export_model.topLevelItem(i)
+                if item.uExport.node in rebuild or item.uExport.node not in fingerprints:
+                    self.export_model.saveState(item)
+                    self.export_model.removeItem(item)
+
+        self.uNodes = []
+        newNodes = []
+        for node in nodes:
+            if node in rebuild:
+                uNode = uExport(node, snapshot=snapshots[node])
+                newNodes.append(uNode)
+            else:
+                uNode = oldNodes[node]
+            self.uNodes.append(uNode)
+        self.nodeFingerprints = fingerprints
+
+        outdated = [uNode.node for uNode in newNodes if uExportCore.needsMigration(uNode.snapshot)]
+        if outdated:
+            cmds.warning('uExport>>> Old uExport nodes found, right click > Upgrade uExport nodes: ' + str(outdated))
+        if newNodes:
+            self.buildExportTree(newNodes)
+        self.export_model.savedState = {}
+
+        for keyPath in selected:
+            item = self.export_model.findItem(keyPath)
+            if item:
+                selModel.select(self.export_model.indexFromItem(item), QtCore.QItemSelectionModel.Select)
+
+        if full:
+            self.missing_model.clear()
+            self.buildMissingFilesTree()
+
+            if self.p4CHK.isChecked():
+                if self.perforce:
+                    self.getTexturesP4BTN.setEnabled(True)
+                    self.getP4Workspaces()
 
         # put export into the uExport class later
 
         elapsed = (time.time() - start)
-        print 'uExport>>> Refreshed in %.2f seconds.' % elapsed
+        print 'uExport>>> Refreshed ' + str(len(newNodes)) + ' of ' + str(len(nodes)) + ' uExport nodes in %.3f seconds.' % elapsed
 
 
     def buildExportTree(self, uNodes):
+        #one skinCluster scan and one material walk for the whole tree
+        skinIndex = uExportCore.SkinClusterIndex()
+        allMeshes = []
         for uNode in uNodes:
+            allMeshes.extend(uNode.rendermeshes_ALL)
+        materialIndex = uExportCore.MaterialIndex(allMeshes)
+
+        items = [self.buildExportNodeItem(uNode, skinIndex, materialIndex) for uNode in uNodes]
+        #sort once, after that new and lazily fetched items are inserted in order
+        if self.export_model.sortColumn is None:
+            self.export_model.sort(0, QtCore.Qt.SortOrder(0))
+        self.export_model.addTopLevelItems(items)
+
+    def buildExportNodeItem(self, uNode, skinIndex, materialIndex):
+        red = QtGui.QColor(200, 75, 75, 255)
+        widRed = QtGui.QColor(200, 75, 75, 100)
+        blue = QtGui.QColor(50, 130, 210, 255)
+        widBlue = QtGui.QColor(50, 130, 210, 100)
+
+        #top level
+        wid1 = uExportTreeItem()
+        font = wid1.font(0)
+        font.setPointSize(15)
+
+        wid1.setText(0,uNode.asset_name)
+        wid1.uExport = uNode
+
+        wid1.setText(1, uNode.version)
+        wid1.setExpanded(True)
+        wid1.setFont(0,font)
+
+        wid1.setFlags(QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsEditable | QtCore.Qt.ItemIsUserCheckable | QtCore.Qt.ItemIsSelectable)
+        wid1.setCheckState(0, QtCore.Qt.Checked)
+
+        wid1.setBackground(0, QtGui.QColor(widBlue))
+
+        #mesh branch
+        meshTop = uExportTreeItem()
+        meshes = uNode.rendermeshes_LOD0
+        if meshes:
+            meshTop.setText(0, 'RENDER MESHES: (' + str(len(uNode.rendermeshes_ALL)) + ')  LODS: (' + str(uNode.lodNum) + ')')
+        else:
+            meshTop.setText(0, 'RENDER MESHES: NONE')
+        meshTop.setFlags(QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsEditable | QtCore.Qt.ItemIsUserCheckable)
+        meshTop.setCheckState(0, QtCore.Qt.Checked)
+        wid1.addChild(meshTop)
+        meshTop.setExpanded(True)
 
-            red = QtGui.QColor(200, 75, 75, 255)
-            widRed = QtGui.QColor(200, 75, 75, 100)
-            blue = QtGui.QColor(50, 130, 210, 255)
-            widBlue = QtGui.QColor(50, 130, 210, 100)
-
-            #top level
-            wid1 = QtWidgets.QTreeWidgetItem()
-            font = wid1.font(0)
-            font.setPointSize(15)
-
-            wid1.setText(0,uNode.asset_name)
-            wid1.uExport = uNode
-
-            wid1.setText(1, uNode.version)
-            self.export_tree.addTopLevelItem(wid1)
-            wid1.setExpanded(True)
-            wid1.setFont(0,font)
-
-            font = wid1.font(0)
-            font.setPointSize(10)
-
-            wid1.setFlags(QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsEditable | QtCore.Qt.ItemIsUserCheckable | QtCore.Qt.ItemIsSelectable)
-            wid1.setCheckState(0, QtCore.Qt.Checked)
-
-            wid1.setBackground(0, QtGui.QColor(widBlue))
-
-            #mesh branch
-            meshTop = QtWidgets.QTreeWidgetItem()
-            meshes = uNode.rendermeshes_LOD0
-            if meshes:
-                meshTop.setText(0, 'RENDER MESHES: (' + str(len(uNode.rendermeshes_ALL)) + ')  LODS: (' + str(uNode.lodNum) + ')')
-            else:
-                meshTop.setText(0, 'RENDER MESHES: NONE')
-            meshTop.setFlags(QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsEditable | QtCore.Qt.ItemIsUserCheckable)
-            meshTop.setCheckState(0, QtCore.Qt.Checked)
-            wid1.addChild(meshTop)
-            meshTop.setExpanded(True)
-
-            allMeshRelated = []
-
-            #get mat info
-            start = time.time()
-            shaderDict = uNode.getShaderDict()
-            elapsed = (time.time() - start)
-            print 'uExport>>> Built shader dict for ' + uNode.asset_name + ' in %.2f seconds.' % elapsed
-
-            #meshes
-            lodDicts = uNode.getLodDicts()
-            if lodDicts:
-                for lodNum in lodDicts:
-                    lodWid = QtWidgets.QTreeWidgetItem()
-
-                    #get mesh info
-                    meshes = lodDicts[lodNum]['meshes']
-                    numMeshes = '0'
-                    if meshes:
-                        numMeshes = str(len(meshes))
-                    else:
-                        lodWid.setForeground(0,red)
-                        continue
-
-                    numShaders = 0
-                    usedShaders = []
-
-                    if shaderDict:
-                        numShaders = len(shaderDict.keys())
-                        for mat in shaderDict.keys():
-                            for mesh in meshes:
-                                if mesh in shaderDict[mat]:
-                                    usedShaders.append(mat)
-                    else:
-                        lodWid.setForeground(0,red)
-                        wid1.setBackground(0, widRed)
+        allMeshRelated = []
 
-                    usedShaders = set(usedShaders)
+        #get mat info
+        start = time.time()
+        shaderDict = uNode.getShaderDict(materialIndex=materialIndex)
+        elapsed = (time.time() - start)
+        print 'uExport>>> Built shader dict for ' + uNode.asset_name + ' in %.2f seconds.' % elapsed
 
-                    widText = 'LOD ' + str(lodNum) + '  (' + numMeshes + ' meshes) (' + str(len(usedShaders)) + ' materials)'
-                    if lodDicts[lodNum]['export_script']:
-                        widText += '  > Export Script: ' + lodDicts[lodNum]['export_script'].split('/')[-1]
+        #meshes
+        lodDicts = uNode.getLodDicts()
+        if lodDicts:
+            for lodNum in lodDicts:
+                lodWid = uExportTreeItem()
 
-                    lodWid.setText(0, widText)
+                #get mesh info
+                meshes = lodDicts[lodNum]['meshes']
+                numMeshes = '0'
+                if meshes:
+                    numMeshes = str(len(meshes))
+                else:
+                    lodWid.setForeground(0,red)
+                    continue
 
-                    #add metadata for later use
-                    lodWid.lod = lodNum
-                    lodWid.uExport = uNode
+                usedShaders = set()
 
-                    meshTop.addChild(lodWid)
+                if shaderDict:
+                    usedShaders = materialIndex.getMaterials(meshes)
+                else:
+                    lodWid.setForeground(0,red)
+                    wid1.setBackground(0, widRed)
 
-                    #create mesh top widget
-                    meshLodTop = QtWidgets.QTreeWidgetItem()
-                    meshLodTop.setText(0, 'MESHES (' + numMeshes + ')')
-                    lodWid.addChild(meshLodTop)
+                widText = 'LOD ' + str(lodNum) + '  (' + numMeshes + ' meshes) (' + str(len(usedShaders)) + ' materials)'
+                if lodDicts[lodNum]['export_script']:
+                    widText += '  > Export Script: ' + lodDicts[lodNum]['export_script'].split('/')[-1]
 
-                    matLodTop = QtWidgets.QTreeWidgetItem()
+                lodWid.setText(0, widText)
 
-                    if meshes:
-                        for mesh in meshes:
-                            meshWid = QtWidgets.QTreeWidgetItem()
-                            meshWid.setText(0, mesh)
-                            meshLodTop.addChild(meshWid)
+                #add metadata for later use
+                lodWid.lod = lodNum
+                lodWid.uExport = uNode
 
-                            if not findRelatedSkinCluster(mesh):
-                                if self.isBlendshape(mesh):
-                                    meshWid.setForeground(0, blue)
-                                    meshWid.setText(0, mesh + '  (blendshape)')
-                                else:
-                                    meshWid.setForeground(0, red)
-                                    wid1.setBackground(0, widRed)
-                                    meshWid.setText(0, mesh + ': NO SKINCLUSTER')
-                                    for item in getParents(meshWid):
-                                        item.setExpanded(True)
-                            meshWid.selectMe = [mesh]
-                        meshLodTop.selectMe = meshes
+                meshTop.addChild(lodWid)
 
+                #skin check up front so the node is flagged even when the mesh branch is never opened
+                meshStatus = {}
+                for mesh in meshes:
+                    if findRelatedSkinCluster(mesh, skinIndex=skinIndex):
+                        meshStatus[mesh] = 'skinned'
+                    elif self.isBlendshape(mesh):
+                        meshStatus[mesh] = 'blendshape'
                     else:
-                        meshWid = QtWidgets.QTreeWidgetItem()
-                        meshWid.setText(0, 'NONE')
-                        meshLodTop.addChild(meshWid)
+                        meshStatus[mesh] = 'noSkin'
+                        wid1.setBackground(0, widRed)
 
-                    #create mat top widget
-                    matLodTop = QtWidgets.QTreeWidgetItem()
-                    lodWid.addChild(matLodTop)
+                #create mesh top widget, mesh items are made when it's expanded
+                meshLodTop = uExportTreeItem(populate=functools.partial(self.populateMeshItems, meshes, meshStatus))
+                meshLodTop.setText(0, 'MESHES (' + numMeshes + ')')
+                lodWid.addChild(meshLodTop)
+                meshLodTop.selectMe = meshes
+                if 'noSkin' in meshStatus.values():
+                    lodWid.setExpanded(True)
+                    meshLodTop.setExpanded(True)
 
-                    usedShaders = list(set(usedShaders))
+                #create mat top widget
+                usedShaders = list(usedShaders)
+                matLodTop = uExportTreeItem(populate=functools.partial(self.populateMaterialItems, usedShaders, shaderDict))
+                lodWid.addChild(matLodTop)
 
-                    for shader in usedShaders:
-                        matWid = QtWidgets.QTreeWidgetItem()
-                        matWid.setText(0, shader)
-                        matWid.setText(1, str(shaderDict[shader]))
-                        matLodTop.addChild(matWid)
-                        matWid.selectMe = [shader]
-                    self.export_tree.sortItems(0, QtCore.Qt.SortOrder(0))
+                matLodTop.setText(0, 'MATERIALS (' + str(len(usedShaders)) + ')')
+                matLodTop.selectMe = usedShaders
 
-                    matLodTop.setText(0, 'MATERIALS (' + str(len(usedShaders)) + ')')
-                    matLodTop.selectMe = usedShaders
+                lodWid.selectMe = usedShaders + meshes
 
-                    lodWid.selectMe = usedShaders + meshes
+                allMeshRelated.extend(lodWid.selectMe)
 
-                    allMeshRelated.extend(lodWid.selectMe)
+            meshTop.selectMe = allMeshRelated
 
-                meshTop.selectMe = allMeshRelated
 
 
+        #anim branch
+        animTop = uExportTreeItem()
 
-            #anim branch
-            animTop = QtWidgets.QTreeWidgetItem()
+        jnts = uNode.joints
+        animTop.selectMe = jnts
 
-            animTop.selectMe = uNode.joints
+        if uNode.export_root:
+            if jnts:
+                animTop.setText(0, 'ANIMATION:  (' + str(len(jnts)) + ' JOINTS)')
+        else:
+            animTop.setText(0, 'ANIMATION: NO SKELETON ROOT SET')
+            animTop.setForeground(0, red)
+            wid1.setBackground(0, widRed)
+        animTop.setFlags(QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsEditable | QtCore.Qt.ItemIsUserCheckable)
+        animTop.setCheckState(0, QtCore.Qt.Checked)
+        wid1.addChild(animTop)
+
+        #anims
+        animWid = uExportTreeItem()
+        animWid.setText(0, '<< CURRENT TIME RANGE >>')
+        animTop.addChild(animWid)
+
+        #named clips, checked ones are exported from one bake after the node's other files
+        path = uExportCore.getStoredExportPath(uNode) or ''
+        for clip in uNode.getAnimClips():
+            clipWid = uExportTreeItem()
+            clipText = 'CLIP: ' + clip['name'] + '  (' + str(clip['start']) + ' - ' + str(clip['end']) + ')'
+            if path:
+                clipText += '  > ' + uExportCore.getClipExportPath(path, clip).split('/')[-1]
+            clipWid.setText(0, clipText)
+            clipWid.setFlags(QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsUserCheckable)
+            clipWid.setCheckState(0, QtCore.Qt.Checked)
+            clipWid.clip = clip
+            clipWid.uExport = uNode
+            animTop.addChild(clipWid)
+
+
+        #meta branch
+        metaTop = uExportTreeItem()
+        metaTop.setText(0, 'METADATA')
+        wid1.addChild(metaTop)
+
+        # uexport node meta
+        ueWid = uExportTreeItem()
+        ueWid.setText(0, 'UEXPORT NODE:   ' + str(uNode.node))
+        metaTop.addChild(ueWid)
+        ueWid.selectMe = uNode.node
+
+        #export path meta
+        fpathWid = uExportTreeItem()
+        fpathWid.setText(0, 'EXPORT_FOLDER_PATH:   ' + str(uNode.folder_path))
+        metaTop.addChild(fpathWid)
+
+        fbxInfoRoot = uExportTreeItem()
+        fbxInfoRoot.setText(0, 'FBX_INFO ')
+        metaTop.addChild(fbxInfoRoot)
+        fbxInfoRoot.setExpanded(True)
+        #fbx files meta
+        fbxFiles = uExportTreeItem()
+        fbxFiles.setText(0, 'files ')
+        fbxInfoRoot.addChild(fbxFiles)
+        fileNum = 0
+        for lodNum in lodDicts:
+            if lodDicts[lodNum]['fbx_name']:
+                fbxMeshWid = uExportTreeItem()
+                fbxMeshWid.setText(0, lodDicts[lodNum]['fbx_name'])
+                fbxFiles.addChild(fbxMeshWid)
+                fileNum += 1
+        fbxFiles.setText(0, 'files on disk  (' + str(fileNum) + ')')
+
+        #fbx settings meta
+        fbxProps = uNode.fbxExportProperties
+        fbxDefault = 1
+
+        fbxSettings = uExportTreeItem(populate=functools.partial(self.populateFbxSettingItems, uNode, fbxProps))
+        fbxSettings.setText(0, 'export settings  (default)')
+        if fbxProps != {u'animInterpolation':u'quaternion', u'upAxis':u'default', u'triangulation':False}:
+            fbxSettings.setText(0, 'export settings  (non-default)')
+            fbxDefault = 0
+        fbxInfoRoot.addChild(fbxSettings)
+
+        #if the settings don't match the defaults, set expanded for the user to keep an eye
+        if not fbxDefault:
+            fbxSettings.setExpanded(True)
+
+        #p4
+        if self.p4CHK.isChecked():
+            p4FileList = uExportTreeItem(populate=functools.partial(self.populateP4FileItems, lodDicts))
+            p4FileList.setText(0, 'P4_FILE_LIST')
+            metaTop.addChild(p4FileList)
+        return wid1
+
+    #lazy branches of the export tree, run by the model when the branch is expanded
+    def populateMeshItems(self, meshes, meshStatus, meshLodTop):
+        red = QtGui.QColor(200, 75, 75, 255)
+        blue = QtGui.QColor(50, 130, 210, 255)
+        if meshes:
+            for mesh in meshes:
+                meshWid = uExportTreeItem()
+                meshWid.setText(0, mesh)
+                if meshStatus[mesh] == 'blendshape':
+                    meshWid.setForeground(0, blue)
+                    meshWid.setText(0, mesh + '  (blendshape)')
+                elif meshStatus[mesh] == 'noSkin':
+                    meshWid.setForeground(0, red)
+                    meshWid.setText(0, mesh + ': NO SKINCLUSTER')
+                meshWid.selectMe = [mesh]
+                meshLodTop.addChild(meshWid)
+        else:
+            meshWid = uExportTreeItem()
+            meshWid.setText(0, 'NONE')
+            meshLodTop.addChild(meshWid)
+
+    def populateMaterialItems(self, usedShaders, shaderDict, matLodTop):
+        for shader in usedShaders:
+            matWid = uExportTreeItem()
+            matWid.setText(0, shader)
+            matWid.setText(1, str(shaderDict[shader]))
+            matLodTop.addChild(matWid)
+            matWid.selectMe = [shader]
+
+    def populateFbxSettingItems(self, uNode, fbxProps, fbxSettings):
+        #fbx settings, the combo/checkbox widgets are made when the rows reach the view
+        interpType = uExportTreeItem()
+        interpType.itemWidget = functools.partial(self.makeInterpTypeCmb, uNode, fbxProps)
+        upAxis = uExportTreeItem()
+        upAxis.itemWidget = functools.partial(self.makeUpAxisCmb, uNode, fbxProps)
+        triangulate = uExportTreeItem()
+        triangulate.itemWidget = functools.partial(self.makeTriangulateChk, uNode, fbxProps)
+
+        fbxSettings.addChild(interpType)
+        fbxSettings.addChild(upAxis)
+        fbxSettings.addChild(triangulate)
+
+    def populateP4FileItems(self, lodDicts, p4FileList):
+        #placeholder rows now, the depot info comes in from the P4 worker
+        items = {}
+        for lodNum in lodDicts:
+            fbxName = lodDicts[lodNum]['fbx_name']
+            if fbxName:
+                p4FileWid = uExportTreeItem()
+                p4FileWid.setText(0, fbxName)
+                p4FileWid.setToolTip(0, 'looking up in P4...')
+                p4FileList.addChild(p4FileWid)
+                items.setdefault(fbxName, []).append(p4FileWid)
+        if items:
+            uExportP4.p4Worker.submit(uExportP4.getP4Locations, args=(items.keys(),),
+                                      callback=lambda locations: self.p4LocationsFound.emit(items, locations))
+
+    def setP4FileItems(self, items, locations):
+        for fbxName in items:
+            p4DepotFile = locations.get(fbxName)
+            for p4FileWid in items[fbxName]:
+                if p4DepotFile:
+                    p4FileWid.setText(0, p4DepotFile[1])
+                    #set tool tip with p4 info
+                    p4FileWid.setToolTip(0, p4DepotFile[0] + '\n' + p4DepotFile[2] + '\n' + p4DepotFile[3])
+                else:
+                    p4FileWid.setForeground(0, QtGui.QColor(200, 75, 75, 255))
+                    p4FileWid.setToolTip(0, 'not found in P4')
 
-            if uNode.export_root:
-                jnts = uNode.joints
-                if jnts:
-                    animTop.setText(0, 'ANIMATION:  (' + str(len(uNode.joints)) + ' JOINTS)')
-            else:
-                animTop.setText(0, 'ANIMATION: NO SKELETON ROOT SET')
-                animTop.setForeground(0, red)
-                wid1.setBackground(0, widRed)
-            animTop.setFlags(QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsEditable | QtCore.Qt.ItemIsUserCheckable)
-            animTop.setCheckState(0, QtCore.Qt.Checked)
-            wid1.addChild(animTop)
-
-            #anims
-            animWid = QtWidgets.QTreeWidgetItem()
-            animWid.setText(0, '<< CURRENT TIME RANGE >>')
-            animTop.addChild(animWid)
-
-
-            #meta branch
-            metaTop = QtWidgets.QTreeWidgetItem()
-            metaTop.setText(0, 'METADATA')
-            wid1.addChild(metaTop)
-
-            # uexport node meta
-            ueWid = QtWidgets.QTreeWidgetItem()
-            ueWid.setText(0, 'UEXPORT NODE:   ' + str(uNode.node))
-            metaTop.addChild(ueWid)
-            ueWid.selectMe = uNode.node
-
-            #export path meta
-            fpathWid = QtWidgets.QTreeWidgetItem()
-            fpathWid.setText(0, 'EXPORT_FOLDER_PATH:   ' + str(uNode.folder_path))
-            metaTop.addChild(fpathWid)
-
-            fbxInfoRoot = QtWidgets.QTreeWidgetItem()
-            fbxInfoRoot.setText(0, 'FBX_INFO ')
-            metaTop.addChild(fbxInfoRoot)
-            fbxInfoRoot.setExpanded(True)
-            #fbx files meta
-            fbxFiles = QtWidgets.QTreeWidgetItem()
-            fbxFiles.setText(0, 'files ')
-            fbxInfoRoot.addChild(fbxFiles)
-            fileNum = 0
-            for lodNum in lodDicts:
-                if lodDicts[lodNum]['fbx_name']:
-                    fbxMeshWid = QtWidgets.QTreeWidgetItem()
-                    fbxMeshWid.setText(0, lodDicts[lodNum]['fbx_name'])
-                    fbxFiles.addChild(fbxMeshWid)
-                    fileNum += 1
-            fbxFiles.setText(0, 'files on disk  (' + str(fileNum) + ')')
-
-            #fbx settings meta
-            fbxProps = uNode.fbxExportProperties
-            fbxDefault = 1
-
-            fbxSettings = QtWidgets.QTreeWidgetItem()
-            fbxSettings.setText(0, 'export settings  (default)')
-            if fbxProps != {u'animInterpolation':u'quaternion', u'upAxis':u'default', u'triangulation':False}:
-                fbxSettings.setText(0, 'export settings  (non-default)')
-                fbxDefault = 0
-            fbxInfoRoot.addChild(fbxSettings)
-
-            #fbx settings
-            interpType = QtWidgets.QTreeWidgetItem()
-            interpType_CMB = self.makeTreeCmb(['INTERP TYPE: Quaternion','INTERP TYPE: Euler', 'INTERP TYPE: Resample'], 160)
-            interpType_CMB.currentIndexChanged.connect(functools.partial(self.setAnimInterpolation, interpType_CMB, uNode))
-
-            if fbxProps['animInterpolation'].lower() == 'quaternion':
-                interpType_CMB.setCurrentIndex(0)
-            elif fbxProps['animInterpolation'].lower() == 'euler':
-                interpType_CMB.setCurrentIndex(1)
-            else:
-                interpType_CMB.setCurrentIndex(2)
+    def makeInterpTypeCmb(self, uNode, fbxProps):
+        interpType_CMB = self.makeTreeCmb(['INTERP TYPE: Quaternion','INTERP TYPE: Euler', 'INTERP TYPE: Resample'], 160)
 
+        if fbxProps['animInterpolation'].lower() == 'quaternion':
+            interpType_CMB.setCurrentIndex(0)
+        elif fbxProps['animInterpolation'].lower() == 'euler':
+            interpType_CMB.setCurrentIndex(1)
+        else:
+            interpType_CMB.setCurrentIndex(2)
+        interpType_CMB.currentIndexChanged.connect(functools.partial(self.setAnimInterpolation, interpType_CMB, uNode))
+        return interpType_CMB
 
-            upAxis = QtWidgets.QTreeWidgetItem()
-            upAxis_CMB = self.makeTreeCmb(['UP AXIS: Default','UP AXIS: Y', 'UP AXIS: Z'], 150)
-            upAxis_CMB.currentIndexChanged.connect(functools.partial(self.setUpAxis, upAxis_CMB, uNode))
+    def makeUpAxisCmb(self, uNode, fbxProps):
+        upAxis_CMB = self.makeTreeCmb(['UP AXIS: Default','UP AXIS: Y', 'UP AXIS: Z'], 150)
 
-            if fbxProps['upAxis'].lower() == 'default':
-                upAxis_CMB.setCurrentIndex(0)
-            elif fbxProps['upAxis'].lower() == 'y':
-                upAxis_CMB.setCurrentIndex(1)
-            else:
-                upAxis_CMB.setCurrentIndex(2)
-
-            #triangulate checkbox and logic to write properties
-            triangulate = QtWidgets.QTreeWidgetItem()
-            triangulate_CHK = QtWidgets.QCheckBox(parent=self.export_tree)
-            triangulate_CHK.setText('Triangulate mesh')
-            triangulate_CHK.setChecked(fbxProps['triangulation'])
-            triangulate_CHK.stateChanged.connect(functools.partial(self.setTriangulation, triangulate_CHK, uNode))
-
-            fbxSettings.addChild(interpType)
-            fbxSettings.addChild(upAxis)
-            fbxSettings.addChild(triangulate)
-            self.export_tree.setItemWidget(interpType, 0, interpType_CMB)
-            self.export_tree.setItemWidget(upAxis, 0, upAxis_CMB)
-            self.export_tree.setItemWidget(triangulate, 0, triangulate_CHK)
-
-            #if the settings don't match the defaults, set expanded for the user to keep an eye
-            if not fbxDefault:
-                fbxSettings.setExpanded(True)
-
-            #p4
-            if self.p4CHK.isChecked():
-                p4FileList = QtWidgets.QTreeWidgetItem()
-                p4FileList.setText(0, 'P4_FILE_LIST')
-                metaTop.addChild(p4FileList)
-                for lodNum in lodDicts:
-                    if lodDicts[lodNum]['fbx_name']:
-                        p4DepotFile = self.getP4Location(lodDicts[lodNum]['fbx_name'])
-                        if p4DepotFile:
-                            p4FileWid = QtWidgets.QTreeWidgetItem()
-                            p4FileWid.setText(0, p4DepotFile[1])
-                            p4FileList.addChild(p4FileWid)
-
-                            #set tool tip with p4 info
-                            p4FileWid.setToolTip(0, p4DepotFile[0] + '\n' + p4DepotFile[2] + '\n' + p4DepotFile[3])
-            wid1.sortChildren(0, QtCore.Qt.SortOrder(0))
+        if fbxProps['upAxis'].lower() == 'default':
+            upAxis_CMB.setCurrentIndex(0)
+        elif fbxProps['upAxis'].lower() == 'y':
+            upAxis_CMB.setCurrentIndex(1)
+        else:
+            upAxis_CMB.setCurrentIndex(2)
+        upAxis_CMB.currentIndexChanged.connect(functools.partial(self.setUpAxis, upAxis_CMB, uNode))
+        return upAxis_CMB
+
+    def makeTriangulateChk(self, uNode, fbxProps):
+        #triangulate checkbox and logic to write properties
+        triangulate_CHK = QtWidgets.QCheckBox(parent=self.export_tree)
+        triangulate_CHK.setText('Triangulate mesh')
+        triangulate_CHK.setChecked(fbxProps['triangulation'])
+        triangulate_CHK.stateChanged.connect(functools.partial(self.setTriangulation, triangulate_CHK, uNode))
+        return triangulate_CHK
+
+    def treeItemsInserted(self, tree, model, items):
+        #rows just reached the view: install their item widgets and restore expansion
+        for item in items:
+            for wid in item.walk():
+                index = model.indexFromItem(wid)
+                if wid.itemWidget and not tree.indexWidget(index):
+                    tree.setIndexWidget(index, wid.itemWidget())
+                if wid.expanded and not tree.isExpanded(index):
+                    tree.setExpanded(index, True)
+
+    def treeItemExpanded(self, model, index, expanded=True):
+        model.itemFromIndex(index).expanded = expanded
 
     def makeTreeCmb(self, items, width, select=None):
         if items:
@@ -1166,19 +964,21 @@ class uExportTool(base_class, form_class):
 
     def buildMissingFilesTree(self):
         missingFileDict = self.missingNodes()
+        items = []
         for f in missingFileDict.keys():
-            wid1 = QtWidgets.QTreeWidgetItem()
-            font = wid1.font(0)
-            font.setPointSize(15)
+            wid1 = uExportTreeItem()
 
             wid1.setText(0,f)
 
             wid1.setText(2, missingFileDict[f]['path'])
             wid1.setText(3, missingFileDict[f]['node'])
-            self.missingFilesTree.addTopLevelItem(wid1)
             wid1.selectMe = missingFileDict[f]['node']
+            items.append(wid1)
 
-            self.missingFilesTree.header().resizeSections(QtWidgets.QHeaderView.ResizeToContents)
+        #one insert, one sort and one column resize for the whole list
+        self.missing_model.addTopLevelItems(items)
+        self.missing_model.sort(0, QtCore.Qt.SortOrder(0))
+        self.missingFilesTree.header().resizeSections(QtWidgets.QHeaderView.ResizeToContents)
 
     def createUexportNode_FN(self):
         if cmds.ls(sl=1):
@@ -1189,24 +989,23 @@ class uExportTool(base_class, form_class):
                 #TODO: modal picker with joint filter
                 pass
 
+    def sidecar_FN(self, checked):
+        if checked:
+            uExportCore.sidecarWriter.install()
+        else:
+            uExportCore.sidecarWriter.uninstall()
+
     def getTexturesP4_FN(self):
         missingFileDict = self.missingNodes()
         self.rePathFileNodesP4(missingFileDict)
+        #synced textures are on disk now, don't trust the cached listings
+        uExportCore.textureCache.clear()
 
     def export_FN(self):
         #get what should be export in an exportTask fn
         exportWidgets = self.getExportNodeWidgets()
+        jobs = []
         for wid in exportWidgets:
-            snapConst = None
-            if self.snapRoot_CHK.isChecked():
-                node = self.snapRoot_CMB.currentText()
-                try:
-                    if cmds.objExists(node):
-                        snapConst = cmds.parentConstraint(node, wid.uExport.export_root)
-                    else:
-                        cmds.error('Unable to find node: ' + node)
-                except:
-                    cmds.warning('Could not constrain root' + wid.uExport.export_root + ', is it already constrained?')
             #export
             mpath = cmds.file(sceneName=1, q=1)
             fname = mpath.split('/')[-1]
@@ -1254,64 +1053,112 @@ class uExportTool(base_class, form_class):
                             pass
                         else:
                             meshChk = 0
-
-                start = time.time()
-                #put export into the uExport class later
-                export_success = self.export(wid.uExport, path=userPath, mesh=meshChk)
-                if export_success:
-                    elapsed = (time.time() - start)
-                    print 'uExport>>> Exported ', wid.text(0), 'to', userPath ,'in %.2f seconds.' % elapsed
+                jobs.append((wid, userPath, meshChk, animChk, self.getCheckedClips(wid)))
 
             else:
                 cmds.warning('Invalid path specified: [' + str(userPath) + ']')
+
+        #check out every fbx this export writes, LODs included, before writing any of them
+        plan = uExportCore.getExportPlan([(wid.uExport, userPath, meshChk, animChk) for wid, userPath, meshChk, animChk, clips in jobs],
+                                         exportLODs=self.exportLODs_CHK.isChecked())
+        clipPaths = [uExportCore.getExportPaths(wid.uExport, userPath, clips=clips) if clips else []
+                     for wid, userPath, meshChk, animChk, clips in jobs]
+        allPaths = [path for job in plan for path in job[4]] + [path for paths in clipPaths for path in paths]
+        client = str(self.workSpaceCMB.currentText()) or None
+        failed, pending = uExportCore.prepareExportPaths(allPaths, useP4=self.p4CHK.isChecked() and self.perforce, client=client)
+        if failed:
+            message = "These files are not writable, please ensure you have them checked out:\n\n"
+            message += '\n'.join([path + '  (' + failed[path] + ')' for path in sorted(failed)])
+            message += "\n\nExport the other files anyway?"
+            answer = QtWidgets.QMessageBox.question(self, "Export Warning", message,
+                                                    QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No)
+            if answer != QtWidgets.QMessageBox.Yes:
+                #nothing written, put back what was opened for edit
+                uExportCore.finishExportPaths(pending, client=client, written=[])
+                return False
+
+        #the FBX export dialog may have been touched since the last click, send every flag once,
+        #after that only what differs between nodes/LODs goes to the plugin
+        uExportCore.fbxFlagCache.reset()
+        for (wid, userPath, meshChk, animChk, clips), job, paths in zip(jobs, plan, clipPaths):
+            if [path for path in job[4] + paths if path in failed]:
+                cmds.warning('uExport>>> Skipping ' + wid.text(0) + ', not all of its files are writable.')
+                continue
+
+            snapConst = None
+            if self.snapRoot_CHK.isChecked():
+                node = self.snapRoot_CMB.currentText()
+                try:
+                    if cmds.objExists(node):
+                        snapConst = cmds.parentConstraint(node, wid.uExport.export_root)
+                    else:
+                        cmds.error('Unable to find node: ' + node)
+                except:
+                    cmds.warning('Could not constrain root' + wid.uExport.export_root + ', is it already constrained?')
+
+            start = time.time()
+            #put export into the uExport class later
+            export_success = self.export(wid.uExport, path=userPath, mesh=meshChk)
+            if export_success:
+                elapsed = (time.time() - start)
+                print 'uExport>>> Exported ', wid.text(0), 'to', userPath ,'in %.2f seconds.' % elapsed
+
+            if clips:
+                start = time.time()
+                if self.export(wid.uExport, path=userPath, clips=clips):
+                    print 'uExport>>> Exported', len(clips), 'clips of', wid.text(0), 'in %.2f seconds.' % (time.time() - start)
+
             #cleanup constraint
             if snapConst: cmds.delete(snapConst)
 
+        uExportCore.finishExportPaths(pending, client=client)
+
+    def getCheckedClips(self, wid):
+        #names of the checked clips under the node's animation branch
+        clips = []
+        for c in range(0, wid.childCount()):
+            animTop = wid.child(c)
+            if not animTop.text(0).startswith('ANIMATION'):
+                continue
+            for i in range(0, animTop.childCount()):
+                clipWid = animTop.child(i)
+                if hasattr(clipWid, 'clip') and clipWid.checkState(0) == QtCore.Qt.Checked:
+                    clips.append(clipWid.clip['name'])
+        return clips
+
     def getExportNodeWidgets(self):
         nodes = []
-        for i in range(0, self.export_tree.topLevelItemCount()):
-            if self.export_tree.topLevelItem(i).checkState(0) == QtCore.Qt.Checked:
-                nodes.append(self.export_tree.topLevelItem(i))
+        for i in range(0, self.export_model.topLevelItemCount()):
+            if self.export_model.topLevelItem(i).checkState(0) == QtCore.Qt.Checked:
+                nodes.append(self.export_model.topLevelItem(i))
         return nodes
 
 
-    def check_status(self):
-        for i in range(0, self.export_tree.topLevelItemCount()):
-            if self.export_tree.topLevelItem(i).checkState(0) == QtCore.Qt.Unchecked:
-                for c in range(0, self.export_tree.topLevelItem(i).childCount()):
-                    self.export_tree.topLevelItem(i).child(c).setCheckState(0,QtCore.Qt.Unchecked)
+    def check_status(self, *args):
+        for i in range(0, self.export_model.topLevelItemCount()):
+            if self.export_model.topLevelItem(i).checkState(0) == QtCore.Qt.Unchecked:
+                for c in range(0, self.export_model.topLevelItem(i).childCount()):
+                    self.export_model.topLevelItem(i).child(c).setCheckState(0,QtCore.Qt.Unchecked)
+
+    def itemAt(self, tree, position):
+        index = tree.indexAt(position)
+        if index.isValid():
+            return tree.model().itemFromIndex(index)
+        return None
 
-    def itemClicked(self, *args):
+    def itemClicked(self, model, index):
         #select nodes if there is selection metadata
+        item = model.itemFromIndex(index)
         if self.mousePress is 'left':
-            if hasattr(args[0], 'selectMe'):
-                cmds.select(args[0].selectMe)
+            if hasattr(item, 'selectMe'):
+                cmds.select(item.selectMe)
 
 
 ## P4 CRAP
 ########################################################################
     #check that P4 exists
     def getP4Location(self, asset, root='//depot/ArtSource/', debug=1):
-        from p4python.P4 import P4, P4Exception
-
-        if asset:
-            p4 = P4()
-            try: p4.connect()
-            except:
-                print 'Cannot connect to P4!'
-                return False
-
-            try:
-                file =  p4.run_files(root + '...' + asset)
-                depotLoc = file[0]['depotFile']
-                describe = p4.run_describe(file[0]['change'])
-                return [describe[0]['user'], depotLoc, describe[0]['desc'], file[0]['change']]
-            except Exception as e:
-                print "findFileP4>>>> Cannot find file.", asset
-                if debug: print e
-                return False
-            finally:
-                p4.disconnect()
+        return uExportP4.getP4Location(asset, root=root, debug=debug)
 
     def workspaceSelected(self):
         self.settings = QtCore.QSettings(QtCore.QSettings.IniFormat,QtCore.QSettings.SystemScope, 'uExport', 'settings')
@@ -1322,24 +1169,16 @@ class uExportTool(base_class, form_class):
 
     def getP4Workspaces(self):
         import socket
-        from p4python.P4 import P4, P4Exception
 
         #get computer name
         host = socket.gethostname()
+        uExportP4.p4Worker.submit(uExportP4.getWorkspaces, args=(host,), callback=self.p4WorkspacesFound.emit)
 
-        p4 = P4()
-        try: p4.connect()
-        except:
-            print 'Cannot connect to P4!'
-            return False
-
-        for ws in p4.run('clients', '-u', p4.user):
-            try:
-                if ws['Host'] == host:
-                    self.workSpaceCMB.addItem(ws['client'])
-            except Exception as e:
-                print e
-        p4.disconnect()
+    def setP4Workspaces(self, workspaces):
+        current = [self.workSpaceCMB.itemText(i) for i in range(0, self.workSpaceCMB.count())]
+        for ws in workspaces:
+            if ws not in current:
+                self.workSpaceCMB.addItem(ws)
 
     def colorTreeWidgetItemByName(self, tree, text, color):
         root = tree.invisibleRootItem()
@@ -1356,123 +1195,37 @@ class uExportTool(base_class, form_class):
         if retWid:
             return retWid
 
-    def rePathFileNodesP4(self, missingFileDict, debug=1, checkHash=False):
-        from p4python.P4 import P4, P4Exception
-
+    def rePathFileNodesP4(self, missingFileDict, debug=1, parallel=0):
         if missingFileDict:
-            p4 = P4()
             print self.workSpaceCMB.currentText()
-            p4.client = str(self.workSpaceCMB.currentText())
-            try: p4.connect()
-            except:
-                print 'Cannot connect to P4!'
-                return False
+            with uExportP4.p4Pool.connection(client=str(self.workSpaceCMB.currentText())) as p4:
+                if not p4:
+                    return False
+                resolved = uExportP4.resolveTextures(p4, missingFileDict, self.p4RootLINE.text(), parallel=parallel, debug=debug)
 
             for f in missingFileDict.keys():
-                floppedPath = missingFileDict[f]['path'].replace('\\', '/') + f
-                pathBreak = floppedPath.split('/')
-
-                #find parents since there are dupe files in p4 often
-                parent = None
-                if len(pathBreak) > 1:
-                    parent = pathBreak[-2]
-                parentParent = None
-                if len(pathBreak) > 2:
-                    parentParent = pathBreak[-3]
-
-                depotFileToGrab = None
-
-                files = None
-                try:
-                    files = p4.run_files(self.p4RootLINE.text() + '...' + f)
-                except:
-                    pass
-                if files:
-                    if len(files) > 1:
-                        if debug:
-                            print 'rePathFileNodesP4>>>> Multiple files [', len(files), '] found in depot search path with the name: ' + f
-                            print 'P4 file paths:'
-                            for i in range(0, len(files)):
-                                print files[i]['depotFile']
-                        for i in range(0, len(files)):
-                            try:
-                                newParent = files[i]['depotFile'].split('/')[-2]
-                                if newParent == parent:
-                                    if 'delete' in p4.run('fstat', files[i]['depotFile'])[0]['headAction']:
-                                        print 'INVALID PATH: p4 asset head revision is deleted or moved. depotFile:', files[i]['depotFile']
-                                        continue
-                                    depotFileToGrab = files[i]['depotFile']
-                                    continue
-                                if checkHash:
-                                    dupeCheck(files[i]['depotFile'])
-
-                                #color widget red, change INFO
-                                widc = self.colorTreeWidgetItemByName(self.missingFilesTree, f, QtGui.QColor(200, 75, 75, 255))
-                                widc.setText(1, 'NOT FOUND')
-
-                            except Exception as e:
-                                if debug:
-                                    print e
-                        print 'rePathFileNodesP4>>>> No file path similarities to path:', floppedPath
-                    else:
-                        print 'rePathFileNodesP4>>>> File found on depot: ', files[0]['depotFile']
-                        depotFileToGrab = files[0]['depotFile']
-
-                else:
-                    print 'rePathFileNodesP4>>>> FILE NOT FOUND IN PERFORCE SEARCH PATH - fName:', f, 'searchPath:', self.p4RootLINE.text()
-                    #color widget red, change INFO
-                    widc = self.colorTreeWidgetItemByName(self.missingFilesTree, f, QtGui.QColor(200, 75, 75, 255))
-                    widc.setText(1, 'NOT FOUND')
-
-
                 #if we found it in the depot
-                if depotFileToGrab:
-                    print 'GRABBING: ', depotFileToGrab
-                    try:
-                        p4.run('sync', ' -f', depotFileToGrab)
-                    except Exception as e:
-                        if 'up-to-date' in e.message:
-                            pass
-                        else:
-                            print e
-
-                    fileFstat = p4.run('fstat', depotFileToGrab)[0]
-                    print fileFstat
-                    newPath = fileFstat['clientFile']
-                    newPath = newPath.replace('\\','/')
-
-                    if debug: print 'rePathFileNodesP4>>>> NEW PATH>>', newPath, '\n\n'
+                if resolved[f]['status'] == 'FOUND':
+                    newPath = resolved[f]['clientFile']
+                    if debug: print 'rePathFileNodesP4>>>> NEW PATH>>', newPath
                     cmds.setAttr((missingFileDict[f]['node'] + '.fileTextureName'), newPath, type='string')
                     #color widget green, change info
-                    widc = self.colorTreeWidgetItemByName(self.missingFilesTree, f, QtGui.QColor(40, 230, 160, 255))
-                    widc.setText(1, 'FOUND')
-
-                self.repaint()
-
-            p4.disconnect()
+                    widc = self.colorTreeWidgetItemByName(self.missing_model, f, QtGui.QColor(40, 230, 160, 255))
+                    if widc: widc.setText(1, 'FOUND')
+                else:
+                    #color widget red, change INFO
+                    widc = self.colorTreeWidgetItemByName(self.missing_model, f, QtGui.QColor(200, 75, 75, 255))
+                    if widc: widc.setText(1, resolved[f]['status'])
+            self.repaint()
 
 
 ## UEXPORT NODE
 ########################################################################
     def getExportNodes(self):
-        return cmds.ls('*.uexport_ver', o=1, r=1)
+        return uExportCore.getExportNodes()
 
     def connectRoot(self, uNode, root, rewire=1):
-        try:
-            cmds.undoInfo(openChunk=True)
-            if rewire:
-                conns = cmds.listConnections(uNode + '.export_root', plugs=1, source=1)
-                if conns:
-                    for conn in conns:
-                        cmds.disconnectAttr(conn, uNode + '.export_root')
-
-            if not attrExists(root+'.export'):
-                cmds.addAttr(root, longName='export', attributeType='message')
-            cmds.connectAttr(root + '.export', uNode + '.export_root' )
-        except Exception as e:
-            print e
-        finally:
-            cmds.undoInfo(closeChunk=True)
+        return uExportCore.connectRoot(uNode, root, rewire=rewire)
 
     def create(self, renderMeshes=None, rootJoint=None, strName='uExport', lods=1):
 
@@ -1494,7 +1247,7 @@ class uExportTool(base_class, form_class):
                 cmds.addAttr(uExportNode, ln='export_root', at='message')
                 cmds.addAttr(uExportNode, ln='materials', at='message')
                 cmds.addAttr(uExportNode, ln='uexport_ver', dt='string')
-                cmds.setAttr(uExportNode + '.uexport_ver', '1.0', type='string')
+                cmds.setAttr(uExportNode + '.uexport_ver', uExportCore.UEXPORT_VER, type='string')
                 cmds.addAttr(uExportNode, ln='folder_path', dt='string')
                 cmds.addAttr(uExportNode, ln='asset_name', dt='string')
                 cmds.addAttr(uExportNode, ln='fbx_name', dt='string')
@@ -1522,6 +1275,9 @@ class uExportTool(base_class, form_class):
                     #internal ART stuff
                     cmds.setAttr(uExportNode + '.asset_name', text, type='string')
 
+                #LOD attrs etc
+                uExportCore.migrateExportNode(uExportNode)
+
             except Exception as e:
                 cmds.warning(e)
                 print 'Locals: ' + str(locals())
@@ -1556,16 +1312,7 @@ class uExportTool(base_class, form_class):
 ########################################################################
 
     def missingNodes(self):
-        fileNodes = cmds.ls(type='file')
-        missingFiles = {}
-        for f in fileNodes:
-            filePath = cmds.getAttr(f + '.fileTextureName')
-            if filePath != '':
-                if not cmds.file(filePath, exists=1, q=1):
-                    fileName = filePath.split('/')[-1]
-                    path = filePath.replace(fileName,'')
-                    missingFiles[fileName] = {'path':path, 'node':f}
-        return missingFiles
+        return uExportCore.missingNodes()
 
 
 ## SANITY CHECK
@@ -1573,10 +1320,7 @@ class uExportTool(base_class, form_class):
 
     #general methods
     def hasPrefix(self, obj, prefix, fix=1):
-        if obj.startswith(prefix):
-            return True
-        else:
-            return False
+        return uExportCore.hasPrefix(obj, prefix, fix=fix)
 
     #triggers
     #TODO: remove issue class usage, hook up
@@ -1640,185 +1384,32 @@ class uExportTool(base_class, form_class):
 ########################################################################
 
     #TODO: Find and export blendshape meshes!
-    def setExportFlags(self, uNode):
-
-        # set export properties from the fbxExportPropertiesDict of the uNode
-        fbxDict = uNode.fbxExportProperties
-        if fbxDict['triangulation'] == True:
-            mel.eval("FBXExportTriangulate -v true")
-        else:
-            mel.eval("FBXExportTriangulate -v false")
-
-        # Mesh
-        mel.eval("FBXExportSmoothingGroups -v true")
-        mel.eval("FBXExportHardEdges -v false")
-        mel.eval("FBXExportTangents -v true")
-        mel.eval("FBXExportInstances -v false")
-        mel.eval("FBXExportInAscii -v true")
-        mel.eval("FBXExportSmoothMesh -v false")
-
-        # Animation
-        mel.eval("FBXExportBakeResampleAnimation -v true")
-        mel.eval("FBXExportBakeComplexAnimation -v true")
-        mel.eval("FBXExportBakeComplexStart -v "+str(cmds.playbackOptions(minTime=1, q=1)))
-        mel.eval("FBXExportBakeComplexEnd -v "+str(cmds.playbackOptions(maxTime=1, q=1)))
-        mel.eval("FBXExportReferencedAssetsContent -v true")
-        mel.eval("FBXExportBakeComplexStep -v 1")
-        mel.eval("FBXExportUseSceneName -v false")
-        mel.eval("FBXExportQuaternion -v quaternion")
-        mel.eval("FBXExportShapes -v true")
-        mel.eval("FBXExportSkins -v true")
-
-        if fbxDict['animInterpolation'] == 'euler':
-            mel.eval("FBXExportQuaternion -v euler")
-        elif fbxDict['animInterpolation'] == 'resample':
-            mel.eval("FBXExportQuaternion -v resample")
-
-        if fbxDict['upAxis'].lower() == 'y':
-            print 'FBX EXPORT OVERRIDE: setting y up axis'
-            mel.eval("FBXExportUpAxis y")
-        elif fbxDict['upAxis'].lower() == 'z':
-            print 'FBX EXPORT OVERRIDE: setting Z up axis'
-            mel.eval("FBXExportUpAxis z")
-
-        #garbage we don't want
-        # Constraints
-        mel.eval("FBXExportConstraints -v false")
-        # Cameras
-        mel.eval("FBXExportCameras -v false")
-        # Lights
-        mel.eval("FBXExportLights -v false")
-        # Embed Media
-        mel.eval("FBXExportEmbeddedTextures -v false")
-        # Connections
-        mel.eval("FBXExportInputConnections -v false")
-
-    def export(self, uNode, mesh=1, anim=1, path=None,bake=False):
+    def setExportFlags(self, uNode, force=False):
+        return uExportCore.setExportFlags(uNode, force=force)
 
+    def export(self, uNode, mesh=1, anim=1, path=None, bake=False, clips=None):
         # check if the file is checked out/writeable
-        if os.path.isfile(path):
-            file_stat = os.stat(path)[0]
-            if not file_stat & stat.S_IWRITE:
-                message = "Please ensure you have {0} checked out".format(path)
-                return QtWidgets.QMessageBox.information(QtWidgets.QWidget(), "Export Warning", message)
-
-        toExport = []
-
-        if not path:
-            oldPath = path
-            path = cmds.file(sceneName=1, q=1)
-            cmds.warning('No valid path set for export [' + str(oldPath) + ']/nExporting to Maya file loc: ' + path)
-            toExport.extend(cmds.listRelatives(uNode.export_root, type='joint',allDescendents=True,f=1))
-
-
-        #kvassey -- adding support for baking to root in rig before export
-        if self.bakeRoot_CHK.isChecked():
-            print "Bake Root Checked"
-            #copy root skeleton with input connections under new group
-            cmds.select(cl=True)
-            currRoot = uNode.export_root
-            exportSkel = cmds.duplicate(currRoot, un=True, rc=False, po=False)
-            tempGrp = cmds.group(exportSkel[0])
-            #rename root joint
-            dupRoot = cmds.rename(exportSkel[0], currRoot)
-            #bake
-            startTime = cmds.playbackOptions(min=True, q=True)
-            endTime = cmds.playbackOptions(max=True, q=True)
-            cmds.bakeResults(dupRoot, sm=True,  hi="below", s=True, sb=1, dic=True, t=(startTime, endTime))
-
-            #move FBX export inside here, skip rest.
-            #toExport.extend(cmds.listRelatives(cmds.listConnections(dupRoot), type='joint',allDescendents=True))
-            #cmds.select(toExport)
-            cmds.select(dupRoot, r=True, hi=True)
-            toExport = cmds.ls(sl=True, type='joint')
-            cmds.select(toExport, r=True)
-            self.setExportFlags(uNode)
-            # Export!
-            print "FBXExport -f \""+ path +"\" -s"
-            mel.eval("FBXExport -f \""+ path +"\" -s")
-
-            cmds.delete(tempGrp)
-            toExport = []
-
-
-        #Assuming the meshes are skinned, maybe work with static later
-        else:
-            exportScript = False
-
-            if mesh:
-                #we're not exporting LODs
-                if not self.exportLODs_CHK.isChecked():
-                    meshes = uNode.rendermeshes_LOD0
-                    if meshes:
-                        toExport.extend(uNode.rendermeshes_LOD0)
-                    else:
-                        cmds.warning('uExport>>> export: No rendermeshes found.')
-                #ok, we're exporting LODs
-                else:
-                    lodDicts = uNode.getLodDicts()
-                    if lodDicts:
-                        if self.exportLODs_CHK.isChecked():
-                            for lodNum in lodDicts:
-                                #check that there are meshes to be exported at this LOD
-                                if lodDicts[lodNum]['meshes']:
-                                    #check if there is a script
-                                    if lodDicts[lodNum]['export_script']:
-                                        if self.resetAfterExport_CHK.isChecked():
-                                            # Warn the user that this operation will save their file.
-                                            saveResult = 'Yes'
-                                            if not self.suppressSaveCHK.isChecked():
-                                                saveResult = cmds.confirmDialog(title = "Save Warning", message="In order to continue your file must be saved.  Would you like to save it?  If yes it will be saved and after the operation is complete your file will be re-opened.", button = ["Save and Continue", "Continue Without Saving"], defaultButton='Save and Continue', cancelButton='Continue Without Saving', dismissString='Continue Without Saving')
-                                            if saveResult == 'Yes':
-                                                cmds.file(save=True)
-                                            else:
-                                                cmds.warning('You chose not to save changes. Big-boy pants.')
-
-                                            filePath = lodDicts[lodNum]['export_script']
-
-                                            exportScript = True
-                                            if os.path.isfile(filePath):
-                                                uExportNode = uNode
-                                                execfile(filePath)
-                                            else:
-                                                cmds.error('UEXPORT>> Cannot find export script: ' + filePath)
-
-                                    #add items for export
-                                    toExport.extend(lodDicts[lodNum]['meshes'])
-                                    toExport.extend(cmds.listRelatives(uNode.export_root, type='joint',allDescendents=True, f=1))
-
-                                    #setup export
-                                    cmds.select(toExport)
-                                    self.setExportFlags(uNode)
-                                    new_fpath = path[:-4] + '_LOD' + str(lodNum) + '.fbx'
-
-                                    #look for lod name overrides
-                                    if lodDicts[lodNum]['fbx_name']:
-                                        justFilePath = path.replace(path.split('/')[-1],'')
-                                        new_fpath = justFilePath + lodDicts[lodNum]['fbx_name']
-
-                                    # Export!
-                                    print "FBXExport -f \"" + new_fpath + "\" -s"
-                                    mel.eval("FBXExport -f \"" + new_fpath + "\" -s")
-
-                                    if exportScript:
-                                        # Re-open the file without saving.
-                                        fullPath = cmds.file(q = True, sceneName = True)
-                                        cmds.file(fullPath, open=True, f=True)
-
-                                    #clear sel and export list
-                                    cmds.select(d=1)
-                                    toExport = []
-
-            if not self.exportLODs_CHK.isChecked():
-                if anim:
-                    toExport.extend(cmds.listRelatives(uNode.export_root, type='joint', allDescendents=True, f=1) or [])
-
-                    cmds.select(toExport)
-                    self.setExportFlags(uNode)
-                    # Export!
-                    print "FBXExport -f \""+ path +"\" -s"
-                    mel.eval("FBXExport -f \""+ path +"\" -s")
-        return True
+        if not uExportCore.isWritable(path):
+            message = "Please ensure you have {0} checked out".format(path)
+            return QtWidgets.QMessageBox.information(QtWidgets.QWidget(), "Export Warning", message)
+
+        #no refresh or second export from this window while this one runs
+        self.setEnabled(False)
+        try:
+            return uExportCore.export(uNode, mesh=mesh, anim=anim, path=path, bake=self.bakeRoot_CHK.isChecked(),
+                                      exportLODs=self.exportLODs_CHK.isChecked(),
+                                      resetAfterExport=self.resetAfterExport_CHK.isChecked(),
+                                      suppressSave=self.suppressSaveCHK.isChecked(),
+                                      lodWorkers=self.lodWorkers_SPN.value(), log=self.workerLog,
+                                      incremental=self.incremental_CHK.isChecked(), clips=clips)
+        finally:
+            self.setEnabled(True)
+
+    def workerLog(self, jobId, line):
+        #LOD worker output arrives while export() waits on the pool: repaint so the log shows up,
+        #but leave clicks and keys queued, nothing in Maya may run in the middle of an export
+        print '[' + str(jobId) + '] ' + line
+        QtWidgets.QApplication.processEvents(QtCore.QEventLoop.ExcludeUserInputEvents)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,371 @@
+'''
+uExportBatch
+Runs uExport exports in headless mayapy worker processes.
+
+WorkerPool starts at most maxWorkers processes at a time and streams their output back line by line.
+Nothing here imports Maya until a worker actually runs, so the pool also works from plain python.
+The worker command is [mayapy, uExportBatch.py] unless UEXPORT_WORKER overrides it, e.g. with a stub
+script that just prints a result line.
+
+Exporting every uExport node of many scenes to their stored folder_path/fbx_name, 4 scenes at a time:
+mayapy uExportBatch.py export "D:/chars/*.ma" --list more_scenes.txt --workers 4 --lods --report report.json
+
+Or the scenes a uExportIndex database says export the hero asset, without opening any scene to find out:
+mayapy uExportBatch.py export --index D:/project/uExport_index.db --asset hero --workers 4
+
+Exporting one LOD in a worker (what export() does with lodWorkers > 0):
+mayapy uExportBatch.py lod --scene D:/char.ma --node uExport --lod 2 --path D:/export/char.fbx
+'''
+
+import os
+import sys
+import glob
+import json
+import time
+import shlex
+import Queue
+import argparse
+import threading
+import traceback
+import subprocess
+
+import uExportScan
+
+#the last line a worker prints starting with this is its result, the rest is log
+RESULT_PREFIX = 'uExportResult>>> '
+
+
+def getMayapy():
+    if os.environ.get('UEXPORT_MAYAPY'):
+        return os.environ['UEXPORT_MAYAPY']
+    exe = 'mayapy.exe' if sys.platform.startswith('win') else 'mayapy'
+    mayaLocation = os.environ.get('MAYA_LOCATION')
+    if mayaLocation:
+        return os.path.join(mayaLocation, 'bin', exe)
+    return exe
+
+def getWorkerCommand():
+    if os.environ.get('UEXPORT_WORKER'):
+        return shlex.split(os.environ['UEXPORT_WORKER'])
+    return [getMayapy(), os.path.abspath(__file__.replace('.pyc', '.py'))]
+
+
+## WORKER POOL
+########################################################################
+
+class WorkerPool(object):
+    '''
+    pool = WorkerPool(maxWorkers=4)
+    pool.start([('LOD1', ['lod', '--scene', scene, ...]), ...])
+    ...do other work...
+    results = pool.wait()    #{jobId: {'returncode', 'elapsed', 'result', 'log'}}
+
+    log(jobId, line) is called on the thread calling wait(), defaults to printing.
+    A job whose process can't be started (no mayapy, bad path) gets returncode None and its 'startError'.
+    '''
+    def __init__(self, maxWorkers=4, command=None, log=None):
+        self.maxWorkers = max(1, maxWorkers)
+        self.command = command or getWorkerCommand()
+        self.log = log or self.printLog
+        self.pending = []
+        self.running = {}
+        self.results = {}
+        self.queue = Queue.Queue()
+
+    def printLog(self, jobId, line):
+        print '[' + str(jobId) + '] ' + line
+
+    def start(self, jobs):
+        self.pending.extend(jobs)
+        self.fill()
+
+    def fill(self):
+        while self.pending and len(self.running) < self.maxWorkers:
+            jobId, args = self.pending.pop(0)
+            try:
+                proc = subprocess.Popen(self.command + list(args), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                        universal_newlines=True)
+            except OSError as e:
+                line = 'could not start ' + ' '.join(self.command) + ': ' + str(e)
+                self.log(jobId, line)
+                self.results[jobId] = {'returncode':None, 'elapsed':0.0, 'result':None, 'log':[line], 'startError':str(e)}
+                continue
+            reader = threading.Thread(target=self.read, args=(jobId, proc.stdout))
+            reader.daemon = True
+            reader.start()
+            self.running[jobId] = {'proc':proc, 'start':time.time(), 'log':[], 'result':None}
+
+    def read(self, jobId, stream):
+        for line in iter(stream.readline, ''):
+            self.queue.put((jobId, line.rstrip('\r\n')))
+        stream.close()
+        self.queue.put((jobId, None))
+
+    def wait(self):
+        while self.running or self.pending:
+            try:
+                jobId, line = self.queue.get(timeout=0.1)
+            except Queue.Empty:
+                continue
+            job = self.running[jobId]
+            if line is None:
+                #output closed, the process is done
+                returncode = job['proc'].wait()
+                self.results[jobId] = {'returncode':returncode, 'elapsed':time.time() - job['start'],
+                                       'result':job['result'], 'log':job['log']}
+                del self.running[jobId]
+                self.fill()
+            elif line.startswith(RESULT_PREFIX):
+                try:
+                    job['result'] = json.loads(line[len(RESULT_PREFIX):])
+                except ValueError:
+                    job['log'].append(line)
+                    self.log(jobId, line)
+            else:
+                job['log'].append(line)
+                self.log(jobId, line)
+        return self.results
+
+    def run(self, jobs):
+        self.start(jobs)
+        return self.wait()
+
+
+## WORKERS
+########################################################################
+
+def emitResult(result):
+    print RESULT_PREFIX + json.dumps(result)
+    sys.stdout.flush()
+
+def initializeMaya():
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+    import maya.cmds as cmds
+    if not cmds.pluginInfo('fbxmaya', q=True, loaded=True):
+        cmds.loadPlugin('fbxmaya')
+
+def lodWorker(args):
+    '''
+    Opens the scene, runs the LOD's export script and writes its fbx, the scene is thrown away after
+    '''
+    result = {'scene':args.scene, 'node':args.node, 'lod':args.lod, 'fbx':None, 'ok':False}
+    try:
+        initializeMaya()
+        import maya.cmds as cmds
+        import uExportCore
+        cmds.file(args.scene, open=True, force=True)
+        uNode = uExportCore.uExport(args.node)
+        result['fbx'] = uExportCore.exportLod(uNode, args.lod, args.path)
+        result['ok'] = True
+    except Exception:
+        traceback.print_exc()
+    emitResult(result)
+    return 0 if result['ok'] else 1
+
+def sceneWorker(args):
+    '''
+    Opens one scene and exports every uExport node to its stored path, the scene is never saved
+    '''
+    start = time.time()
+    result = {'scene':args.scene, 'ok':False, 'open':None, 'nodes':[]}
+    try:
+        initializeMaya()
+        import maya.cmds as cmds
+        import uExportCore
+
+        cmds.file(args.scene, open=True, force=True)
+        result['open'] = time.time() - start
+
+        jobs = []
+        for node in uExportCore.getExportNodes():
+            uNode = uExportCore.uExport(node)
+            path = uExportCore.getStoredExportPath(uNode)
+            nodeResult = {'node':node, 'asset':uNode.asset_name, 'fbx':path, 'status':'skipped', 'outputs':[], 'elapsed':0.0}
+            result['nodes'].append(nodeResult)
+            if not path:
+                nodeResult['error'] = 'no folder_path/fbx_name stored on the node'
+                continue
+            #nodes without clips export the scene's time range as before
+            clips = True if args.clips and uNode.getAnimClips() else None
+            nodeResult['outputs'] = uExportCore.getExportPaths(uNode, path, mesh=args.mesh, anim=args.anim, exportLODs=args.lods, clips=clips)
+            jobs.append((uNode, path, clips, nodeResult))
+
+        failed, pending = uExportCore.prepareExportPaths([p for job in jobs for p in job[3]['outputs']], useP4=args.p4)
+        for uNode, path, clips, nodeResult in jobs:
+            notWritable = [p for p in nodeResult['outputs'] if p in failed]
+            if notWritable:
+                nodeResult['status'] = 'failed'
+                nodeResult['error'] = 'not writable: ' + ', '.join(notWritable)
+                continue
+            nodeStart = time.time()
+            try:
+                incremental = False
+                if args.incremental:
+                    incremental = uExportCore.getExportFingerprints(uNode, path, mesh=args.mesh, anim=args.anim, exportLODs=args.lods, clips=clips)
+                    nodeResult['stale'] = uExportCore.getStaleExports(incremental)
+                if incremental and not nodeResult['stale']:
+                    nodeResult['status'] = 'uptodate'
+                else:
+                    ok = uExportCore.export(uNode, mesh=args.mesh, anim=args.anim, path=path, exportLODs=args.lods,
+                                            resetAfterExport=True, suppressSave=True, saveBeforeScripts=False,
+                                            incremental=incremental, clips=clips)
+                    nodeResult['status'] = 'exported' if ok else 'failed'
+            except Exception as e:
+                traceback.print_exc()
+                nodeResult['status'] = 'failed'
+                nodeResult['error'] = str(e)
+            nodeResult['elapsed'] = time.time() - nodeStart
+            print 'uExportBatch>>> ' + nodeResult['status'] + ' ' + uNode.node + ' -> ' + path + ' in %.2f seconds.' % nodeResult['elapsed']
+        uExportCore.finishExportPaths(pending)
+
+        result['ok'] = not [n for n in result['nodes'] if n['status'] == 'failed']
+    except Exception as e:
+        traceback.print_exc()
+        result['error'] = str(e)
+    result['elapsed'] = time.time() - start
+    emitResult(result)
+    return 0 if result['ok'] else 1
+
+
+## BATCH EXPORT
+########################################################################
+
+def expandScenes(patterns, listFiles=()):
+    '''
+    Scene paths from globs and from text files with one path or glob per line, in order, without dupes
+    '''
+    patterns = list(patterns)
+    for listFile in listFiles:
+        with open(listFile, 'r') as f:
+            patterns.extend([line.strip() for line in f if line.strip() and not line.startswith('#')])
+    scenes = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for scene in matches:
+            scene = os.path.abspath(scene)
+            if scene not in scenes:
+                scenes.append(scene)
+    return scenes
+
+def indexedScenes(indexPath, assets=()):
+    '''
+    Scenes with uExport nodes from a uExportIndex database, only those exporting one of assets if given
+    '''
+    import uExportIndex
+    index = uExportIndex.SceneIndex(indexPath)
+    try:
+        if not assets:
+            return index.scenes(withNodes=True)
+        scenes = []
+        for asset in assets:
+            scenes.extend([node['scene'] for node in index.nodes(asset=asset) if node['scene'] not in scenes])
+        return scenes
+    finally:
+        index.close()
+
+def batchExport(scenes, workers=4, lods=False, mesh=True, anim=True, p4=False, incremental=False, clips=False, report=None, log=None):
+    '''
+    Exports every scene in its own worker process, returns the report dict and writes it as json if report is a path
+    '''
+    start = time.time()
+    args = []
+    if lods: args.append('--lods')
+    if not mesh: args.append('--no-mesh')
+    if not anim: args.append('--no-anim')
+    if p4: args.append('--p4')
+    if incremental: args.append('--incremental')
+    if clips: args.append('--clips')
+
+    #a fresh sidecar saying there are no uExport nodes saves opening the scene
+    empty = [scene for scene in scenes if uExportScan.readSidecar(scene) == []]
+
+    pool = WorkerPool(maxWorkers=workers, log=log)
+    results = pool.run([(scene, ['scene', '--scene', scene] + args) for scene in scenes if scene not in empty])
+
+    sceneReports = []
+    for scene in scenes:
+        if scene in empty:
+            sceneReports.append({'scene':scene, 'ok':True, 'nodes':[], 'open':None, 'elapsed':0.0, 'wallTime':0.0,
+                                 'returncode':None, 'note':'no uExport nodes in the sidecar, not opened'})
+            continue
+        res = results.get(scene, {})
+        error = 'could not start worker: ' + res['startError'] if res.get('startError') else 'worker died, see log'
+        sceneReport = res.get('result') or {'scene':scene, 'ok':False, 'nodes':[], 'error':error}
+        sceneReport['returncode'] = res.get('returncode')
+        sceneReport['wallTime'] = res.get('elapsed')
+        if not sceneReport['ok']:
+            sceneReport['log'] = res.get('log', [])[-50:]
+        sceneReports.append(sceneReport)
+
+    nodes = [n for r in sceneReports for n in r['nodes']]
+    batchReport = {'started':time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start)),
+                   'elapsed':time.time() - start,
+                   'workers':workers,
+                   'options':{'lods':lods, 'mesh':mesh, 'anim':anim, 'p4':p4, 'incremental':incremental, 'clips':clips},
+                   'summary':{'scenes':len(scenes),
+                              'scenesFailed':len([r for r in sceneReports if not r['ok']]),
+                              'exported':len([n for n in nodes if n['status'] == 'exported']),
+                              'uptodate':len([n for n in nodes if n['status'] == 'uptodate']),
+                              'skipped':len([n for n in nodes if n['status'] == 'skipped']),
+                              'failed':len([n for n in nodes if n['status'] == 'failed'])},
+                   'scenes':sceneReports}
+    if report:
+        with open(report, 'w') as f:
+            json.dump(batchReport, f, indent=2, sort_keys=True)
+    return batchReport
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='uExport headless workers')
+    sub = parser.add_subparsers(dest='mode')
+
+    lod = sub.add_parser('lod', help='export one LOD of one uExport node')
+    lod.add_argument('--scene', required=True)
+    lod.add_argument('--node', required=True)
+    lod.add_argument('--lod', type=int, required=True)
+    lod.add_argument('--path', required=True, help='main fbx path, the LOD path is derived from it')
+
+    def exportFlags(p):
+        p.add_argument('--lods', action='store_true', help='export LODs instead of the single fbx')
+        p.add_argument('--no-mesh', dest='mesh', action='store_false')
+        p.add_argument('--no-anim', dest='anim', action='store_false')
+        p.add_argument('--p4', action='store_true', help='check the fbx files out before exporting')
+        p.add_argument('--incremental', action='store_true', help='skip fbx files whose inputs match the uExport_manifest.json beside them')
+        p.add_argument('--clips', action='store_true', help="export each node's anim clips instead of the scene's time range")
+
+    batch = sub.add_parser('export', help='export every uExport node of many scenes')
+    batch.add_argument('scenes', nargs='*', help='scene paths or globs')
+    batch.add_argument('--list', action='append', default=[], help='text file with one scene path or glob per line')
+    batch.add_argument('--workers', type=int, default=4)
+    batch.add_argument('--report', default='uExport_report.json')
+    batch.add_argument('--index', help='also export the indexed scenes (uExportIndex.py) that have uExport nodes')
+    batch.add_argument('--asset', action='append', default=[], help='with --index, only scenes exporting this asset')
+    exportFlags(batch)
+
+    scene = sub.add_parser('scene', help='worker: export every uExport node of one scene')
+    scene.add_argument('--scene', required=True)
+    exportFlags(scene)
+
+    args = parser.parse_args(argv)
+    if args.mode == 'lod':
+        return lodWorker(args)
+    elif args.mode == 'scene':
+        return sceneWorker(args)
+    elif args.mode == 'export':
+        scenes = expandScenes(args.scenes, args.list)
+        if args.index:
+            scenes.extend([scene for scene in indexedScenes(args.index, args.asset) if scene not in scenes])
+        if not scenes:
+            print 'uExportBatch>>> No scenes found.'
+            return 1
+        print 'uExportBatch>>> Exporting', len(scenes), 'scenes on', args.workers, 'workers'
+        batchReport = batchExport(scenes, workers=args.workers, lods=args.lods, mesh=args.mesh, anim=args.anim,
+                                  p4=args.p4, incremental=args.incremental, clips=args.clips, report=args.report)
+        summary = batchReport['summary']
+        print 'uExportBatch>>> %(exported)d exported, %(uptodate)d up to date, %(skipped)d skipped, %(failed)d failed' % summary,
+        print 'in %.1f seconds, report: %s' % (batchReport['elapsed'], args.report)
+        return 0 if not summary['failed'] and not summary['scenesFailed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,383 @@
+'''
+uExportBench
+Timing harness for the uExport core, run it in mayapy or the script editor on an empty scene:
+
+import uExportBench as ueb
+ueb.benchNodeConstruction(nodes=200)
+
+Every bench builds its own synthetic scene with cmds.file(new=True, f=True), so don't run it in a scene you care about.
+'''
+
+import os
+import time
+import tempfile
+
+import maya.cmds as cmds
+
+import uExportCore
+import uExportScan
+from uExportFakes import FakeP4, legacyResolveTextures, buildFakeTextureDepot
+
+
+def timeIt(fn, *args, **kwargs):
+    start = time.time()
+    result = fn(*args, **kwargs)
+    return (time.time() - start), result
+
+def report(name, rows):
+    print 'uExportBench>>> ' + name
+    for row in rows:
+        print '    ' + '  '.join([str(col).ljust(14) for col in row])
+
+
+## SYNTHETIC SCENES
+########################################################################
+
+def buildExportNode(name, meshesPerLod=None, root=None, lods=5, artMetadata=True):
+    '''
+    Makes a uExport node with every attr the tool creates, without the tool's input dialogs
+    '''
+    uExportNode = cmds.group(em=1, name=name)
+    cmds.addAttr(uExportNode, ln='export_root', at='message')
+    cmds.addAttr(uExportNode, ln='materials', at='message')
+    cmds.addAttr(uExportNode, ln='uexport_ver', dt='string')
+    cmds.setAttr(uExportNode + '.uexport_ver', '1.0', type='string')
+    cmds.addAttr(uExportNode, ln='folder_path', dt='string')
+    cmds.addAttr(uExportNode, ln='asset_name', dt='string')
+    cmds.setAttr(uExportNode + '.asset_name', name, type='string')
+    cmds.addAttr(uExportNode, ln='fbx_name', dt='string')
+    cmds.addAttr(uExportNode, ln='lodNum', at='byte')
+    cmds.setAttr(uExportNode + '.lodNum', lods)
+    if artMetadata:
+        for att in uExportCore.ART_ATTRS:
+            cmds.addAttr(uExportNode, ln=att, dt='string')
+    for lod in uExportCore.LOD_RANGE:
+        cmds.addAttr(uExportNode, ln='rendermeshes_LOD' + str(lod), at='message')
+        cmds.addAttr(uExportNode, ln='export_script_LOD' + str(lod), dt='string')
+        cmds.addAttr(uExportNode, ln='fbx_name_LOD' + str(lod), dt='string')
+    cmds.addAttr(uExportNode, ln='fbxPropertiesDict', dt='string')
+    cmds.setAttr(uExportNode + '.fbxPropertiesDict', '{"animInterpolation": "quaternion", "upAxis": "default", "triangulation": false}', type='string')
+
+    if meshesPerLod:
+        for lod, meshes in enumerate(meshesPerLod):
+            for mesh in meshes:
+                uExportCore.msgConnect(uExportNode + '.rendermeshes_LOD' + str(lod), mesh + '.uExport')
+    if root:
+        cmds.addAttr(root, longName='export', attributeType='message')
+        cmds.connectAttr(root + '.export', uExportNode + '.export_root')
+    return uExportNode
+
+def buildExportNodeScene(nodes=200, meshesPerNode=2):
+    cmds.file(new=True, f=True)
+    uNodes = []
+    for i in range(0, nodes):
+        meshes = [cmds.polyCube(name='bench_' + str(i) + '_mesh' + str(m), ch=0)[0] for m in range(0, meshesPerNode)]
+        cmds.select(cl=1)
+        root = cmds.joint(name='bench_' + str(i) + '_root')
+        uNodes.append(buildExportNode('bench_' + str(i) + '_uExport', meshesPerLod=[meshes], root=root))
+    return uNodes
+
+
+## NODE CONSTRUCTION
+########################################################################
+
+def legacyNodeRead(node):
+    '''
+    The old per attribute reads uExport.__init__ used to do, kept as the 'before' number
+    '''
+    values = {}
+    for att in ('rendermeshes_LOD0', 'export_script_LOD0', 'fbx_name_LOD0'):
+        uExportCore.attrExists(node + '.' + att)
+    values['export_root'] = cmds.listConnections(node + '.export_root')
+    values['uexport_ver'] = cmds.getAttr(node + '.uexport_ver')
+    for att in ('asset_name', 'fbx_name', 'folder_path') + uExportCore.ART_ATTRS:
+        if uExportCore.attrExists(node + '.' + att):
+            values[att] = cmds.getAttr(node + '.' + att)
+    return values
+
+def benchNodeConstruction(nodes=200, passes=3):
+    uNodes = buildExportNodeScene(nodes=nodes)
+
+    rows = [('pass', 'legacy ms/node', 'snap ms/node', 'speedup')]
+    for i in range(0, passes):
+        legacyTime, result = timeIt(lambda: [legacyNodeRead(n) for n in uNodes])
+        snapTime, result = timeIt(lambda: [uExportCore.uExport(n) for n in uNodes])
+        rows.append((i, '%.3f' % (legacyTime * 1000.0 / nodes), '%.3f' % (snapTime * 1000.0 / nodes),
+                     '%.1fx' % (legacyTime / max(snapTime, 1e-9))))
+    report('uExport construction, ' + str(nodes) + ' nodes', rows)
+    return rows
+
+
+## SKINCLUSTER LOOKUP
+########################################################################
+
+def buildSkinnedScene(meshes=100):
+    cmds.file(new=True, f=True)
+    cmds.select(cl=1)
+    root = cmds.joint(name='bench_root')
+    skinned = []
+    for i in range(0, meshes):
+        mesh = cmds.polyCube(name='bench_skinned' + str(i), ch=0)[0]
+        cmds.skinCluster(root, mesh, tsb=1)
+        skinned.append(mesh)
+    return skinned
+
+def benchSkinClusterLookup(sizes=(10, 50, 100, 300)):
+    '''
+    One skinCluster per mesh, so the old per-mesh scan is meshes x clusters calls
+    '''
+    rows = [('meshes', 'clusters', 'scan s', 'index s', 'speedup')]
+    for size in sizes:
+        meshes = buildSkinnedScene(meshes=size)
+        scanTime, result = timeIt(lambda: [uExportCore.findRelatedSkinCluster(m) for m in meshes])
+        def indexed():
+            skinIndex = uExportCore.SkinClusterIndex()
+            return [uExportCore.findRelatedSkinCluster(m, skinIndex=skinIndex) for m in meshes]
+        indexTime, result = timeIt(indexed)
+        rows.append((size, len(cmds.ls(typ='skinCluster')), '%.3f' % scanTime, '%.3f' % indexTime,
+                     '%.1fx' % (scanTime / max(indexTime, 1e-9))))
+    report('findRelatedSkinCluster scaling', rows)
+    return rows
+
+
+## WEIGHT TRANSFER
+########################################################################
+
+def buildWeightScene(divisions=100, joints=6):
+    '''
+    A plane of (divisions+1)^2 verts skinned to a joint chain, joints 1.. get removed onto joint 0
+    '''
+    cmds.file(new=True, f=True)
+    mesh = cmds.polyPlane(name='bench_lod', w=10, h=10, sx=divisions, sy=divisions, ch=0)[0]
+    cmds.select(cl=1)
+    chain = [cmds.joint(name='bench_j' + str(i), p=(0, 0, -5 + i * (10.0 / joints))) for i in range(0, joints)]
+    cmds.skinCluster(chain, mesh, tsb=1, mi=4)
+    return mesh, chain
+
+def legacyTransferWeights(meshes, jointsToRemove, jointToTransferTo, pruneWeights=0.001):
+    '''
+    The old per vertex skinPercent transfer from LOD_transferWeights, kept as the 'before' number
+    '''
+    for mesh in meshes:
+        cluster = uExportCore.findRelatedSkinCluster(mesh)
+        if pruneWeights:
+            cmds.skinPercent(cluster, mesh, prw=pruneWeights)
+        meshInfluences = cmds.skinCluster(cluster, q=True, inf=True)
+        for joint in jointsToRemove:
+            if joint in meshInfluences:
+                if jointToTransferTo not in cmds.skinCluster(cluster, q=True, inf=True):
+                    cmds.skinCluster(cluster, e=True, wt=0, ai=jointToTransferTo)
+                for x in range(cmds.polyEvaluate(mesh, v=True)):
+                    value = cmds.skinPercent(cluster, (mesh+".vtx["+str(x)+"]"), t=joint, q=True)
+                    if value > 0:
+                        cmds.skinPercent(cluster, (mesh+".vtx["+str(x)+"]"), tmw=[joint, jointToTransferTo])
+        weightedInfs = cmds.skinCluster(cluster, q=True, weightedInfluence=True)
+        for inf in cmds.skinCluster(cluster, q=True, inf=True):
+            if inf not in weightedInfs:
+                cmds.skinCluster(cluster, e=True, ri=inf)
+
+def benchTransferWeights(sizes=(20, 50, 100), joints=6):
+    '''
+    Per vertex skinPercent vs one getWeights/setWeights, each run gets a fresh scene
+    '''
+    rows = [('verts', 'per vertex s', 'matrix s', 'speedup')]
+    for size in sizes:
+        mesh, chain = buildWeightScene(divisions=size, joints=joints)
+        legacyTime, result = timeIt(legacyTransferWeights, [mesh], chain[1:], chain[0])
+        mesh, chain = buildWeightScene(divisions=size, joints=joints)
+        matrixTime, result = timeIt(uExportCore.transferWeights, [mesh], chain[1:], chain[0], debug=0)
+        rows.append(((size + 1) ** 2, '%.3f' % legacyTime, '%.3f' % matrixTime,
+                     '%.1fx' % (legacyTime / max(matrixTime, 1e-9))))
+    report('LOD weight transfer, ' + str(joints - 1) + ' joints removed' + ('' if uExportCore.numpy else ' (no numpy)'), rows)
+    return rows
+
+
+## GEOMETRY HASH
+########################################################################
+
+def benchGeometryHash(sizes=(100, 300, 1000), joints=4):
+    '''
+    Skinned planes of (size+1)^2 verts: python walk of the API arrays vs numpy buffers vs the dirty-counter cache
+    '''
+    rows = [('verts', 'legacy Mv/s', 'numpy Mv/s', 'cached ms', 'speedup')]
+    for size in sizes:
+        mesh, chain = buildWeightScene(divisions=size, joints=joints)
+        verts = (size + 1) ** 2
+        skinIndex = uExportCore.SkinClusterIndex()
+        legacyTime, result = timeIt(uExportCore.hashMeshLegacy, mesh, skinIndex=skinIndex)
+        uExportCore.geometryHashCache.clear()
+        if uExportCore.numpy:
+            numpyTime, result = timeIt(uExportCore.geometryHashCache.get, mesh, skinIndex=skinIndex)
+        else:
+            numpyTime = legacyTime
+        cachedTime, result = timeIt(uExportCore.geometryHashCache.get, mesh, skinIndex=skinIndex)
+        rows.append((verts, '%.2f' % (verts / max(legacyTime, 1e-9) / 1e6), '%.2f' % (verts / max(numpyTime, 1e-9) / 1e6),
+                     '%.3f' % (cachedTime * 1000.0), '%.1fx' % (legacyTime / max(numpyTime, 1e-9))))
+    report('mesh hashing, skinned to ' + str(joints) + ' joints' + ('' if uExportCore.numpy else ' (no numpy)'), rows)
+    return rows
+
+
+## SELECTIVE BAKE
+########################################################################
+
+def buildSkeletonScene(joints=250, animated=0.1, frames=100):
+    '''
+    A flat-ish skeleton where only every 1/animated joint has a rotate curve, some others hold one value
+    '''
+    cmds.file(new=True, f=True)
+    cmds.select(cl=True)
+    root = cmds.joint(name='bench_root')
+    chain = [root]
+    step = max(1, int(round(1.0 / animated)))
+    for i in range(1, joints):
+        cmds.select(chain[(i - 1) // 4] if i % 8 else chain[-1])
+        joint = cmds.joint(name='bench_jnt' + str(i), p=(i % 7, i // 7, 0))
+        chain.append(joint)
+        if i % step == 0:
+            cmds.setKeyframe(joint, at='rotateX', t=0, v=0)
+            cmds.setKeyframe(joint, at='rotateX', t=frames, v=90)
+        elif i % step == 1:
+            cmds.setKeyframe(joint, at='rotateY', t=0, v=10)
+            cmds.setKeyframe(joint, at='rotateY', t=frames, v=10)
+    cmds.playbackOptions(min=0, max=frames)
+    return root, chain
+
+def benchSelectiveBake(sizes=(50, 250), animated=0.1, frames=100):
+    '''
+    bakeResults over the whole hierarchy, as the bake root export did, vs uExportCore.bakeJoints on a duplicate
+    '''
+    rows = [('joints', 'baked', 'skipped', 'full s', 'planned s', 'speedup')]
+    for size in sizes:
+        root, chain = buildSkeletonScene(joints=size, animated=animated, frames=frames)
+        full = cmds.duplicate(root, un=True)[0]
+        fullTime, result = timeIt(cmds.bakeResults, full, sm=True, hi='below', s=True, sb=1, dic=True, t=(0, frames))
+        cmds.delete(full)
+        planned = cmds.group(cmds.duplicate(root, un=True)[0])
+        plannedTime, plan = timeIt(uExportCore.bakeJoints, cmds.listRelatives(planned, type='joint', allDescendents=True, f=True), 0, frames)
+        rows.append((size, len(plan['baked']), len(plan['skipped']), '%.3f' % fullTime, '%.3f' % plannedTime,
+                     '%.1fx' % (fullTime / max(plannedTime, 1e-9))))
+    cmds.file(new=True, f=True)
+    report('baking ' + str(frames) + ' frames, ' + str(int(animated * 100)) + '% of joints animated', rows)
+    return rows
+
+
+## SCENE SCAN
+########################################################################
+
+def benchSceneScan(nodes=20, divisions=(100, 300, 600)):
+    '''
+    Saves .ma scenes with uExport nodes and a heavy mesh, then compares opening them in Maya and reading
+    the nodes with reading them with uExportScan
+    '''
+    rows = [('MB', 'open+read s', 'scan s', 'MB/s', 'speedup')]
+    path = os.path.join(tempfile.gettempdir(), 'uExportBench_scan.ma')
+    for size in divisions:
+        buildExportNodeScene(nodes=nodes)
+        cmds.polyPlane(name='bench_heavy', sx=size, sy=size, ch=0)
+        cmds.file(rename=path)
+        cmds.file(save=True, type='mayaAscii', f=True)
+        cmds.file(new=True, f=True)
+        mb = os.path.getsize(path) / 1024.0 / 1024.0
+
+        openTime, result = timeIt(lambda: (cmds.file(path, open=True, f=True),
+                                           [uExportCore.getNodeSnapshot(n) for n in uExportCore.getExportNodes()]))
+        scanTime, result = timeIt(uExportScan.scanScene, path)
+        rows.append(('%.1f' % mb, '%.3f' % openTime, '%.3f' % scanTime, '%.0f' % (mb / max(scanTime, 1e-9)),
+                     '%.1fx' % (openTime / max(scanTime, 1e-9))))
+    cmds.file(new=True, f=True)
+    os.remove(path)
+    report('reading ' + str(nodes) + ' uExport nodes from .ma', rows)
+    return rows
+
+
+## PERFORCE ROUND TRIPS
+########################################################################
+
+def benchTextureResolve(sizes=(50, 500), root='//depot/ArtSource/'):
+    import uExportP4
+    rows = [('textures', 'legacy trips', 'batched trips', 'legacy s', 'batched s')]
+    for size in sizes:
+        depotFiles, missingFileDict = buildFakeTextureDepot(textures=size, root=root)
+        legacyP4 = FakeP4(depotFiles)
+        legacyTime, result = timeIt(legacyResolveTextures, legacyP4, missingFileDict, root)
+        batchedP4 = FakeP4(depotFiles)
+        batchedTime, resolved = timeIt(uExportP4.resolveTextures, batchedP4, missingFileDict, root, debug=0)
+        found = len([f for f in resolved if resolved[f]['status'] == 'FOUND'])
+        if found != size:
+            print 'uExportBench>>> resolveTextures found', found, 'of', size
+        rows.append((size, legacyP4.roundTrips, batchedP4.roundTrips, '%.3f' % legacyTime, '%.3f' % batchedTime))
+    report('P4 texture resolve round trips (fake P4)', rows)
+    return rows
+
+
+def benchP4Lookups(assets=200, refreshes=5, root='//depot/ArtSource/'):
+    '''
+    Depot lookups for every LOD fbx over a few refreshes: a connection per lookup vs pool + cache
+    '''
+    import uExportP4
+    depotFiles = dict([(root + 'chars/asset' + str(i) + '_LOD0.fbx', 'edit') for i in range(0, assets)])
+    names = ['asset' + str(i) + '_LOD0.fbx' for i in range(0, assets)]
+
+    legacyP4s = []
+    def legacyFactory():
+        p4 = FakeP4(depotFiles)
+        legacyP4s.append(p4)
+        return p4
+    def legacy():
+        for r in range(0, refreshes):
+            for name in names:
+                p4 = legacyFactory()
+                p4.connect()
+                fileDict = p4.run_files(root + '...' + name)[0]
+                p4.run_describe(fileDict['change'])
+                p4.disconnect()
+    legacyTime, result = timeIt(legacy)
+
+    pooledP4s = []
+    def pooledFactory():
+        p4 = FakeP4(depotFiles)
+        pooledP4s.append(p4)
+        return p4
+    pool = uExportP4.P4Pool(p4Class=pooledFactory)
+    cache = uExportP4.TTLCache()
+    pooledTime, result = timeIt(lambda: [uExportP4.getP4Locations(names, root=root, pool=pool, cache=cache, debug=0) for r in range(0, refreshes)])
+
+    rows = [('', 'connections', 'round trips', 's')]
+    rows.append(('per lookup', len(legacyP4s), sum([p4.roundTrips for p4 in legacyP4s]), '%.3f' % legacyTime))
+    rows.append(('pool+cache', len(pooledP4s), sum([p4.roundTrips for p4 in pooledP4s]), '%.3f' % pooledTime))
+    report('P4 depot lookups, ' + str(assets) + ' fbx x ' + str(refreshes) + ' refreshes (fake P4)', rows)
+    return rows
+
+
+def benchCheckout(nodes=20, lods=5, newFraction=0.25, root='//depot/ArtSource/'):
+    '''
+    Export plan of nodes x LOD fbx files, some of them not in the depot yet: how many commands the checkout costs
+    '''
+    import uExportP4
+    p4 = FakeP4()
+    paths = []
+    for i in range(0, nodes):
+        for lod in range(0, lods):
+            depotFile = root + 'export/char' + str(i) + '_LOD' + str(lod) + '.fbx'
+            paths.append(p4.clientFile(depotFile))
+            if i >= nodes * newFraction:
+                p4.depotFiles[depotFile] = 'edit'
+    checkoutTime, (opened, toAdd) = timeIt(uExportP4.openForWrite, p4, paths)
+    rows = [('files', 'opened', 'to add', 'round trips', 's')]
+    rows.append((len(paths), len(opened), len(toAdd), p4.roundTrips, '%.3f' % checkoutTime))
+    report('pre-export checkout (fake P4)', rows)
+    return rows
+
+
+if __name__ == '__main__':
+    import maya.standalone
+    maya.standalone.initialize()
+    benchNodeConstruction()
+    benchSkinClusterLookup()
+    benchTransferWeights()
+    benchGeometryHash()
+    benchSelectiveBake()
+    benchSceneScan()
+    benchTextureResolve()
+    benchP4Lookups()
+    benchCheckout()
@@ -0,0 +1,2478 @@
+'''
+uExportCore
+Christopher Evans, Feb 2014
+
+The headless half of uExport: the uExport node class, the export pipeline, the missing texture scan
+and the validators. Nothing in here touches Qt, shiboken or the Maya main window, so it can be used
+straight from mayapy batch jobs:
+
+import uExportCore as uec
+for node in uec.getExportNodes():
+    uNode = uec.uExport(node)
+    uec.export(uNode, path=uNode.folder_path + uNode.fbx_name)
+
+'''
+
+import os
+import stat
+import json
+import array
+import hashlib
+import time
+import threading
+from multiprocessing.pool import ThreadPool
+
+import maya.cmds as cmds
+import maya.mel as mel
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+
+#numpy ships with newer mayapy builds, without it the weight matrix is walked in plain python
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import uExportScan
+
+
+#these are used by the uExport class and the tool, this method is usually in the utils lib at Epic
+def attrExists(attr):
+    if '.' in attr:
+        node, att = attr.split('.')
+        return cmds.attributeQuery(att, node=node, ex=1)
+    else:
+        cmds.warning('attrExists: No attr passed in: ' + attr)
+        return False
+
+def msgConnect(attribFrom, attribTo, debug=0):
+    # TODO needs a mode to dump all current connections (overwrite/force)
+    objFrom, attFrom = attribFrom.split('.')
+    objTo, attTo = attribTo.split('.')
+    if debug: print 'msgConnect>>> Locals:', locals()
+    if not attrExists(attribFrom):
+        cmds.addAttr(objFrom, longName=attFrom, attributeType='message')
+    if not attrExists(attribTo):
+        cmds.addAttr(objTo, longName=attTo, attributeType='message')
+
+    # check that both atts, if existing are msg atts
+    for a in (attribTo, attribFrom):
+        if cmds.getAttr(a, type=1) != 'message':
+            cmds.warning('msgConnect: Attr, ' + a + ' is not a message attribute. CONNECTION ABORTED.')
+            return False
+
+    try:
+        return cmds.connectAttr(attribFrom, attribTo, f=True)
+    except Exception as e:
+        print e
+        return False
+
+class SkinClusterIndex(object):
+    '''
+    Geometry -> skinCluster lookup built with one pass over the scene's skinClusters,
+    build one per refresh and hand it to findRelatedSkinCluster instead of rescanning per mesh.
+    '''
+    def __init__(self):
+        self.geoToCluster = {}
+        self.build()
+
+    def build(self):
+        self.geoToCluster = {}
+        for c in cmds.ls(typ='skinCluster') or []:
+            for g in cmds.skinCluster(c, q=True, g=True) or []:
+                #first cluster wins, same as the old scan
+                if g not in self.geoToCluster:
+                    self.geoToCluster[g] = c
+
+    def get(self, *shapes):
+        for shape in shapes:
+            if shape in self.geoToCluster:
+                return self.geoToCluster[shape]
+        return None
+
+
+def findRelatedSkinCluster(skinObject, skinIndex=None):
+    '''Python implementation of MEL command: http://takkun.nyamuuuu.net/blog/archives/592'''
+
+    skinShape = None
+    skinShapeWithPath = None
+    hiddenShape = None
+    hiddenShapeWithPath = None
+
+    cpTest = cmds.ls( skinObject, typ="controlPoint" )
+    if len( cpTest ):
+        skinShape = skinObject
+
+    else:
+        rels = cmds.listRelatives( skinObject )
+        if rels == None: return False
+        for r in rels :
+            cpTest = cmds.ls( "%s|%s" % ( skinObject, r ), typ="controlPoint" )
+            if len( cpTest ) == 0:
+                continue
+
+            io = cmds.getAttr( "%s|%s.io" % ( skinObject, r ) )
+            if io:
+                continue
+
+            visible = cmds.getAttr( "%s|%s.v" % ( skinObject, r ) )
+            if not visible:
+                hiddenShape = r
+                hiddenShapeWithPath = "%s|%s" % ( skinObject, r )
+                continue
+
+            skinShape = r
+            skinShapeWithPath = "%s|%s" % ( skinObject, r )
+            break
+
+    if skinShape:
+        if len( skinShape ) == 0:
+            if len( hiddenShape ) == 0:
+                return None
+
+            else:
+                skinShape = hiddenShape
+                skinShapeWithPath = hiddenShapeWithPath
+
+    if skinIndex is None:
+        skinIndex = SkinClusterIndex()
+    return skinIndex.get(skinShape, skinShapeWithPath)
+
+class MaterialIndex(object):
+    '''
+    mesh -> shadingEngine -> material and the reverse maps, all stored as sets.
+    Built in one walk over the meshes of every uExport node so nodes that share meshes share the lookups:
+
+    matIndex = MaterialIndex(meshes)
+    matIndex.getMaterials(lodMeshes)
+    '''
+    def __init__(self, meshes=None):
+        self.meshToSGs = {}
+        self.sgToMaterials = {}
+        self.meshToMaterials = {}
+        self.materialToMeshes = {}
+        if meshes:
+            self.add(meshes)
+
+    def add(self, meshes):
+        meshes = [mesh for mesh in set(meshes) if mesh not in self.meshToMaterials]
+        if not meshes:
+            return
+
+        #mesh -> shadingEngines through the API, no per mesh cmds calls
+        newSGs = set()
+        for mesh in meshes:
+            self.meshToSGs[mesh] = self.getMeshSGs(mesh)
+            newSGs.update(self.meshToSGs[mesh])
+
+        #shadingEngine -> materials, two calls for every new shadingEngine at once
+        newSGs = [sg for sg in newSGs if sg not in self.sgToMaterials]
+        if newSGs:
+            pairs = cmds.listConnections(newSGs, c=True) or []
+            materials = set(cmds.ls([pairs[i] for i in range(1, len(pairs), 2)], materials=1) or [])
+            for sg in newSGs:
+                self.sgToMaterials[sg] = set()
+            for i in range(0, len(pairs), 2):
+                if pairs[i + 1] in materials:
+                    self.sgToMaterials[pairs[i].split('.')[0]].add(pairs[i + 1])
+
+        for mesh in meshes:
+            mats = set()
+            for sg in self.meshToSGs[mesh]:
+                mats.update(self.sgToMaterials.get(sg, ()))
+            self.meshToMaterials[mesh] = mats
+            for mat in mats:
+                self.materialToMeshes.setdefault(mat, set()).add(mesh)
+
+    def getMeshSGs(self, mesh):
+        sgs = set()
+        sel = om.MSelectionList()
+        try:
+            sel.add(mesh)
+            dagPath = sel.getDagPath(0)
+        except RuntimeError:
+            return sgs
+        for i in range(0, dagPath.numberOfShapesDirectlyBelow()):
+            shapePath = om.MDagPath(dagPath)
+            shapePath.extendToShape(i)
+            if shapePath.hasFn(om.MFn.kMesh):
+                shaders, faceIndices = om.MFnMesh(shapePath).getConnectedShaders(shapePath.instanceNumber())
+                sgs.update([om.MFnDependencyNode(sg).name() for sg in shaders])
+            else:
+                sgs.update(cmds.listConnections(shapePath.fullPathName(), type='shadingEngine') or [])
+        return sgs
+
+    def getMaterials(self, meshes):
+        mats = set()
+        for mesh in meshes:
+            mats.update(self.meshToMaterials.get(mesh, ()))
+        return mats
+
+    def getMeshes(self, material):
+        return self.materialToMeshes.get(material, set())
+
+
+########################################################################
+## CONNECTION CACHE
+########################################################################
+
+class ConnectionCache(object):
+    '''
+    Per uExport node cache of joint hierarchies and legacy .rendermesh connections, LOD mesh lists come from
+    the node snapshot (see getNodeSnapshot). Maya callbacks throw entries away when they can be stale:
+    a connection change on a cached node drops that node, any parent or name change drops all joint lists
+    (and names), scene new/open drops everything. Only the cached uExport nodes get a connection callback.
+    '''
+    def __init__(self):
+        self.entries = {}
+        self.callbackIds = []
+        self.nodeCallbackIds = {}
+
+    @property
+    def installed(self):
+        return bool(self.callbackIds)
+
+    def install(self):
+        if self.installed:
+            return
+        self.callbackIds.append(om.MDagMessage.addParentAddedCallback(self.hierarchyChanged))
+        self.callbackIds.append(om.MDagMessage.addParentRemovedCallback(self.hierarchyChanged))
+        self.callbackIds.append(om.MNodeMessage.addNameChangedCallback(om.MObject.kNullObj, self.clear))
+        for msg in (om.MSceneMessage.kBeforeNew, om.MSceneMessage.kBeforeOpen):
+            self.callbackIds.append(om.MSceneMessage.addCallback(msg, self.clear))
+
+    def uninstall(self):
+        if self.callbackIds:
+            om.MMessage.removeCallbacks(self.callbackIds)
+        self.callbackIds = []
+        self.clear()
+
+    def clear(self, *args):
+        self.entries = {}
+        if self.nodeCallbackIds:
+            om.MMessage.removeCallbacks(self.nodeCallbackIds.values())
+        self.nodeCallbackIds = {}
+
+    def watchNode(self, node):
+        if node in self.nodeCallbackIds:
+            return
+        sel = om.MSelectionList()
+        try:
+            sel.add(node)
+        except RuntimeError:
+            return
+        self.nodeCallbackIds[node] = om.MNodeMessage.addAttributeChangedCallback(sel.getDependNode(0), self.connectionChanged, node)
+
+    def connectionChanged(self, msg, plug, otherPlug, node):
+        if msg & (om.MNodeMessage.kConnectionMade | om.MNodeMessage.kConnectionBroken):
+            self.entries.pop(node, None)
+
+    def hierarchyChanged(self, child, parent, *args):
+        for node in self.entries:
+            for key in self.entries[node].keys():
+                if key[0] == 'joints':
+                    del self.entries[node][key]
+
+    def get(self, node, key, fetch):
+        '''
+        Returns a copy of the cached list for (node, key), calling fetch() to fill it on a miss
+        '''
+        self.install()
+        self.watchNode(node)
+        nodeEntries = self.entries.setdefault(node, {})
+        if key not in nodeEntries:
+            nodeEntries[key] = fetch() or []
+        return list(nodeEntries[key])
+
+connectionCache = ConnectionCache()
+
+
+########################################################################
+## NODE SNAPSHOT
+########################################################################
+
+#string attrs every uExport node may carry
+#anim_clips: json list of {'name', 'start', 'end', 'fbx'}, see uExport.getAnimClips
+UEXPORT_STRING_ATTRS = ('uexport_ver', 'asset_name', 'fbx_name', 'folder_path', 'fbxPropertiesDict', 'anim_clips')
+#ART MetaData
+ART_ATTRS = ('joint_mover_template', 'skeleton_template', 'pre_script', 'post_script', 'export_file', 'anim_file',
+             'skeleton_uasset', 'skelmesh_uasset', 'physics_uasset', 'thumbnail_large', 'thumbnail_small')
+#TODO: don't assume 4 LODs
+LOD_RANGE = range(0, 5)
+LOD_NUM_DEFAULT = 4
+FBX_PROPERTIES_DEFAULT = {'animInterpolation':'quaternion', 'upAxis':'default', 'triangulation':False}
+#bump this when migrateExportNode learns a new attr
+UEXPORT_VER = '1.1'
+
+class uExportSnapshot(object):
+    '''
+    Every uExport attribute of a node, filled in one pass by getNodeSnapshot().
+    Attrs that are not on the node are left as None, attrs holds the names that exist.
+    '''
+    __slots__ = ('node', 'attrs', 'lodNum', 'export_root', 'rendermeshes', 'export_scripts', 'fbx_names') \
+                + UEXPORT_STRING_ATTRS + ART_ATTRS
+
+    def __init__(self, node):
+        self.node = node
+        self.attrs = set()
+        self.lodNum = None
+        self.export_root = []
+        self.rendermeshes = [[] for lod in LOD_RANGE]
+        self.export_scripts = [None for lod in LOD_RANGE]
+        self.fbx_names = [None for lod in LOD_RANGE]
+        for att in UEXPORT_STRING_ATTRS + ART_ATTRS:
+            setattr(self, att, None)
+
+def apiNodeName(mobj):
+    '''
+    Same name listConnections would give you: shortest unique path for dag nodes
+    '''
+    if mobj.hasFn(om.MFn.kDagNode):
+        return om.MDagPath.getAPathTo(mobj).partialPathName()
+    return om.MFnDependencyNode(mobj).name()
+
+def getPlugValue(plug):
+    attr = plug.attribute()
+    if attr.hasFn(om.MFn.kMessageAttribute):
+        return [apiNodeName(p.node()) for p in plug.connectedTo(True, True)]
+    if attr.hasFn(om.MFn.kTypedAttribute):
+        if om.MFnTypedAttribute(attr).attrType() == om.MFnData.kString:
+            #getAttr returns None for an empty string attr, match it
+            return plug.asString() or None
+        return None
+    if attr.hasFn(om.MFn.kNumericAttribute) or attr.hasFn(om.MFn.kEnumAttribute):
+        return plug.asInt()
+    return None
+
+def getNodeSnapshot(node):
+    '''
+    Reads all uExport attrs of a node with one listAttr and a walk over its plugs with MFnDependencyNode,
+    instead of an attributeQuery + getAttr round trip per attr.
+    '''
+    snap = uExportSnapshot(node)
+    sel = om.MSelectionList()
+    sel.add(node)
+    fn = om.MFnDependencyNode(sel.getDependNode(0))
+
+    for att in cmds.listAttr(node, userDefined=True) or []:
+        snap.attrs.add(att)
+        try:
+            value = getPlugValue(fn.findPlug(att, False))
+        except RuntimeError:
+            continue
+
+        #lod is None for attrs like rendermeshes_LOD0_old, those and LODs out of range are ignored
+        if att.startswith('rendermeshes_LOD'):
+            lod = uExportScan.toInt(att[len('rendermeshes_LOD'):])
+            if lod in LOD_RANGE:
+                snap.rendermeshes[lod] = value or []
+        elif att.startswith('export_script_LOD'):
+            lod = uExportScan.toInt(att[len('export_script_LOD'):])
+            if lod in LOD_RANGE:
+                snap.export_scripts[lod] = value
+        elif att.startswith('fbx_name_LOD'):
+            lod = uExportScan.toInt(att[len('fbx_name_LOD'):])
+            if lod in LOD_RANGE:
+                snap.fbx_names[lod] = value
+        elif att == 'export_root':
+            snap.export_root = value or []
+        elif att == 'lodNum':
+            snap.lodNum = value
+        elif att in UEXPORT_STRING_ATTRS or att in ART_ATTRS:
+            setattr(snap, att, value)
+    return snap
+
+def getNodeFingerprint(snapshot):
+    '''
+    Hashable summary of what the tool shows for a node: names, root, LOD connections, scripts, fbx settings and clips.
+    If it didn't change between two snapshots the node's branch of the UI doesn't need rebuilding.
+    '''
+    return (snapshot.node, snapshot.uexport_ver, snapshot.asset_name, snapshot.fbx_name, snapshot.folder_path,
+            snapshot.fbxPropertiesDict, snapshot.anim_clips, snapshot.lodNum, tuple(snapshot.export_root),
+            tuple([tuple(meshes) for meshes in snapshot.rendermeshes]),
+            tuple(snapshot.export_scripts), tuple(snapshot.fbx_names), tuple(sorted(snapshot.attrs)))
+
+########################################################################
+## SCHEMA MIGRATION
+########################################################################
+
+def versionTuple(version):
+    try:
+        return tuple([int(v) for v in str(version).split('.')])
+    except ValueError:
+        return (0,)
+
+def setStringAttr(node, att, value):
+    if not attrExists(node + '.' + att):
+        cmds.addAttr(node, longName=att, dt='string')
+    cmds.setAttr(node + '.' + att, value, type='string')
+
+def parseAnimClips(text, node=None):
+    if not text:
+        return []
+    try:
+        clips = json.loads(text)
+    except ValueError:
+        cmds.warning('uExport>>> Cannot read anim_clips on ' + str(node) + ': ' + text)
+        return []
+    return [{'name':clip['name'], 'start':float(clip['start']), 'end':float(clip['end']), 'fbx':clip.get('fbx')}
+            for clip in clips if clip.get('name') and 'start' in clip and 'end' in clip]
+
+def needsMigration(snapshot):
+    if versionTuple(snapshot.uexport_ver) < versionTuple(UEXPORT_VER):
+        return True
+    for lod in LOD_RANGE:
+        for att in ('rendermeshes_LOD', 'export_script_LOD', 'fbx_name_LOD'):
+            if att + str(lod) not in snapshot.attrs:
+                return True
+    return 'lodNum' not in snapshot.attrs or 'fbxPropertiesDict' not in snapshot.attrs
+
+def migrateExportNode(node, snapshot=None):
+    '''
+    Upgrades one uExport node to the UEXPORT_VER schema, returns True if anything changed.
+    Does not open an undo chunk, use migrateExportNodes() for that.
+    '''
+    if not snapshot:
+        snapshot = getNodeSnapshot(node)
+    if not needsMigration(snapshot):
+        return False
+    attrs = snapshot.attrs
+
+    #update for new LOD attrs instead of just rendermeshes
+    if 'rendermeshes_LOD0' not in attrs:
+        if 'rendermesh' in attrs:
+            lod0meshes = cmds.listConnections(node + '.rendermesh')
+            cmds.addAttr(node, longName='rendermeshes_LOD0', attributeType='message')
+            if lod0meshes:
+                for mesh in lod0meshes:
+                    msgConnect(node + '.rendermeshes_LOD0', mesh + '.uExport')
+            cmds.deleteAttr(node, at='rendermesh')
+        else:
+            cmds.addAttr(node, longName='rendermeshes_LOD0', attributeType='message')
+
+    for lod in LOD_RANGE:
+        if 'rendermeshes_LOD' + str(lod) not in attrs and lod:
+            cmds.addAttr(node, longName='rendermeshes_LOD' + str(lod), attributeType='message')
+        if 'export_script_LOD' + str(lod) not in attrs:
+            cmds.addAttr(node, longName='export_script_LOD' + str(lod), dt='string')
+        if 'fbx_name_LOD' + str(lod) not in attrs:
+            cmds.addAttr(node, longName='fbx_name_LOD' + str(lod), dt='string')
+
+    if 'lodNum' not in attrs:
+        cmds.addAttr(node, ln='lodNum', at='byte')
+        cmds.setAttr(node + '.lodNum', LOD_NUM_DEFAULT)
+
+    if 'fbxPropertiesDict' not in attrs:
+        setStringAttr(node, 'fbxPropertiesDict', json.dumps(FBX_PROPERTIES_DEFAULT))
+
+    setStringAttr(node, 'uexport_ver', UEXPORT_VER)
+    print 'uExport>>> Upgraded ' + node + ' to schema version ' + UEXPORT_VER
+    return True
+
+def getOutdatedExportNodes(nodes=None):
+    if nodes is None:
+        nodes = getExportNodes()
+    return [node for node in nodes if needsMigration(getNodeSnapshot(node))]
+
+def migrateExportNodes(nodes=None):
+    '''
+    One-time schema upgrade of every (or the given) uExport node in a single undo chunk.
+    After this constructing uExport and reading its properties never writes to the scene.
+    '''
+    if nodes is None:
+        nodes = getExportNodes()
+    migrated = []
+    try:
+        cmds.undoInfo(openChunk=True)
+        for node in nodes:
+            if migrateExportNode(node):
+                migrated.append(node)
+    finally:
+        cmds.undoInfo(closeChunk=True)
+    return migrated
+
+########################################################################
+## UEXPORT CLASS
+########################################################################
+
+class uExport(object):
+    '''
+    Just a little basket to store things.
+    Getters are served from the snapshot the node was read into, setters write the node and the snapshot,
+    make a new uExport to see changes made to the node from outside this class.
+    TODO: add logic to check that meshes exist across LODs
+    '''
+    def __init__(self, node, snapshot=None):
+        '''
+        Read-only: old nodes are left as they are and missing attrs are served as defaults,
+        run migrateExportNodes() to upgrade them on disk.
+        '''
+        if not snapshot:
+            snapshot = getNodeSnapshot(node)
+        self.snapshot = snapshot
+
+        #listConnections returns None rather than an empty list
+        self.export_root = snapshot.export_root or None
+
+        self.version = snapshot.uexport_ver
+        self.node = node
+        self.name = node.split('|')[-1]
+        self.asset_name = node
+        self.folder_path = None
+        self.fbxPropertiesDict = None
+
+        if 'asset_name' in snapshot.attrs:
+            self.asset_name = snapshot.asset_name
+        if 'fbx_name' in snapshot.attrs:
+            self.fbx_name = snapshot.fbx_name
+        if 'folder_path' in snapshot.attrs:
+            self.folder_path = snapshot.folder_path
+
+        #ART MetaData
+        #TO DO: Move to properties
+        for att in ART_ATTRS:
+            if att in snapshot.attrs:
+                setattr(self, att, getattr(snapshot, att))
+
+    ## Built in methods
+    ########################################################################
+    def getLodDicts(self):
+        lodDicts = {}
+        lodDicts[0] = {'meshes':self.rendermeshes_LOD0, 'export_script':self.export_script_LOD0, 'fbx_name':self.fbx_name_LOD0}
+        lodDicts[1] = {'meshes':self.rendermeshes_LOD1, 'export_script':self.export_script_LOD1, 'fbx_name':self.fbx_name_LOD1}
+        lodDicts[2] = {'meshes':self.rendermeshes_LOD2, 'export_script':self.export_script_LOD2, 'fbx_name':self.fbx_name_LOD2}
+        lodDicts[3] = {'meshes':self.rendermeshes_LOD3, 'export_script':self.export_script_LOD3, 'fbx_name':self.fbx_name_LOD3}
+        lodDicts[4] = {'meshes':self.rendermeshes_LOD4, 'export_script':self.export_script_LOD4, 'fbx_name':self.fbx_name_LOD4}
+        return lodDicts
+
+    def getShaderDict(self, materialIndex=None):
+        meshes = self.rendermeshes_ALL
+        if materialIndex is None:
+            materialIndex = MaterialIndex(meshes)
+        else:
+            materialIndex.add(meshes)
+
+        shaderDict = {}
+        for mesh in meshes:
+            for shader in materialIndex.getMaterials([mesh]):
+                shaderDict.setdefault(shader, []).append(mesh)
+        if shaderDict:
+            return shaderDict
+        else:
+            return False
+
+    def getAssocShaders(self, mesh):
+        shapes = cmds.listRelatives(mesh, shapes=1, f=True)
+        shadingGrps = cmds.listConnections(shapes,type='shadingEngine')
+        shaders = cmds.ls(cmds.listConnections(shadingGrps),materials=1)
+        return shaders
+
+    def connectRenderMeshes(self, renderMeshes, LOD=0):
+        try:
+            cmds.undoInfo(openChunk=True)
+            lodAttr = None
+            if LOD >=0 or LOD <=4:
+                lodAttr = self.node + '.rendermeshes_LOD' + str(LOD)
+                conns = None
+                if self.hasAttr('rendermeshes_LOD' + str(LOD)):
+                    conns = cmds.listConnections(lodAttr, plugs=1, destination=1)
+                if conns:
+                    for conn in cmds.listConnections(lodAttr, plugs=1, destination=1):
+                        cmds.disconnectAttr(lodAttr, conn)
+            if lodAttr:
+                for mesh in renderMeshes:
+                    msgConnect(lodAttr, mesh + '.uExport')
+                    self.snapshot.attrs.add('rendermeshes_LOD' + str(LOD))
+                if LOD in LOD_RANGE:
+                    self.snapshot.rendermeshes[LOD] = cmds.listConnections(lodAttr) or []
+            else:
+                cmds.error('connectRenderMeshes>>> please specify a LOD integer (0-4) for your meshes')
+
+        except Exception as e:
+            print e
+        finally:
+            cmds.undoInfo(closeChunk=True)
+
+    def getFbxExportPropertiesDict(self):
+        fbxProps = None
+        if self.hasAttr('fbxPropertiesDict'):
+            fbxProps = self.snapshot.fbxPropertiesDict
+        if fbxProps:
+            self.fbxPropertiesDict = json.loads(fbxProps)
+        else:
+            self.fbxPropertiesDict = dict(FBX_PROPERTIES_DEFAULT)
+        return self.fbxPropertiesDict
+
+    def hasAttr(self, att):
+        return att in self.snapshot.attrs
+
+    def getLodMeshes(self, lod):
+        att = 'rendermeshes_LOD' + str(lod)
+        if not self.hasAttr(att):
+            #pre-LOD nodes kept their meshes on .rendermesh
+            if lod == 0 and self.hasAttr('rendermesh'):
+                return connectionCache.get(self.node, ('meshes', lod), lambda: cmds.listConnections(self.node + '.rendermesh'))
+            return []
+        return list(self.snapshot.rendermeshes[lod])
+
+    def getDescendantJoints(self, fullPath=True):
+        '''
+        Every joint below export_root, the root itself is not included
+        '''
+        if not self.export_root:
+            return []
+        return connectionCache.get(self.node, ('joints', fullPath),
+                                   lambda: cmds.listRelatives(self.export_root, type='joint', allDescendents=True, f=fullPath))
+
+    def getLodString(self, att, lod):
+        if not self.hasAttr(att + '_LOD' + str(lod)):
+            return None
+        if att == 'export_script':
+            return self.snapshot.export_scripts[lod]
+        return self.snapshot.fbx_names[lod]
+
+    def setLodString(self, att, lod, value):
+        setStringAttr(self.node, att + '_LOD' + str(lod), value)
+        self.snapshot.attrs.add(att + '_LOD' + str(lod))
+        if att == 'export_script':
+            self.snapshot.export_scripts[lod] = value or None
+        else:
+            self.snapshot.fbx_names[lod] = value or None
+
+    ## Properties
+    ########################################################################
+
+    #return and set the rendermeshes per LOD
+    @property
+    def rendermeshes_LOD0(self):
+        return self.getLodMeshes(0)
+    @rendermeshes_LOD0.setter
+    def rendermeshes_LOD0(self, meshes):
+        self.connectRenderMeshes(meshes, LOD=0)
+
+    @property
+    def rendermeshes_LOD1(self):
+        return self.getLodMeshes(1)
+    @rendermeshes_LOD1.setter
+    def rendermeshes_LOD1(self, meshes):
+        self.connectRenderMeshes(meshes, LOD=1)
+
+    @property
+    def rendermeshes_LOD2(self):
+        return self.getLodMeshes(2)
+    @rendermeshes_LOD2.setter
+    def rendermeshes_LOD2(self, meshes):
+        self.connectRenderMeshes(meshes, LOD=2)
+
+    @property
+    def rendermeshes_LOD3(self):
+        return self.getLodMeshes(3)
+    @rendermeshes_LOD3.setter
+    def rendermeshes_LOD3(self, meshes):
+        self.connectRenderMeshes(meshes, LOD=3)
+
+    @property
+    def rendermeshes_LOD4(self):
+        return self.getLodMeshes(4)
+    @rendermeshes_LOD4.setter
+    def rendermeshes_LOD4(self, meshes):
+        self.connectRenderMeshes(meshes, LOD=4)
+
+    #number of lods
+    @property
+    def lodNum(self):
+        if self.hasAttr('lodNum') and self.snapshot.lodNum is not None:
+            return self.snapshot.lodNum
+        return LOD_NUM_DEFAULT
+    @lodNum.setter
+    def lodNum(self, num):
+        att = self.node + '.lodNum'
+        if not self.hasAttr('lodNum'):
+            cmds.addAttr(self.node, ln='lodNum', at='byte')
+            self.snapshot.attrs.add('lodNum')
+        cmds.setAttr(att, num)
+        self.snapshot.lodNum = num
+
+    #return ALL lod geometry
+    @property
+    def rendermeshes_ALL(self):
+        meshes = []
+        meshes.extend(self.rendermeshes_LOD0)
+        meshes.extend(self.rendermeshes_LOD1)
+        meshes.extend(self.rendermeshes_LOD2)
+        meshes.extend(self.rendermeshes_LOD3)
+        meshes.extend(self.rendermeshes_LOD4)
+        return meshes
+
+    #return and set export script paths
+    @property
+    def export_script_LOD0(self):
+        return self.getLodString('export_script', 0)
+    @export_script_LOD0.setter
+    def export_script_LOD0(self, path):
+        self.setLodString('export_script', 0, path)
+
+    @property
+    def export_script_LOD1(self):
+        return self.getLodString('export_script', 1)
+    @export_script_LOD1.setter
+    def export_script_LOD1(self, path):
+        self.setLodString('export_script', 1, path)
+
+    @property
+    def export_script_LOD2(self):
+        return self.getLodString('export_script', 2)
+    @export_script_LOD2.setter
+    def export_script_LOD2(self, path):
+        self.setLodString('export_script', 2, path)
+
+    @property
+    def export_script_LOD3(self):
+        return self.getLodString('export_script', 3)
+    @export_script_LOD3.setter
+    def export_script_LOD3(self, path):
+        self.setLodString('export_script', 3, path)
+
+    @property
+    def export_script_LOD4(self):
+        return self.getLodString('export_script', 4)
+    @export_script_LOD4.setter
+    def export_script_LOD4(self, path):
+        self.setLodString('export_script', 4, path)
+
+
+    #return and set fbx export names
+    @property
+    def fbx_name_LOD0(self):
+        return self.getLodString('fbx_name', 0)
+    @fbx_name_LOD0.setter
+    def fbx_name_LOD0(self, name):
+        self.setLodString('fbx_name', 0, name)
+
+    @property
+    def fbx_name_LOD1(self):
+        return self.getLodString('fbx_name', 1)
+    @fbx_name_LOD1.setter
+    def fbx_name_LOD1(self, name):
+        self.setLodString('fbx_name', 1, name)
+
+    @property
+    def fbx_name_LOD2(self):
+        return self.getLodString('fbx_name', 2)
+    @fbx_name_LOD2.setter
+    def fbx_name_LOD2(self, name):
+        self.setLodString('fbx_name', 2, name)
+
+    @property
+    def fbx_name_LOD3(self):
+        return self.getLodString('fbx_name', 3)
+    @fbx_name_LOD3.setter
+    def fbx_name_LOD3(self, name):
+        self.setLodString('fbx_name', 3, name)
+
+    @property
+    def fbx_name_LOD4(self):
+        return self.getLodString('fbx_name', 4)
+    @fbx_name_LOD4.setter
+    def fbx_name_LOD4(self, path):
+        self.setLodString('fbx_name', 4, path)
+
+
+    #return joints
+    @property
+    def joints(self):
+        if self.export_root:
+            returnMe = []
+            returnMe.extend(self.getDescendantJoints(fullPath=False))
+
+            returnMe.append(self.export_root[0])
+            return returnMe
+    @joints.setter
+    def joints(self):
+        print 'Joints returned by walking hierarchy from the root, not directly settable.'
+
+    #return fbxExportDict
+    @property
+    def fbxExportProperties(self):
+        return self.getFbxExportPropertiesDict()
+    @fbxExportProperties.setter
+    def fbxExportProperties(self, dict):
+        self.fbxPropertiesDict = dict
+        setStringAttr(self.node, 'fbxPropertiesDict', json.dumps(self.fbxPropertiesDict))
+        self.snapshot.attrs.add('fbxPropertiesDict')
+        self.snapshot.fbxPropertiesDict = json.dumps(self.fbxPropertiesDict)
+
+    #named animation clips
+    @property
+    def animClips(self):
+        return self.getAnimClips()
+    @animClips.setter
+    def animClips(self, clips):
+        setStringAttr(self.node, 'anim_clips', json.dumps(clips))
+        self.snapshot.attrs.add('anim_clips')
+        self.snapshot.anim_clips = json.dumps(clips)
+
+    def getAnimClips(self):
+        '''
+        [{'name', 'start', 'end', 'fbx'}] from .anim_clips, fbx is a file name next to the main fbx or None for name_clip.fbx
+        '''
+        if not self.hasAttr('anim_clips'):
+            return []
+        return parseAnimClips(self.snapshot.anim_clips, node=self.node)
+
+    def addAnimClip(self, name, start, end, fbx=None):
+        clips = [clip for clip in self.getAnimClips() if clip['name'] != name]
+        clips.append({'name':name, 'start':float(start), 'end':float(end), 'fbx':fbx})
+        self.animClips = clips
+
+    def removeAnimClip(self, name):
+        self.animClips = [clip for clip in self.getAnimClips() if clip['name'] != name]
+
+
+########################################################################
+## UEXPORT NODE
+########################################################################
+
+def getExportNodes():
+    return cmds.ls('*.uexport_ver', o=1, r=1)
+
+def connectRoot(uNode, root, rewire=1):
+    try:
+        cmds.undoInfo(openChunk=True)
+        if rewire:
+            conns = cmds.listConnections(uNode + '.export_root', plugs=1, source=1)
+            if conns:
+                for conn in conns:
+                    cmds.disconnectAttr(conn, uNode + '.export_root')
+
+        if not attrExists(root+'.export'):
+            cmds.addAttr(root, longName='export', attributeType='message')
+        cmds.connectAttr(root + '.export', uNode + '.export_root' )
+    except Exception as e:
+        print e
+    finally:
+        cmds.undoInfo(closeChunk=True)
+
+
+########################################################################
+## SIDECAR
+########################################################################
+
+def getNodeDict(node, snapshot=None):
+    '''
+    A node as the uExportScan node dict the sidecar stores, same fields a scan of the .ma gives
+    '''
+    if snapshot is None:
+        snapshot = getNodeSnapshot(node)
+    nodeDict = uExportScan.emptyNodeDict(node)
+    nodeDict['path'] = (cmds.ls(node, long=1) or [node])[0]
+    nodeDict['type'] = cmds.nodeType(node)
+    nodeDict['attrs'] = sorted(snapshot.attrs)
+    nodeDict['lodNum'] = snapshot.lodNum
+    nodeDict['export_root'] = list(snapshot.export_root or [])
+    nodeDict['rendermeshes'] = [list(meshes or []) for meshes in snapshot.rendermeshes]
+    if not nodeDict['rendermeshes'][0] and 'rendermesh' in snapshot.attrs:
+        nodeDict['rendermeshes'][0] = cmds.listConnections(node + '.rendermesh') or []
+    nodeDict['export_scripts'] = list(snapshot.export_scripts)
+    nodeDict['fbx_names'] = list(snapshot.fbx_names)
+    for att in UEXPORT_STRING_ATTRS + ART_ATTRS:
+        nodeDict[att] = getattr(snapshot, att)
+    return nodeDict
+
+def snapshotFromDict(nodeDict):
+    snap = uExportSnapshot(nodeDict['node'])
+    snap.attrs = set(nodeDict['attrs'])
+    snap.lodNum = nodeDict['lodNum']
+    snap.export_root = list(nodeDict['export_root'])
+    for lod in LOD_RANGE:
+        #like getNodeSnapshot, a legacy .rendermesh is not LOD0 here
+        if 'rendermeshes_LOD' + str(lod) in snap.attrs:
+            snap.rendermeshes[lod] = list(nodeDict['rendermeshes'][lod])
+        snap.export_scripts[lod] = nodeDict['export_scripts'][lod]
+        snap.fbx_names[lod] = nodeDict['fbx_names'][lod]
+    for att in UEXPORT_STRING_ATTRS + ART_ATTRS:
+        setattr(snap, att, nodeDict[att])
+    return snap
+
+def getSidecarText(nodes=None):
+    '''
+    Every uExport node of the scene as compact json, attrs that aren't set are left out
+    '''
+    if nodes is None:
+        nodes = getExportNodes()
+    compact = []
+    for node in nodes:
+        nodeDict = getNodeDict(node)
+        compact.append(dict([(key, value) for key, value in nodeDict.items() if value is not None]))
+    return json.dumps({'version':uExportScan.SIDECAR_VERSION, 'nodes':compact}, sort_keys=True, separators=(',', ':'))
+
+def writeSidecar(scene, text):
+    '''
+    Writes the sidecar only if text differs from what is in it, else just touches it so it stays newer
+    than the scene. Returns True if it was written.
+    '''
+    path = uExportScan.getSidecarPath(scene)
+    try:
+        old = None
+        if os.path.isfile(path):
+            with open(path, 'rb') as f:
+                old = f.read()
+        if old == text:
+            os.utime(path, None)
+            return False
+        if not isWritable(path):
+            cmds.warning('uExport>>> Sidecar is read-only, readers will fall back to the scene: ' + path)
+            return False
+        with open(path, 'wb') as f:
+            f.write(text)
+        return True
+    except (IOError, OSError) as e:
+        cmds.warning('uExport>>> Cannot write sidecar ' + path + ': ' + str(e))
+        return False
+
+def getSidecarSnapshots():
+    '''
+    [uExportSnapshot] from the open scene's sidecar if the scene wasn't changed since it was saved or opened, else None
+    '''
+    scene = cmds.file(q=1, sceneName=1)
+    if not scene or cmds.file(q=1, modified=1):
+        return None
+    nodes = uExportScan.readSidecar(scene)
+    if nodes is None:
+        return None
+    return [snapshotFromDict(nodeDict) for nodeDict in nodes]
+
+class SidecarWriter(object):
+    '''
+    Scene save callbacks keeping scene.ma.uexport.json up to date: the nodes are read before the save,
+    the file is written (or touched) after it. Scenes without uExport nodes only get one if they had one.
+    '''
+    def __init__(self):
+        self.callbackIds = []
+        self.pending = None
+
+    @property
+    def installed(self):
+        return bool(self.callbackIds)
+
+    def install(self):
+        if self.installed:
+            return
+        self.callbackIds.append(om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeSave, self.beforeSave))
+        self.callbackIds.append(om.MSceneMessage.addCallback(om.MSceneMessage.kAfterSave, self.afterSave))
+
+    def uninstall(self):
+        if self.callbackIds:
+            om.MMessage.removeCallbacks(self.callbackIds)
+        self.callbackIds = []
+        self.pending = None
+
+    def beforeSave(self, *args):
+        try:
+            self.pending = (getSidecarText(), bool(getExportNodes()))
+        except Exception as e:
+            print 'uExport>>> Sidecar not written:', e
+            self.pending = None
+
+    def afterSave(self, *args):
+        pending, self.pending = self.pending, None
+        scene = cmds.file(q=1, sceneName=1)
+        #autosave leaves the scene modified, and what it saved is not at scene
+        if not pending or not scene or cmds.file(q=1, modified=1):
+            return
+        text, hasNodes = pending
+        if hasNodes or os.path.isfile(uExportScan.getSidecarPath(scene)):
+            writeSidecar(scene, text)
+
+sidecarWriter = SidecarWriter()
+
+
+########################################################################
+## SKIN WEIGHTS
+########################################################################
+
+def getSkinWeights(mesh, cluster):
+    '''
+    Reads the whole weight matrix of a skinned mesh in one MFnSkinCluster.getWeights call
+    returns (fnSkin, shapePath, components, influences, weights) with weights a flat list, vertex major
+    '''
+    sel = om.MSelectionList()
+    sel.add(cluster)
+    sel.add(mesh)
+    fnSkin = oma.MFnSkinCluster(sel.getDependNode(0))
+    shapePath = sel.getDagPath(1)
+    shapePath.extendToShape()
+
+    fnComp = om.MFnSingleIndexedComponent()
+    components = fnComp.create(om.MFn.kMeshVertComponent)
+    fnComp.setCompleteData(om.MFnMesh(shapePath).numVertices)
+
+    influences = [path.fullPathName() for path in fnSkin.influenceObjects()]
+    weights, numInfluences = fnSkin.getWeights(shapePath, components)
+    return fnSkin, shapePath, components, influences, weights
+
+def moveWeightColumns(weights, numInfluences, fromColumns, toColumn, pruneWeights=0.001):
+    '''
+    Adds the fromColumns onto toColumn, zeroes weights below pruneWeights and renormalizes every vertex.
+    Returns the new flat weight list and the per influence weight sums
+    '''
+    if numpy:
+        matrix = numpy.array(weights, dtype=numpy.float64).reshape(-1, numInfluences)
+        if fromColumns:
+            matrix[:, toColumn] += matrix[:, fromColumns].sum(axis=1)
+            matrix[:, fromColumns] = 0.0
+        if pruneWeights:
+            matrix[matrix < pruneWeights] = 0.0
+        sums = matrix.sum(axis=1)
+        weighted = sums > 0.0
+        matrix[weighted] /= sums[weighted][:, numpy.newaxis]
+        return matrix.ravel().tolist(), matrix.sum(axis=0).tolist()
+
+    weights = list(weights)
+    columnSums = [0.0] * numInfluences
+    for start in range(0, len(weights), numInfluences):
+        row = weights[start:start + numInfluences]
+        for col in fromColumns:
+            row[toColumn] += row[col]
+            row[col] = 0.0
+        if pruneWeights:
+            row = [w if w >= pruneWeights else 0.0 for w in row]
+        total = sum(row)
+        if total > 0.0:
+            row = [w / total for w in row]
+        for col in range(0, numInfluences):
+            columnSums[col] += row[col]
+        weights[start:start + numInfluences] = row
+    return weights, columnSums
+
+def transferWeights(meshes, jointsToRemove, jointToTransferTo, debug=1, pruneWeights=0.001, skinIndex=None):
+    '''
+    Moves all weighting of jointsToRemove onto jointToTransferTo and drops influences left unweighted, for LODs.
+    Original per vertex skinPercent version by Charles Anderson @ Epic Games, this one reads and writes
+    the whole weight matrix once per mesh. The write goes through the API so it is not undoable,
+    an open SceneRollback is told so and the scene gets re-opened instead.
+    '''
+    if skinIndex is None:
+        skinIndex = SkinClusterIndex()
+    jointToTransferTo = cmds.ls(jointToTransferTo, l=1)[0]
+    jointsToRemove = cmds.ls(jointsToRemove, l=1)
+
+    for mesh in meshes:
+        # Find the skin cluster for the current mesh
+        cluster = findRelatedSkinCluster(mesh, skinIndex=skinIndex)
+        if not cluster:
+            cmds.warning('uExport>>> transferWeights: no skinCluster found on ' + mesh)
+            continue
+
+        if debug:
+            print "MESH: ", mesh
+            print "CLUSTER: ", cluster
+
+        # If the jointToTransferTo is not already an influence on the current mesh then add it.
+        meshInfluences = cmds.ls(cmds.skinCluster(cluster, q=True, inf=True), l=1)
+        if [j for j in jointsToRemove if j in meshInfluences] and jointToTransferTo not in meshInfluences:
+            cmds.skinCluster(cluster, e=True, wt=0, ai=jointToTransferTo)
+
+        fnSkin, shapePath, components, influences, weights = getSkinWeights(mesh, cluster)
+        numInfluences = len(influences)
+        fromColumns = [influences.index(j) for j in jointsToRemove if j in influences]
+        toColumn = influences.index(jointToTransferTo) if jointToTransferTo in influences else None
+        if toColumn is None:
+            fromColumns = []
+
+        weights, columnSums = moveWeightColumns(weights, numInfluences, fromColumns, toColumn, pruneWeights=pruneWeights)
+        SceneRollback.markNotUndoable('transferWeights on ' + mesh)
+        fnSkin.setWeights(shapePath, components, om.MIntArray(range(0, numInfluences)), om.MDoubleArray(weights), False)
+
+        # Remove unused influences
+        influencesToRemove = [influences[i] for i in range(0, numInfluences) if columnSums[i] <= 0.0]
+        if debug:
+            print "Transferred: ", [influences[i] for i in fromColumns]
+            print "Removing Influences: ", influencesToRemove
+        for inf in influencesToRemove:
+            cmds.skinCluster(cluster, e=True, ri=inf)
+
+
+########################################################################
+## GEOMETRY HASH
+########################################################################
+
+def getMeshShapes(mesh, cluster=None):
+    '''
+    (shape, inputShape): the visible mesh shape and, if skinned, the intermediate shape feeding the skinCluster,
+    which holds the undeformed points (the visible shape moves with the skeleton)
+    '''
+    shapes = cmds.ls(mesh, type='mesh', l=True) or cmds.listRelatives(mesh, shapes=True, type='mesh', f=True) or []
+    visible = [sh for sh in shapes if not cmds.getAttr(sh + '.intermediateObject')]
+    shape = visible[0] if visible else (shapes[0] if shapes else None)
+    inputShape = None
+    if cluster:
+        history = set(cmds.ls(cmds.listHistory(cluster), type='mesh', l=True) or [])
+        inputs = [sh for sh in shapes if sh in history and sh != shape]
+        if inputs:
+            inputShape = inputs[0]
+    return shape, inputShape
+
+def getRawPoints(shape):
+    '''
+    Object space points as a float32 numpy array, straight from the mesh's point buffer via the old API
+    '''
+    import ctypes
+    import maya.OpenMaya as om1
+    sel = om1.MSelectionList()
+    sel.add(shape)
+    dagPath = om1.MDagPath()
+    sel.getDagPath(0, dagPath)
+    fnMesh = om1.MFnMesh(dagPath)
+    count = fnMesh.numVertices() * 3
+    if not count:
+        return numpy.zeros(0, dtype=numpy.float32)
+    buf = (ctypes.c_float * count).from_address(int(fnMesh.getRawPoints()))
+    return numpy.frombuffer(buf, dtype=numpy.float32, count=count).copy()
+
+def getHashSources(shape, inputShape, cluster):
+    '''
+    Nodes a mesh hash depends on. A skinned mesh is hashed from its input shape and the skinCluster's weights
+    and influences, so the visible shape (dirtied by every pose and frame change) is only watched without a skin.
+    '''
+    if cluster and inputShape:
+        return [inputShape, cluster]
+    return [node for node in (shape, cluster) if node]
+
+def getMeshArrays(mesh, skinIndex=None):
+    '''
+    {name: numpy array} of everything that defines the mesh for export: points, face vertex counts and
+    indices, every uv set (uvs and per face-vertex assignment) and the skin weight matrix.
+    All bulk API reads, nothing loops per vertex in python. Skinned meshes are read from the input shape,
+    the visible one changes with every pose. Also returns the nodes to watch (see getHashSources).
+    '''
+    if skinIndex is None:
+        skinIndex = SkinClusterIndex()
+    cluster = findRelatedSkinCluster(mesh, skinIndex=skinIndex)
+    shape, inputShape = getMeshShapes(mesh, cluster)
+    arrays = {}
+
+    pointShape = inputShape or shape
+    try:
+        arrays['points'] = getRawPoints(pointShape)
+    except Exception:
+        sel = om.MSelectionList()
+        sel.add(pointShape)
+        arrays['points'] = numpy.array(om.MFnMesh(sel.getDagPath(0)).getFloatPoints(om.MSpace.kObject), dtype=numpy.float32)[:, :3].ravel()
+
+    sel = om.MSelectionList()
+    sel.add(pointShape)
+    fnMesh = om.MFnMesh(sel.getDagPath(0))
+    counts, indices = fnMesh.getVertices()
+    arrays['faceCounts'] = numpy.array(counts, dtype=numpy.int32)
+    arrays['faceVerts'] = numpy.array(indices, dtype=numpy.int32)
+    for uvSet in fnMesh.getUVSetNames():
+        u, v = fnMesh.getUVs(uvSet)
+        arrays['uv:' + uvSet] = numpy.array([u, v], dtype=numpy.float32)
+        uvCounts, uvIds = fnMesh.getAssignedUVs(uvSet)
+        arrays['uvIds:' + uvSet] = numpy.array(uvIds, dtype=numpy.int32)
+
+    if cluster:
+        fnSkin, shapePath, components, influences, weights = getSkinWeights(mesh, cluster)
+        arrays['influences'] = numpy.array(influences)
+        arrays['weights'] = numpy.array(weights, dtype=numpy.float64)
+    return arrays, getHashSources(shape, inputShape, cluster)
+
+def hashArrays(arrays):
+    '''
+    sha1 per array plus 'mesh' over all of them, in name order
+    '''
+    hashes = {}
+    combined = hashlib.sha1()
+    for name in sorted(arrays):
+        data = numpy.ascontiguousarray(arrays[name])
+        h = hashlib.sha1(str(data.dtype) + str(data.shape))
+        h.update(data.tobytes() if hasattr(data, 'tobytes') else data.tostring())
+        hashes[name] = h.hexdigest()
+        combined.update(name + hashes[name])
+    hashes['mesh'] = combined.hexdigest()
+    return hashes
+
+def hashMeshLegacy(mesh, skinIndex=None):
+    '''
+    The same inputs walked through MPointArray and array.array, used when numpy isn't there
+    '''
+    cluster = findRelatedSkinCluster(mesh, skinIndex=skinIndex)
+    shape, inputShape = getMeshShapes(mesh, cluster)
+    h = hashlib.sha1()
+    sel = om.MSelectionList()
+    sel.add(inputShape or shape)
+    fnMesh = om.MFnMesh(sel.getDagPath(0))
+    hashDoubles(h, [c for p in fnMesh.getPoints(om.MSpace.kObject) for c in (p.x, p.y, p.z)])
+    counts, indices = fnMesh.getVertices()
+    hashInts(h, counts)
+    hashInts(h, indices)
+    for uvSet in fnMesh.getUVSetNames():
+        u, v = fnMesh.getUVs(uvSet)
+        hashDoubles(h, list(u) + list(v))
+        hashInts(h, fnMesh.getAssignedUVs(uvSet)[1])
+    if cluster:
+        fnSkin, shapePath, components, influences, weights = getSkinWeights(mesh, cluster)
+        h.update('|'.join(influences))
+        hashDoubles(h, weights)
+    return {'mesh':h.hexdigest()}, getHashSources(shape, inputShape, cluster)
+
+#skinCluster plugs that change a skinned mesh's hash, its matrix plugs get dirty on every pose change
+SKIN_WEIGHT_ATTRS = ('weightList', 'weights')
+SKIN_INFLUENCE_ATTRS = ('matrix',)
+
+class GeometryHashCache(object):
+    '''
+    Mesh hashes cached per mesh until Maya dirties what they were read from (see getHashSources).
+    Each watched node has a dirty counter; the first dirty callback bumps it and unhooks itself,
+    so an idle or playing scene pays nothing for meshes that were already hashed and touched.
+    On a skinCluster only weight changes and influence (re)connections count, not its matrices moving with the pose.
+
+    hashes = geometryHashCache.get('body_LOD0')   #{'points': sha1, 'weights': sha1, ..., 'mesh': sha1}
+    '''
+    def __init__(self):
+        self.entries = {}
+        self.dirtyCounts = {}
+        self.watched = {}
+        self.sceneCallbackIds = []
+
+    def install(self):
+        if self.sceneCallbackIds:
+            return
+        for msg in (om.MSceneMessage.kBeforeNew, om.MSceneMessage.kBeforeOpen):
+            self.sceneCallbackIds.append(om.MSceneMessage.addCallback(msg, self.clear))
+
+    def uninstall(self):
+        self.clear()
+        if self.sceneCallbackIds:
+            om.MMessage.removeCallbacks(self.sceneCallbackIds)
+        self.sceneCallbackIds = []
+
+    def clear(self, *args):
+        for token, ids in self.watched.values():
+            om.MMessage.removeCallbacks(ids)
+        self.watched = {}
+        self.entries = {}
+
+    def dirtied(self, mobj, watch):
+        #watch is (node, token): callbacks of an earlier watch() that fire before their deferred removal
+        #still count, but must not unhook the callbacks a later watch() installed
+        node, token = watch
+        self.dirtyCounts[node] = self.dirtyCounts.get(node, 0) + 1
+        if node in self.watched and self.watched[node][0] is token:
+            self.unwatchDeferred(self.watched.pop(node)[1])
+
+    def unwatchDeferred(self, ids):
+        #callbacks can't be removed from inside themselves, the node is watched again on the next get()
+        import maya.utils
+        maya.utils.executeDeferred(om.MMessage.removeCallbacks, ids)
+
+    def skinDirtied(self, mobj, plug, watch):
+        if om.MFnAttribute(plug.attribute()).name in SKIN_WEIGHT_ATTRS:
+            self.dirtied(mobj, watch)
+
+    def skinConnectionChanged(self, msg, plug, otherPlug, watch):
+        if msg & (om.MNodeMessage.kConnectionMade | om.MNodeMessage.kConnectionBroken):
+            if om.MFnAttribute(plug.attribute()).name in SKIN_INFLUENCE_ATTRS + SKIN_WEIGHT_ATTRS:
+                self.dirtied(plug.node(), watch)
+
+    def watch(self, node):
+        if node in self.watched:
+            return
+        sel = om.MSelectionList()
+        sel.add(node)
+        mobj = sel.getDependNode(0)
+        token = object()
+        watch = (node, token)
+        if mobj.hasFn(om.MFn.kSkinClusterFilter):
+            ids = [om.MNodeMessage.addNodeDirtyPlugCallback(mobj, self.skinDirtied, watch),
+                   om.MNodeMessage.addAttributeChangedCallback(mobj, self.skinConnectionChanged, watch)]
+        else:
+            ids = [om.MNodeMessage.addNodeDirtyCallback(mobj, self.dirtied, watch)]
+        self.watched[node] = (token, ids)
+
+    def key(self, nodes):
+        return tuple([(node, self.dirtyCounts.get(node, 0)) for node in nodes])
+
+    def get(self, mesh, skinIndex=None):
+        self.install()
+        entry = self.entries.get(mesh)
+        if entry and entry[0] == self.key(entry[1]):
+            return entry[2]
+        if numpy:
+            arrays, nodes = getMeshArrays(mesh, skinIndex=skinIndex)
+            hashes = hashArrays(arrays)
+        else:
+            hashes, nodes = hashMeshLegacy(mesh, skinIndex=skinIndex)
+        for node in nodes:
+            self.watch(node)
+        self.entries[mesh] = (self.key(nodes), nodes, hashes)
+        return hashes
+
+geometryHashCache = GeometryHashCache()
+
+def hashExportNode(uNode, skinIndex=None):
+    '''
+    {lodNum: {mesh: hashes}} over all LOD meshes of a uExport node
+    '''
+    if skinIndex is None:
+        skinIndex = SkinClusterIndex()
+    lodHashes = {}
+    for lodNum, lodDict in (uNode.getLodDicts() or {}).items():
+        lodHashes[lodNum] = dict([(m, geometryHashCache.get(m, skinIndex=skinIndex)) for m in lodDict['meshes'] or []])
+    return lodHashes
+
+def findDuplicateLodMeshes(uNode, skinIndex=None):
+    '''
+    Cross-LOD check: [(lodA, meshA, lodB, meshB)] where a lower LOD has the exact geometry of a higher one,
+    usually a reduction script that didn't run or a mesh hooked to the wrong LOD
+    '''
+    seen = {}
+    dupes = []
+    lodHashes = hashExportNode(uNode, skinIndex=skinIndex)
+    for lodNum in sorted(lodHashes):
+        for mesh, hashes in sorted(lodHashes[lodNum].items()):
+            key = (hashes.get('points'), hashes.get('faceVerts')) if 'points' in hashes else hashes['mesh']
+            if key in seen and seen[key][0] != lodNum:
+                dupes.append(seen[key] + (lodNum, mesh))
+            else:
+                seen.setdefault(key, (lodNum, mesh))
+    return dupes
+
+
+########################################################################
+## MISSING TEXTURES
+########################################################################
+
+class DirectoryCache(object):
+    '''
+    Directory -> set of file names, listed on a thread pool.
+    A listing younger than ttl seconds is trusted without touching the disk, an older one is kept
+    as long as the directory mtime didn't change, so repeated refreshes on network shares are free.
+
+    exists = textureCache.exists(['//server/tex/a.tga', '//server/tex/b.tga'])
+    '''
+    def __init__(self, ttl=30.0, threads=8):
+        self.ttl = ttl
+        self.threads = threads
+        #dir: (mtime, listedAt, set of normcased names) or None if the dir doesn't exist
+        self.listings = {}
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.listings = {}
+
+    def stale(self, directory, now):
+        entry = self.listings.get(directory)
+        return directory not in self.listings or entry is None or (now - entry[1]) > self.ttl
+
+    def list(self, directory):
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            return directory, None
+        old = self.listings.get(directory)
+        if old and old[0] == mtime:
+            return directory, (mtime, time.time(), old[2])
+        try:
+            names = set([os.path.normcase(name) for name in os.listdir(directory)])
+        except OSError:
+            return directory, None
+        return directory, (mtime, time.time(), names)
+
+    def update(self, directories):
+        now = time.time()
+        stale = [d for d in set(directories) if self.stale(d, now)]
+        if not stale:
+            return
+        if len(stale) == 1 or self.threads < 2:
+            results = [self.list(d) for d in stale]
+        else:
+            pool = ThreadPool(min(self.threads, len(stale)))
+            try:
+                results = pool.map(self.list, stale)
+            finally:
+                pool.close()
+                pool.join()
+        with self.lock:
+            for directory, entry in results:
+                self.listings[directory] = entry
+
+    def exists(self, paths):
+        '''
+        {path: bool} for absolute file paths, every directory is listed at most once
+        '''
+        split = dict([(path, os.path.split(os.path.normpath(path))) for path in set(paths)])
+        self.update([d for d, name in split.values()])
+        result = {}
+        for path, (directory, name) in split.items():
+            entry = self.listings.get(directory)
+            result[path] = bool(entry) and os.path.normcase(name) in entry[2]
+        return result
+
+textureCache = DirectoryCache()
+
+def getFileTexturePaths():
+    '''
+    {file node: fileTextureName} in one pass over the scene's file nodes
+    '''
+    paths = {}
+    it = om.MItDependencyNodes(om.MFn.kFileTexture)
+    while not it.isDone():
+        fnNode = om.MFnDependencyNode(it.thisNode())
+        paths[fnNode.name()] = fnNode.findPlug('fileTextureName', False).asString()
+        it.next()
+    return paths
+
+def resolveTexturePath(filePath):
+    #what cmds.file(exists=1) would look at: env vars expanded, relative paths against the project
+    resolved = os.path.expandvars(filePath)
+    if not os.path.isabs(resolved):
+        resolved = cmds.workspace(expandName=resolved)
+    return resolved
+
+def missingNodes(cache=None):
+    '''
+    {fileName: {'path', 'node'}} for file nodes whose texture isn't on disk.
+    Paths are read once, each texture is checked once however many nodes use it, see DirectoryCache.
+    '''
+    if cache is None:
+        cache = textureCache
+    fileNodes = getFileTexturePaths()
+    resolved = {}
+    for filePath in set(fileNodes.values()):
+        if filePath != '':
+            resolved[filePath] = resolveTexturePath(filePath)
+    exists = cache.exists(resolved.values())
+
+    missingFiles = {}
+    for f in sorted(fileNodes):
+        filePath = fileNodes[f]
+        if filePath != '':
+            if not exists[resolved[filePath]]:
+                fileName = filePath.split('/')[-1]
+                path = filePath.replace(fileName,'')
+                missingFiles[fileName] = {'path':path, 'node':f}
+    return missingFiles
+
+
+########################################################################
+## SANITY CHECK
+########################################################################
+
+#quick mesh check
+def isMesh(node):
+    rels = cmds.listRelatives(node, children=True, s=True)
+    if rels:
+        for shp in rels:
+            if cmds.nodeType(shp)=='mesh':
+                return True
+    return False
+
+def isBlendshape(mesh):
+    future = cmds.listHistory(mesh, future=1)
+    isShape = False
+    for node in future:
+        if cmds.nodeType(node) == 'blendShape':
+            return True
+    return False
+
+#general methods
+def hasPrefix(obj, prefix, fix=1):
+    if obj.startswith(prefix):
+        return True
+    else:
+        return False
+
+
+########################################################################
+## EXPORT
+########################################################################
+
+def fbxVersion():
+    for plugin in cmds.pluginInfo(q=True, listPlugins=True):
+        if "fbxmaya" in plugin:
+            return cmds.pluginInfo(plugin, q=True, version=True)
+
+def isWritable(path):
+    '''
+    False if the file exists on disk and is read-only (not checked out)
+    '''
+    if path and os.path.isfile(path):
+        return bool(os.stat(path)[0] & stat.S_IWRITE)
+    return True
+
+#TODO: Find and export blendshape meshes!
+def getFbxFlagState(fbxDict, start=None, end=None):
+    '''
+    [(flag, mel)] for everything setExportFlags manages, in the order it is applied.
+    Flags left to the user (upAxis 'default') are not in the list. The bake range is the playback range
+    unless start/end are given (clips).
+    '''
+    if start is None:
+        start = cmds.playbackOptions(minTime=1, q=1)
+    if end is None:
+        end = cmds.playbackOptions(maxTime=1, q=1)
+    state = []
+    def flag(name, value):
+        state.append((name, name + ' -v ' + str(value)))
+
+    # set export properties from the fbxExportPropertiesDict of the uNode
+    flag('FBXExportTriangulate', 'true' if fbxDict['triangulation'] == True else 'false')
+
+    # Mesh
+    flag('FBXExportSmoothingGroups', 'true')
+    flag('FBXExportHardEdges', 'false')
+    flag('FBXExportTangents', 'true')
+    flag('FBXExportInstances', 'false')
+    flag('FBXExportInAscii', 'true')
+    flag('FBXExportSmoothMesh', 'false')
+
+    # Animation
+    flag('FBXExportBakeResampleAnimation', 'true')
+    flag('FBXExportBakeComplexAnimation', 'true')
+    flag('FBXExportBakeComplexStart', start)
+    flag('FBXExportBakeComplexEnd', end)
+    flag('FBXExportReferencedAssetsContent', 'true')
+    flag('FBXExportBakeComplexStep', 1)
+    flag('FBXExportUseSceneName', 'false')
+    flag('FBXExportShapes', 'true')
+    flag('FBXExportSkins', 'true')
+
+    if fbxDict['animInterpolation'] == 'euler':
+        flag('FBXExportQuaternion', 'euler')
+    elif fbxDict['animInterpolation'] == 'resample':
+        flag('FBXExportQuaternion', 'resample')
+    else:
+        flag('FBXExportQuaternion', 'quaternion')
+
+    if fbxDict['upAxis'].lower() in ('y', 'z'):
+        state.append(('FBXExportUpAxis', 'FBXExportUpAxis ' + fbxDict['upAxis'].lower()))
+
+    #garbage we don't want
+    # Constraints
+    flag('FBXExportConstraints', 'false')
+    # Cameras
+    flag('FBXExportCameras', 'false')
+    # Lights
+    flag('FBXExportLights', 'false')
+    # Embed Media
+    flag('FBXExportEmbeddedTextures', 'false')
+    # Connections
+    flag('FBXExportInputConnections', 'false')
+    return state
+
+class FbxFlagCache(object):
+    '''
+    The FBX plugin keeps its export flags for the whole session, so only flags whose value differs
+    from what we last set need a mel.eval. reset() forgets everything, e.g. after the flags were
+    changed in the FBX export dialog, and the next apply sends them all again.
+    '''
+    def __init__(self):
+        self.applied = {}
+
+    def reset(self):
+        self.applied = {}
+
+    def apply(self, state, force=False):
+        if force:
+            self.reset()
+        sent = 0
+        for name, cmd in state:
+            if self.applied.get(name) == cmd:
+                continue
+            if name == 'FBXExportUpAxis':
+                print 'FBX EXPORT OVERRIDE: ' + cmd
+            mel.eval(cmd)
+            self.applied[name] = cmd
+            sent += 1
+        return sent
+
+fbxFlagCache = FbxFlagCache()
+
+def setExportFlags(uNode, force=False, start=None, end=None):
+    '''
+    Sets the FBX plugin up for the uNode's fbxPropertiesDict, only sending the flags that changed since
+    the last export in this session. force=True sends them all.
+    '''
+    return fbxFlagCache.apply(getFbxFlagState(uNode.fbxExportProperties, start=start, end=end), force=force)
+
+def getSceneStateKey(meshes=None):
+    '''
+    Stand-in for 'is this the same scene': every node path plus the point, topology, uv and skin weight hashes
+    of the meshes (see GeometryHashCache). A mesh that can't be hashed never matches, so the scene gets re-opened.
+    '''
+    skinIndex = SkinClusterIndex()
+    hashes = []
+    for mesh in meshes or []:
+        if not cmds.objExists(mesh):
+            hashes.append((mesh, None))
+            continue
+        try:
+            hashes.append((mesh, geometryHashCache.get(mesh, skinIndex=skinIndex)['mesh']))
+        except Exception as e:
+            print 'uExport>>> getSceneStateKey: could not hash ' + mesh + ': ' + str(e)
+            hashes.append((mesh, object()))
+    return hash(tuple(sorted(cmds.ls(l=True)))), tuple(hashes)
+
+class SceneRollback(object):
+    '''
+    Puts an export script's changes in a named undo chunk and undoes it, instead of re-opening the scene.
+    restored is only True if our chunk was the one undone and the scene looks like it did before, node paths and
+    the meshes' point, topology and weight hashes. Scripts that turn undo off, flush the queue or edit through the API
+    leave it False and the caller re-opens the file.
+
+    rollback = SceneRollback('uExport_LOD1', meshes)
+    rollback.begin()
+    ...
+    rollback.end()
+
+    Code that edits the scene outside the undo queue calls SceneRollback.markNotUndoable(reason).
+    '''
+    #rollbacks between begin() and end()
+    active = []
+
+    def __init__(self, name, meshes=None):
+        self.name = name
+        self.meshes = meshes
+        self.before = None
+        self.undoState = None
+        self.restored = False
+        self.open = False
+        self.notUndoable = []
+
+    @classmethod
+    def markNotUndoable(cls, reason):
+        for rollback in cls.active:
+            rollback.notUndoable.append(reason)
+
+    def begin(self):
+        self.before = getSceneStateKey(self.meshes)
+        self.undoState = cmds.undoInfo(q=True, state=True)
+        if not self.undoState:
+            cmds.undoInfo(state=True)
+        cmds.undoInfo(openChunk=True, chunkName=self.name)
+        self.open = True
+        SceneRollback.active.append(self)
+
+    def end(self):
+        if not self.open:
+            return self.restored
+        self.open = False
+        if self in SceneRollback.active:
+            SceneRollback.active.remove(self)
+        cmds.undoInfo(closeChunk=True)
+        try:
+            if cmds.undoInfo(q=True, state=True) and cmds.undoInfo(q=True, undoName=True) == self.name:
+                cmds.undo()
+                self.restored = getSceneStateKey(self.meshes) == self.before and not self.notUndoable
+            if self.notUndoable:
+                print 'uExport>>> SceneRollback: not undoable: ' + ', '.join(self.notUndoable)
+        except Exception as e:
+            print 'uExport>>> SceneRollback:', e
+            self.restored = False
+        finally:
+            if not self.undoState:
+                cmds.undoInfo(state=False)
+        return self.restored
+
+########################################################################
+## BAKE
+########################################################################
+
+BAKE_CHANNELS = ('tx', 'ty', 'tz', 'rx', 'ry', 'rz', 'sx', 'sy', 'sz')
+#if any of these are upstream of the joints, frames have to be evaluated in order
+SIMULATION_TYPES = ('expression', 'nucleus', 'nCloth', 'nRigid', 'hairSystem', 'particle', 'nParticle',
+                    'rigidBody', 'rigidSolver', 'dynamicConstraint', 'field')
+
+#compound plugs that drive a joint's channels without touching tx..sz, HumanIK and other rigs connect these
+BAKE_COMPOUNDS = ('translate', 'rotate', 'scale')
+
+def getIkChains():
+    '''
+    {ikHandle: set of long joint names it solves}, IK sets rotations without a connection on the joint.
+    Returns None if a handle's chain can't be read.
+    '''
+    chains = {}
+    for handle in cmds.ls(type='ikHandle', l=1) or []:
+        try:
+            chain = cmds.ikHandle(handle, q=1, jointList=1) or []
+            effector = cmds.ikHandle(handle, q=1, endEffector=1)
+            if effector:
+                chain += cmds.listConnections(effector + '.translateX', s=1, d=0, type='joint') or []
+        except Exception:
+            return None
+        chains[handle] = set(cmds.ls(chain, l=1) or [])
+    return chains
+
+def getIkJoints():
+    '''
+    Long names of every joint an ikHandle solves, None if a handle's chain can't be read.
+    '''
+    chains = getIkChains()
+    if chains is None:
+        return None
+    ikJoints = set()
+    for chain in chains.values():
+        ikJoints.update(chain)
+    return ikJoints
+
+TIME_CURVE_TYPES = ('animCurveTL', 'animCurveTA', 'animCurveTT', 'animCurveTU')
+
+def isConstantCurve(curve, start, end):
+    '''
+    True if a time curve holds one value over start..end: every key in the range and the key on either side share
+    a value and have flat tangents. Cycling or linear infinity makes every key count. Reads keys, nothing is evaluated.
+    '''
+    infinity = cmds.setInfinity(curve, q=1, pri=1, poi=1) or []
+    if [i for i in infinity if i != 'constant']:
+        rangeFlags = {}
+    else:
+        #findKeyframe wraps around at the ends of the curve
+        start = min(start, cmds.findKeyframe(curve, t=(start, start), which='previous'))
+        end = max(end, cmds.findKeyframe(curve, t=(end, end), which='next'))
+        rangeFlags = {'t':(start, end)}
+    if len(set(cmds.keyframe(curve, q=1, vc=1, **rangeFlags) or [])) > 1:
+        return False
+    return not [angle for angle in cmds.keyTangent(curve, q=1, ia=1, oa=1, **rangeFlags) or [] if angle != 0.0]
+
+def isConstantOverRange(plug, start, end):
+    '''
+    True if the plug evaluates to the same value on every frame bakeResults would sample from start to end.
+    Evaluates the plug per frame, only for curves that aren't on time (driven keys).
+    '''
+    value = cmds.getAttr(plug, t=start)
+    frame = start + 1
+    while frame <= end:
+        if cmds.getAttr(plug, t=frame) != value:
+            return False
+        frame += 1
+    return True
+
+def planBake(joints, start, end):
+    '''
+    Sorts the joints' transform channels: unconnected ones are left alone, ones on an anim curve that evaluates to a
+    single value over start..end are set once (static), everything else (curves, constraints, IK, the rig) is baked.
+    If the IK chains can't be read every channel of every joint is baked, as before.
+    Returns {'bake':[plugs], 'static':{plug:value}, 'baked':[joints], 'skipped':[joints], 'simulation':bool, 'full':bool}
+    '''
+    plan = {'bake':[], 'static':{}, 'baked':[], 'skipped':[], 'simulation':False, 'full':False}
+    ikJoints = getIkJoints()
+    if ikJoints is None:
+        cmds.warning('uExport>>> planBake: could not read the IK chains, baking every channel of every joint.')
+        plan['full'] = True
+        plan['bake'] = [joint + '.' + channel for joint in joints for channel in BAKE_CHANNELS]
+        plan['baked'] = list(joints)
+    for joint in joints:
+        if plan['full']:
+            break
+        #IK, or a rig driving the compound plugs: every channel moves
+        driven = (cmds.ls(joint, l=1) or [joint])[0] in ikJoints
+        for compound in BAKE_COMPOUNDS:
+            if not driven and cmds.listConnections(joint + '.' + compound, s=1, d=0):
+                driven = True
+        bake = []
+        for channel in BAKE_CHANNELS:
+            plug = joint + '.' + channel
+            if driven:
+                bake.append(plug)
+                continue
+            driver = cmds.listConnections(plug, s=1, d=0, scn=1)
+            if not driver:
+                continue
+            driverType = cmds.nodeType(driver[0])
+            if driverType.startswith('animCurve') and not cmds.getAttr(plug, lock=True):
+                if driverType in TIME_CURVE_TYPES and not cmds.listConnections(driver[0] + '.input', s=1, d=0):
+                    static = isConstantCurve(driver[0], start, end)
+                else:
+                    static = isConstantOverRange(plug, start, end)
+                if static:
+                    plan['static'][plug] = cmds.getAttr(plug, t=start)
+                    continue
+            bake.append(plug)
+        if bake:
+            plan['bake'].extend(bake)
+            plan['baked'].append(joint)
+        else:
+            plan['skipped'].append(joint)
+    if plan['baked']:
+        plan['simulation'] = bool(cmds.ls(cmds.listHistory(plan['baked']) or [], type=SIMULATION_TYPES))
+    return plan
+
+def bakeJoints(joints, start, end):
+    '''
+    Bakes only the joint channels that are driven over the range (see planBake), without stepping through
+    time unless something upstream simulates, and sets static channels once. Returns the plan with timings.
+    '''
+    startTime = time.time()
+    plan = planBake(joints, start, end)
+    plan['planTime'] = time.time() - startTime
+
+    for plug, value in plan['static'].items():
+        source = cmds.listConnections(plug, s=1, d=0, p=1)
+        if source:
+            cmds.disconnectAttr(source[0], plug)
+        cmds.setAttr(plug, value)
+
+    if plan['bake']:
+        cmds.refresh(suspend=True)
+        try:
+            cmds.bakeResults(plan['bake'], sm=plan['simulation'], sb=1, dic=True, t=(start, end))
+        finally:
+            cmds.refresh(suspend=False)
+    plan['elapsed'] = time.time() - startTime
+
+    print 'uExport>>> bake: ' + str(len(plan['baked'])) + ' of ' + str(len(joints)) + ' joints baked (' + str(len(plan['bake'])) + ' channels), ' \
+          + str(len(plan['skipped'])) + ' skipped, ' + str(len(plan['static'])) + ' static channels set once, simulation ' \
+          + ('on' if plan['simulation'] else 'off') + ', in %.2f seconds (%.2f planning).' % (plan['elapsed'], plan['planTime'])
+    return plan
+
+########################################################################
+## EXPORT FINGERPRINT
+########################################################################
+
+MANIFEST_FILE = 'uExport_manifest.json'
+
+def hashDoubles(h, values):
+    h.update(array.array('d', values).tostring())
+
+def hashInts(h, values):
+    h.update(array.array('i', values).tostring())
+
+def hashMesh(h, mesh, skinIndex=None):
+    '''
+    Topology, points, uvs and, if skinned, influences and weights, see GeometryHashCache
+    '''
+    h.update(geometryHashCache.get(mesh, skinIndex=skinIndex)['mesh'])
+
+def hashJoints(h, joints):
+    '''
+    Hierarchy (full paths) and world matrices of the joints
+    '''
+    sel = om.MSelectionList()
+    for joint in joints:
+        sel.add(joint)
+    for i in range(0, sel.length()):
+        dagPath = sel.getDagPath(i)
+        h.update(dagPath.fullPathName())
+        hashDoubles(h, list(dagPath.inclusiveMatrix()))
+
+def getAnimationSources(nodes):
+    '''
+    (animCurves, expressions, constraints) upstream of the nodes, including the rig behind ikHandles solving them.
+    Returns None if an IK chain can't be read.
+    '''
+    chains = getIkChains()
+    if chains is None:
+        return None
+    longNodes = set(cmds.ls(nodes, l=1) or [])
+    sources = list(nodes) + sorted([handle for handle in chains if chains[handle] & longNodes])
+    history = cmds.listHistory(sources) or []
+    return (sorted(set(cmds.ls(history, type='animCurve') or [])),
+            sorted(set(cmds.ls(history, type='expression') or [])),
+            sorted(set(cmds.ls(history, type='constraint') or [])))
+
+def hashCurve(h, curve, start, end):
+    '''
+    Keys, values and tangents of a time curve inside start..end plus the key on either side, which shapes the
+    range too. Driven key curves, and curves cycling or extrapolating past their ends, have all their keys hashed.
+    '''
+    h.update(curve)
+    for destination in sorted(cmds.listConnections(curve, p=1, s=0, d=1) or []):
+        h.update(destination)
+    infinity = cmds.setInfinity(curve, q=1, pri=1, poi=1) or []
+    h.update(str(infinity))
+    if cmds.nodeType(curve) in TIME_CURVE_TYPES and not [i for i in infinity if i != 'constant']:
+        #findKeyframe wraps around at the ends of the curve
+        start = min(start, cmds.findKeyframe(curve, t=(start, start), which='previous'))
+        end = max(end, cmds.findKeyframe(curve, t=(end, end), which='next'))
+        keys = cmds.keyframe(curve, q=1, t=(start, end), tc=1, vc=1) or []
+        rangeFlags = {'t':(start, end)}
+    else:
+        keys = cmds.keyframe(curve, q=1, fc=1, vc=1) or []
+        rangeFlags = {}
+    hashDoubles(h, keys)
+    for flag in ('itt', 'ott'):
+        h.update(str(cmds.keyTangent(curve, q=1, **dict(rangeFlags, **{flag:1}))))
+    hashDoubles(h, cmds.keyTangent(curve, q=1, ia=1, oa=1, **rangeFlags) or [])
+
+def hashAnimation(h, nodes, start, end):
+    '''
+    Everything upstream of the nodes that moves them inside the export range: anim curves (on the joints, rig controls,
+    IK handles or driven keys), expression strings and constraint target weights. If the IK chains can't be read
+    the range is sampled, local matrices of the nodes on every frame.
+    '''
+    if not nodes:
+        return
+    sources = getAnimationSources(nodes)
+    if sources is None:
+        h.update('sampled')
+        frame = start
+        while frame <= end:
+            for node in nodes:
+                hashDoubles(h, cmds.getAttr(node + '.matrix', t=frame) or [])
+            frame += 1
+        return
+    curves, expressions, constraints = sources
+    for curve in curves:
+        hashCurve(h, curve, start, end)
+    for expression in expressions:
+        h.update(expression)
+        h.update(cmds.expression(expression, q=1, s=1) or '')
+    for constraint in constraints:
+        h.update(constraint)
+        for weight in sorted(cmds.listAttr(constraint, ud=1) or []):
+            value = cmds.getAttr(constraint + '.' + weight)
+            if isinstance(value, (int, float)):
+                h.update(weight)
+                hashDoubles(h, [value])
+
+def hashFile(h, filePath):
+    if filePath and os.path.isfile(filePath):
+        with open(filePath, 'rb') as f:
+            h.update(f.read())
+    else:
+        h.update('missing:' + str(filePath))
+
+def getExportFingerprints(uNode, path, mesh=1, anim=1, exportLODs=False, bake=False, clips=None):
+    '''
+    {output fbx: sha1} over everything that ends up in that fbx: meshes (topology, points, skin weights),
+    joint hierarchy and transforms, the animation driving the joints in the playback range (see hashAnimation),
+    fbx flags and the LOD export script.
+    With clips, one per clip over its own range.
+    '''
+    start = cmds.playbackOptions(min=True, q=True)
+    end = cmds.playbackOptions(max=True, q=True)
+    joints = uNode.getDescendantJoints() or []
+    rootAndJoints = list(uNode.export_root or []) + joints
+
+    if clips:
+        fingerprints = {}
+        clipBase = hashlib.sha1()
+        clipBase.update(json.dumps([UEXPORT_VER, 'clip']))
+        hashJoints(clipBase, rootAndJoints)
+        for clip in getExportClips(uNode, clips):
+            h = clipBase.copy()
+            h.update(json.dumps(getFbxFlagState(uNode.fbxExportProperties, start=clip['start'], end=clip['end'])))
+            hashAnimation(h, rootAndJoints, clip['start'], clip['end'])
+            fingerprints[getClipExportPath(path, clip)] = h.hexdigest()
+        return fingerprints
+
+    skinIndex = SkinClusterIndex()
+    base = hashlib.sha1()
+    base.update(json.dumps([UEXPORT_VER, bool(mesh), bool(anim), bool(bake), bool(exportLODs)]))
+    base.update(json.dumps(getFbxFlagState(uNode.fbxExportProperties)))
+    hashJoints(base, rootAndJoints)
+
+    fingerprints = {}
+    if mesh and exportLODs:
+        lodDicts = uNode.getLodDicts() or {}
+        for lodNum in lodDicts:
+            if lodDicts[lodNum]['meshes']:
+                h = base.copy()
+                h.update('LOD' + str(lodNum))
+                for m in sorted(lodDicts[lodNum]['meshes']):
+                    hashMesh(h, m, skinIndex=skinIndex)
+                hashFile(h, lodDicts[lodNum]['export_script'])
+                fingerprints[getLodExportPath(path, lodNum, lodDicts[lodNum]['fbx_name'])] = h.hexdigest()
+    elif path:
+        h = base.copy()
+        if mesh and not bake:
+            for m in sorted(uNode.rendermeshes_LOD0 or []):
+                hashMesh(h, m, skinIndex=skinIndex)
+        if anim or bake:
+            hashAnimation(h, rootAndJoints, start, end)
+        fingerprints[path] = h.hexdigest()
+    return fingerprints
+
+class ExportManifest(object):
+    '''
+    uExport_manifest.json in an export folder: per fbx the input fingerprint it was written from
+    and the fbx's own sha1, size and mtime (a changed or deleted fbx is never up to date)
+    '''
+    def __init__(self, folder):
+        self.folder = folder
+        self.path = os.path.join(folder, MANIFEST_FILE)
+        self.entries = {}
+        self.dirty = False
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    self.entries = json.load(f)
+            except ValueError as e:
+                print 'uExport>>> Ignoring broken manifest ' + self.path + ':', e
+
+    def fileInfo(self, fbx, full=False):
+        st = os.stat(fbx)
+        info = {'size':st.st_size, 'mtime':st.st_mtime}
+        if full:
+            h = hashlib.sha1()
+            hashFile(h, fbx)
+            info['sha1'] = h.hexdigest()
+        return info
+
+    def isUpToDate(self, fbx, fingerprint):
+        entry = self.entries.get(os.path.basename(fbx))
+        if not entry or entry.get('fingerprint') != fingerprint or not os.path.isfile(fbx):
+            return False
+        info = self.fileInfo(fbx)
+        if info['size'] == entry.get('size') and info['mtime'] == entry.get('mtime'):
+            return True
+        #touched but maybe not changed (synced, copied), the content decides
+        return self.fileInfo(fbx, full=True)['sha1'] == entry.get('sha1')
+
+    def record(self, fbx, fingerprint, node=None):
+        if not os.path.isfile(fbx):
+            return
+        entry = self.fileInfo(fbx, full=True)
+        entry.update({'fingerprint':fingerprint, 'node':node, 'scene':cmds.file(q=True, sceneName=True),
+                      'time':time.strftime('%Y-%m-%d %H:%M:%S')})
+        self.entries[os.path.basename(fbx)] = entry
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmpFile = self.path + '.' + str(os.getpid())
+        with open(tmpFile, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+        os.rename(tmpFile, self.path)
+        self.dirty = False
+
+class ExportManifests(object):
+    #one ExportManifest per output folder
+    def __init__(self):
+        self.manifests = {}
+
+    def get(self, fbx):
+        folder = os.path.dirname(os.path.abspath(fbx))
+        if folder not in self.manifests:
+            self.manifests[folder] = ExportManifest(folder)
+        return self.manifests[folder]
+
+    def isUpToDate(self, fbx, fingerprint):
+        return self.get(fbx).isUpToDate(fbx, fingerprint)
+
+    def record(self, fbx, fingerprint, node=None):
+        self.get(fbx).record(fbx, fingerprint, node=node)
+
+    def save(self):
+        for manifest in self.manifests.values():
+            try:
+                manifest.save()
+            except (IOError, OSError) as e:
+                print 'uExport>>> Could not write manifest ' + manifest.path + ':', e
+
+def getStaleExports(fingerprints, manifests=None):
+    '''
+    The fbx paths whose fingerprint doesn't match the manifest beside them
+    '''
+    if manifests is None:
+        manifests = ExportManifests()
+    return [fbx for fbx in sorted(fingerprints) if not manifests.isUpToDate(fbx, fingerprints[fbx])]
+
+
+def getStoredExportPath(uNode):
+    '''
+    folder_path + fbx_name as the tool remembers them, None if either is missing
+    '''
+    if not uNode.folder_path or not uNode.fbx_name:
+        return None
+    folder = uNode.folder_path.replace('\\', '/')
+    if not folder.endswith('/'):
+        folder += '/'
+    return folder + uNode.fbx_name
+
+def getLodExportPath(path, lodNum, fbxName=None):
+    #LODs go next to the main fbx as name_LODn.fbx unless the LOD has its own fbx name
+    if fbxName:
+        justFilePath = path.replace(path.split('/')[-1],'')
+        return justFilePath + fbxName
+    return path[:-4] + '_LOD' + str(lodNum) + '.fbx'
+
+def getClipExportPath(path, clip):
+    #clips go next to the main fbx as name_clip.fbx unless the clip has its own fbx name
+    if clip.get('fbx'):
+        justFilePath = path.replace(path.split('/')[-1],'')
+        return justFilePath + clip['fbx']
+    return path[:-4] + '_' + clip['name'] + '.fbx'
+
+def getExportClips(uNode, clips):
+    '''
+    clips as export() takes them, True for all of the node's clips or a list of clip names, as clip dicts
+    '''
+    allClips = uNode.getAnimClips()
+    if clips is True:
+        return allClips
+    return [clip for clip in allClips if clip['name'] in clips]
+
+def getExportPaths(uNode, path, mesh=1, anim=1, exportLODs=False, clips=None):
+    '''
+    Every fbx export() will write for these arguments
+    '''
+    if not path:
+        return []
+    if clips:
+        return [getClipExportPath(path, clip) for clip in getExportClips(uNode, clips)]
+    if mesh and exportLODs:
+        lodDicts = uNode.getLodDicts() or {}
+        return [getLodExportPath(path, lodNum, lodDicts[lodNum]['fbx_name']) for lodNum in lodDicts if lodDicts[lodNum]['meshes']]
+    return [path]
+
+def getExportPlan(jobs, exportLODs=False):
+    '''
+    jobs: [(uNode, path, mesh, anim)] or [(uNode, path, mesh, anim, clips)], returns [(uNode, path, mesh, anim, outputPaths)]
+    '''
+    plan = []
+    for job in jobs:
+        uNode, path, mesh, anim = job[:4]
+        clips = job[4] if len(job) > 4 else None
+        plan.append((uNode, path, mesh, anim, getExportPaths(uNode, path, mesh=mesh, anim=anim, exportLODs=exportLODs, clips=clips)))
+    return plan
+
+def prepareExportPaths(paths, useP4=True, client=None, changelist=None):
+    '''
+    Makes every output path writable before anything is exported: one batched P4 edit for the files
+    the depot has, the rest are new. Returns (failed {path: reason}, pending) where pending
+    ({'edited':[paths], 'add':[paths]}) goes to finishExportPaths once the fbx files are written, or not.
+    '''
+    paths = sorted(set([p for p in paths if p]))
+    pending = {'edited':[], 'add':[]}
+    if useP4 and paths:
+        try:
+            import uExportP4
+            with uExportP4.p4Pool.connection(client=client) as p4:
+                if p4:
+                    toEdit, alreadyOpen, pending['add'] = uExportP4.sortForWrite(p4, paths)
+                    pending['edited'] = uExportP4.editFiles(p4, toEdit, changelist=changelist)
+                    print 'uExport>>> P4: opened', len(toEdit), 'files for edit,', len(alreadyOpen), 'already open,', \
+                          len(pending['add']), 'to add after export'
+        except ImportError:
+            print 'uExport>>> Perforce lib not found, only checking that the export files are writable.'
+        except Exception as e:
+            print 'uExport>>> P4 checkout failed:', e
+
+    failed = {}
+    for path in paths:
+        if not isWritable(path):
+            failed[path] = 'read-only, not checked out'
+    return failed, pending
+
+def finishExportPaths(pending, client=None, changelist=None, written=None):
+    '''
+    Marks the new fbx files for add and reverts the files prepareExportPaths opened that came out unchanged
+    (or were never written). written limits the adds to those paths, pass [] when the export was cancelled.
+    '''
+    toAdd = pending['add'] if written is None else [path for path in pending['add'] if path in written]
+    if not toAdd and not pending['edited']:
+        return []
+    try:
+        import uExportP4
+        with uExportP4.p4Pool.connection(client=client) as p4:
+            if p4:
+                uExportP4.revertUnchanged(p4, pending['edited'])
+                added = uExportP4.addFiles(p4, toAdd, changelist=changelist)
+                print 'uExport>>> P4: marked', len(added), 'new files for add, reverted unchanged files of', len(pending['edited']), 'opened'
+                return added
+    except ImportError:
+        pass
+    except Exception as e:
+        print 'uExport>>> P4 add failed:', e
+    return []
+
+def exportLod(uNode, lodNum, path):
+    '''
+    Runs the LOD's export script and exports it, the scene is left as the script made it.
+    This is what a LOD worker does (see uExportBatch), returns the fbx path written.
+    '''
+    lodDicts = uNode.getLodDicts()
+    filePath = lodDicts[lodNum]['export_script']
+    if filePath:
+        if os.path.isfile(filePath):
+            uExportNode = uNode
+            execfile(filePath)
+        else:
+            cmds.error('UEXPORT>> Cannot find export script: ' + filePath)
+
+    toExport = list(lodDicts[lodNum]['meshes']) + uNode.getDescendantJoints()
+    cmds.select(toExport)
+    setExportFlags(uNode)
+    new_fpath = getLodExportPath(path, lodNum, lodDicts[lodNum]['fbx_name'])
+    print "FBXExport -f \"" + new_fpath + "\" -s"
+    mel.eval("FBXExport -f \"" + new_fpath + "\" -s")
+    cmds.select(d=1)
+    return new_fpath
+
+def startLodWorkers(uNode, path, lods, maxWorkers, suppressSave=False, log=None):
+    '''
+    Starts one mayapy worker per LOD on the saved scene, returns the uExportBatch.WorkerPool or None
+    if the scene isn't saved (the LODs are then exported in this session as before)
+    '''
+    import uExportBatch
+
+    scene = cmds.file(q=True, sceneName=True)
+    if not scene:
+        cmds.warning('uExport>>> export: the scene has never been saved, exporting scripted LODs in this session.')
+        return None
+    if cmds.file(q=True, modified=True):
+        saveResult = 'Save and Continue'
+        if not suppressSave:
+            saveResult = cmds.confirmDialog(title = "Save Warning", message="Scripted LODs are exported from the saved file by background workers. Save it now?", button = ["Save and Continue", "Export In This Session"], defaultButton='Save and Continue', cancelButton='Export In This Session', dismissString='Export In This Session')
+        if saveResult != 'Save and Continue':
+            return None
+        cmds.file(save=True)
+
+    pool = uExportBatch.WorkerPool(maxWorkers=maxWorkers, log=log)
+    pool.start([('LOD' + str(lodNum), ['lod', '--scene', scene, '--node', uNode.node, '--lod', str(lodNum), '--path', path])
+                for lodNum in lods])
+    if pool.running:
+        print 'uExport>>> export: started', len(lods), 'scripted LODs on', min(maxWorkers, len(lods)), 'workers'
+    return pool
+
+def waitLodWorkers(pool, written=None):
+    '''
+    Returns (ok, notStarted): the LOD numbers whose worker could not be started, export those in this session
+    '''
+    results = pool.wait()
+    failed = []
+    notStarted = []
+    for jobId in sorted(results):
+        result = results[jobId]
+        if result['returncode'] == 0 and result['result'] and result['result']['ok']:
+            print 'uExport>>> export: ' + jobId + ' wrote ' + result['result']['fbx'] + ' in %.2f seconds.' % result['elapsed']
+            if written:
+                written(result['result']['fbx'])
+        elif result.get('startError'):
+            notStarted.append(int(jobId[len('LOD'):]))
+        else:
+            failed.append(jobId)
+    if notStarted:
+        cmds.warning('uExport>>> export: could not start LOD workers (' + results['LOD' + str(notStarted[0])]['startError'] + '), exporting LOD ' + ', '.join([str(lodNum) for lodNum in notStarted]) + ' in this session.')
+    if failed:
+        cmds.warning('uExport>>> export: LOD workers failed: ' + ', '.join(failed) + ', see the log above.')
+    return not failed, notStarted
+
+def exportAnimClips(uNode, path, clips, stale=None, written=None):
+    '''
+    Bakes the skeleton once over the union of the clip ranges and writes every clip's fbx from the baked keys,
+    so the rig is evaluated once instead of once per clip. The bake is undone afterwards (see SceneRollback).
+    FBXExport only runs on the main thread, the clips are written one after the other.
+    '''
+    if not uNode.export_root:
+        cmds.warning('uExport>>> exportAnimClips: No skeleton root set on ' + uNode.node)
+        return False
+    todo = [(clip, getClipExportPath(path, clip)) for clip in clips]
+    if stale is not None:
+        todo = [(clip, clipPath) for clip, clipPath in todo if clipPath in stale]
+    if not todo:
+        return True
+
+    skeleton = (uNode.export_root or []) + (uNode.getDescendantJoints() or [])
+    startTime = min([clip['start'] for clip, clipPath in todo])
+    endTime = max([clip['end'] for clip, clipPath in todo])
+
+    rollback = SceneRollback('uExport_clips')
+    rollback.begin()
+    try:
+        bakeJoints(skeleton, startTime, endTime)
+
+        for clip, clipPath in todo:
+            cmds.select(skeleton)
+            setExportFlags(uNode, start=clip['start'], end=clip['end'])
+            # Export!
+            print "FBXExport -f \"" + clipPath + "\" -s"
+            mel.eval("FBXExport -f \"" + clipPath + "\" -s")
+            if written:
+                written(clipPath)
+    finally:
+        cmds.select(d=1)
+        rollback.end()
+
+    if not rollback.restored:
+        cmds.warning('uExport>>> exportAnimClips: could not undo the clip bake on ' + uNode.node + ', re-open the scene without saving.')
+    return True
+
+def export(uNode, mesh=1, anim=1, path=None, bake=False, exportLODs=False, resetAfterExport=False, suppressSave=False,
+           lodWorkers=0, log=None, saveBeforeScripts=True, incremental=False, clips=None):
+    '''
+    incremental=True skips every fbx whose input fingerprint matches the manifest in its folder and records
+    the ones written (see getExportFingerprints), a precomputed fingerprint dict can be passed instead of True
+    clips=True exports all of the node's anim clips, or a list of clip names, instead of the current time range
+    '''
+
+    # check if the file is checked out/writeable
+    if not isWritable(path):
+        cmds.warning('uExport>>> export: Please ensure you have {0} checked out'.format(path))
+        return False
+
+    toExport = []
+
+    if not path:
+        oldPath = path
+        path = cmds.file(sceneName=1, q=1)
+        cmds.warning('No valid path set for export [' + str(oldPath) + ']/nExporting to Maya file loc: ' + path)
+        toExport.extend(uNode.getDescendantJoints())
+
+    #only the fbx files whose inputs changed since they were last written
+    manifests = None
+    stale = None
+    if incremental:
+        fingerprints = incremental if isinstance(incremental, dict) else getExportFingerprints(uNode, path, mesh=mesh, anim=anim, exportLODs=exportLODs, bake=bake, clips=clips)
+        manifests = ExportManifests()
+        stale = getStaleExports(fingerprints, manifests)
+        if len(stale) < len(fingerprints):
+            print 'uExport>>> export: ' + str(len(fingerprints) - len(stale)) + ' of ' + str(len(fingerprints)) + ' files up to date for ' + uNode.node
+        if not stale:
+            return True
+    def written(fbx):
+        if manifests:
+            manifests.record(fbx, fingerprints[fbx], node=uNode.node)
+            manifests.save()
+
+    if clips:
+        return exportAnimClips(uNode, path, getExportClips(uNode, clips), stale=stale, written=written)
+
+    #kvassey -- adding support for baking to root in rig before export
+    if bake:
+        print "Bake Root Checked"
+        #copy root skeleton with input connections under new group
+        cmds.select(cl=True)
+        currRoot = uNode.export_root
+        exportSkel = cmds.duplicate(currRoot, un=True, rc=False, po=False)
+        tempGrp = cmds.group(exportSkel[0])
+        #rename root joint
+        dupRoot = cmds.rename(exportSkel[0], currRoot)
+        #bake only the joints that move, static and undriven ones keep their values
+        startTime = cmds.playbackOptions(min=True, q=True)
+        endTime = cmds.playbackOptions(max=True, q=True)
+        bakeJoints(cmds.listRelatives(tempGrp, type='joint', allDescendents=True, f=True) or [], startTime, endTime)
+
+        #move FBX export inside here, skip rest.
+        #toExport.extend(cmds.listRelatives(cmds.listConnections(dupRoot), type='joint',allDescendents=True))
+        #cmds.select(toExport)
+        cmds.select(dupRoot, r=True, hi=True)
+        toExport = cmds.ls(sl=True, type='joint')
+        cmds.select(toExport, r=True)
+        setExportFlags(uNode)
+        # Export!
+        print "FBXExport -f \""+ path +"\" -s"
+        mel.eval("FBXExport -f \""+ path +"\" -s")
+        written(path)
+
+        cmds.delete(tempGrp)
+        toExport = []
+
+
+    #Assuming the meshes are skinned, maybe work with static later
+    else:
+        exportScript = False
+
+        if mesh:
+            #we're not exporting LODs
+            if not exportLODs:
+                meshes = uNode.rendermeshes_LOD0
+                if meshes:
+                    toExport.extend(uNode.rendermeshes_LOD0)
+                else:
+                    cmds.warning('uExport>>> export: No rendermeshes found.')
+            #ok, we're exporting LODs
+            else:
+                lodDicts = uNode.getLodDicts()
+                if lodDicts:
+                    if exportLODs:
+                        #scripted LODs can go to mayapy workers that export them from the saved scene in parallel
+                        pool = None
+                        if stale is not None:
+                            lodDicts = dict([(lodNum, lodDicts[lodNum]) for lodNum in lodDicts
+                                             if getLodExportPath(path, lodNum, lodDicts[lodNum]['fbx_name']) in stale])
+                        scripted = [lodNum for lodNum in lodDicts if lodDicts[lodNum]['meshes'] and lodDicts[lodNum]['export_script']]
+                        if lodWorkers and resetAfterExport and scripted:
+                            pool = startLodWorkers(uNode, path, scripted, lodWorkers, suppressSave=suppressSave, log=log)
+
+                        #LODs whose worker couldn't be started come back and are exported here after all
+                        lodsHere = [lodNum for lodNum in lodDicts if not (pool and lodNum in scripted)]
+                        workersOk = True
+                        while lodsHere or pool:
+                            for lodNum in lodsHere:
+                                #check that there are meshes to be exported at this LOD
+                                if lodDicts[lodNum]['meshes']:
+                                    #check if there is a script
+                                    rollback = None
+                                    if lodDicts[lodNum]['export_script']:
+                                        if resetAfterExport:
+                                            #batch exports never save the scenes they were given
+                                            if saveBeforeScripts:
+                                                # Warn the user that this operation will save their file.
+                                                saveResult = 'Save and Continue'
+                                                if not suppressSave:
+                                                    saveResult = cmds.confirmDialog(title = "Save Warning", message="In order to continue your file must be saved.  Would you like to save it?  If yes it will be saved, and if the export script's changes can't be undone your file will be re-opened after the operation.", button = ["Save and Continue", "Continue Without Saving"], defaultButton='Save and Continue', cancelButton='Continue Without Saving', dismissString='Continue Without Saving')
+                                                if saveResult in ('Yes', 'Save and Continue'):
+                                                    cmds.file(save=True)
+                                                else:
+                                                    cmds.warning('You chose not to save changes. Big-boy pants.')
+
+                                            filePath = lodDicts[lodNum]['export_script']
+
+                                            exportScript = True
+                                            #everything the script and the export do goes in one undo chunk that is undone afterwards
+                                            rollback = SceneRollback('uExport_LOD' + str(lodNum), meshes=uNode.rendermeshes_ALL)
+                                            rollback.begin()
+                                            if os.path.isfile(filePath):
+                                                uExportNode = uNode
+                                                try:
+                                                    execfile(filePath)
+                                                except:
+                                                    rollback.end()
+                                                    raise
+                                            else:
+                                                rollback.end()
+                                                cmds.error('UEXPORT>> Cannot find export script: ' + filePath)
+
+                                    #add items for export
+                                    toExport.extend(lodDicts[lodNum]['meshes'])
+                                    toExport.extend(uNode.getDescendantJoints())
+
+                                    #setup export
+                                    cmds.select(toExport)
+                                    setExportFlags(uNode)
+                                    new_fpath = getLodExportPath(path, lodNum, lodDicts[lodNum]['fbx_name'])
+
+                                    # Export!
+                                    print "FBXExport -f \"" + new_fpath + "\" -s"
+                                    try:
+                                        mel.eval("FBXExport -f \"" + new_fpath + "\" -s")
+                                    finally:
+                                        if rollback:
+                                            rollback.end()
+                                    written(new_fpath)
+
+                                    if rollback and not rollback.restored:
+                                        # Re-open the file without saving.
+                                        print 'uExport>>> export: could not undo the LOD' + str(lodNum) + ' export script, re-opening the scene.'
+                                        fullPath = cmds.file(q = True, sceneName = True)
+                                        cmds.file(fullPath, open=True, f=True)
+
+                                    #clear sel and export list
+                                    cmds.select(d=1)
+                                    toExport = []
+                            lodsHere = []
+                            if pool:
+                                workersOk, lodsHere = waitLodWorkers(pool, written=written)
+                                pool = None
+                        if not workersOk:
+                            return False
+
+        if not exportLODs:
+            if anim:
+                toExport.extend(uNode.getDescendantJoints())
+
+                cmds.select(toExport)
+                setExportFlags(uNode)
+                # Export!
+                print "FBXExport -f \""+ path +"\" -s"
+                mel.eval("FBXExport -f \""+ path +"\" -s")
+                written(path)
+    return True
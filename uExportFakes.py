@@ -0,0 +1,117 @@
+'''
+uExportFakes
+Stand-ins for the servers uExport talks to, no Maya in here, used by uExportBench and the tests:
+
+import uExportFakes, uExportP4
+p4 = uExportFakes.FakeP4({'//depot/ArtSource/char/hero.fbx':'edit'})
+uExportP4.openForWrite(p4, [p4.clientFile('//depot/ArtSource/char/hero.fbx')])
+print p4.roundTrips
+'''
+
+import socket
+
+
+class FakeP4(object):
+    '''
+    Stand-in for p4python's P4 over an in memory depot, counts every command sent to the 'server'.
+    depotFiles: {depotFile: headAction}
+    '''
+    def __init__(self, depotFiles=None, clientRoot='C:/ws/'):
+        self.depotFiles = depotFiles or {}
+        self.clientRoot = clientRoot
+        self.client = None
+        self.user = 'fake'
+        self.exception_level = 2
+        self.calls = []
+
+    @property
+    def roundTrips(self):
+        return len(self.calls)
+
+    def connect(self):
+        self.isConnected = True
+
+    def disconnect(self):
+        self.isConnected = False
+
+    def connected(self):
+        return getattr(self, 'isConnected', False)
+
+    def __getattr__(self, name):
+        if name.startswith('run_'):
+            return lambda *args: self.run(name[4:], *args)
+        raise AttributeError(name)
+
+    def localFiles(self):
+        return dict([(self.clientFile(d), d) for d in self.depotFiles])
+
+    def clientFile(self, depotFile):
+        return self.clientRoot + depotFile[2:]
+
+    def run(self, cmd, *args):
+        self.calls.append((cmd,) + args)
+        args = [a for a in args if not a.startswith('-')]
+        results = []
+        localFiles = self.localFiles()
+        if cmd == 'clients':
+            return [{'client':'fake_ws', 'Host':socket.gethostname()}]
+        for arg in args:
+            if cmd == 'describe':
+                results.append({'change':arg, 'user':self.user, 'desc':'fake change ' + arg})
+            elif cmd == 'files' and '...' in arg:
+                root, name = arg.split('...')
+                for depotFile in sorted(self.depotFiles):
+                    if depotFile.startswith(root) and depotFile.split('/')[-1].lower() == name.lower():
+                        results.append({'depotFile':depotFile, 'action':self.depotFiles[depotFile], 'change':'1'})
+            elif cmd in ('fstat', 'edit', 'add', 'revert') and arg in localFiles:
+                depotFile = localFiles[arg]
+                if cmd == 'fstat':
+                    results.append({'depotFile':depotFile, 'clientFile':arg, 'headAction':self.depotFiles[depotFile]})
+                else:
+                    results.append({'depotFile':depotFile, 'action':cmd})
+            elif cmd == 'add':
+                results.append({'clientFile':arg, 'action':'add'})
+            elif arg in self.depotFiles:
+                results.append({'depotFile':arg, 'clientFile':self.clientFile(arg), 'headAction':self.depotFiles[arg],
+                                'action':self.depotFiles[arg], 'change':'1'})
+        if not results and self.exception_level > 1:
+            raise Exception(cmd + ': no such file(s).')
+        return results
+
+def legacyResolveTextures(p4, missingFileDict, root):
+    '''
+    The old rePathFileNodesP4 loop without the UI: files, fstat, sync and fstat per texture
+    '''
+    for f in missingFileDict:
+        parent = (missingFileDict[f]['path'].replace('\\', '/') + f).split('/')[-2]
+        try:
+            files = p4.run_files(root + '...' + f)
+        except Exception:
+            continue
+        depotFileToGrab = None
+        if len(files) > 1:
+            for fileDict in files:
+                if fileDict['depotFile'].split('/')[-2] == parent:
+                    if 'delete' in p4.run('fstat', fileDict['depotFile'])[0]['headAction']:
+                        continue
+                    depotFileToGrab = fileDict['depotFile']
+        else:
+            depotFileToGrab = files[0]['depotFile']
+        if depotFileToGrab:
+            p4.run('sync', '-f', depotFileToGrab)
+            p4.run('fstat', depotFileToGrab)[0]
+
+def buildFakeTextureDepot(textures=500, dupes=0.2, root='//depot/ArtSource/'):
+    '''
+    A depot where a fraction of the textures also exist in a second folder, plus the missingFileDict for them
+    '''
+    depotFiles = {}
+    missingFileDict = {}
+    for i in range(0, textures):
+        name = 'tex_' + str(i) + '.tga'
+        folder = 'char' + str(i % 20)
+        depotFiles[root + folder + '/textures/' + name] = 'edit'
+        if i < textures * dupes:
+            depotFiles[root + 'old/' + folder + '_bak/' + name] = 'edit'
+        missingFileDict[name] = {'path':'D:/art/' + folder + '/textures/', 'node':'file' + str(i)}
+    return depotFiles, missingFileDict
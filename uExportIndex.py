@@ -0,0 +1,336 @@
+'''
+uExportIndex
+Project wide SQLite index of scenes, their uExport nodes and the fbx files they write. No Maya needed,
+scenes are read with uExportScan.
+
+python uExportIndex.py update "D:/chars/*.ma" --list more_scenes.txt --processes 4
+python uExportIndex.py query --fbx hero_LOD1.fbx
+python uExportIndex.py query --root root --json users_of_root.json
+
+import uExportIndex
+index = uExportIndex.SceneIndex('D:/project/uExport_index.db')
+index.update(scenes)
+for node in index.nodes(asset='hero'):
+    print node['scene'], node['node'], node['outputs']
+
+An update only reads scenes whose mtime or size changed, and only rewrites the rows of scenes whose
+sha1 changed. A scene with a fresh .uexport.json sidecar (see uExportCore.sidecarWriter) isn't read at all,
+that is also how .mb scenes get in. Nodes come back as uExportScan node dicts plus 'scene' and 'outputs', [(lod, fbxPath)],
+lod is None for the main fbx.
+'''
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+
+import uExportScan
+
+INDEX_FILE = 'uExport_index.db'
+#bump when the tables change, an index with another version is rebuilt
+INDEX_VERSION = 3
+
+NODE_COLUMNS = ('node', 'path', 'type', 'lodNum') + uExportScan.UEXPORT_STRING_ATTRS + uExportScan.ART_ATTRS
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scenes (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, mtime REAL, size INTEGER,
+                                   sha1 TEXT, source TEXT, indexed REAL, error TEXT);
+CREATE TABLE IF NOT EXISTS nodes (id INTEGER PRIMARY KEY, scene_id INTEGER NOT NULL REFERENCES scenes(id) ON DELETE CASCADE,
+                                  attrs TEXT, %s);
+CREATE TABLE IF NOT EXISTS lods (node_id INTEGER NOT NULL REFERENCES nodes(id) ON DELETE CASCADE, lod INTEGER,
+                                 fbx_name TEXT, export_script TEXT);
+CREATE TABLE IF NOT EXISTS meshes (node_id INTEGER NOT NULL REFERENCES nodes(id) ON DELETE CASCADE, lod INTEGER, mesh TEXT,
+                                   mesh_short TEXT);
+CREATE TABLE IF NOT EXISTS roots (node_id INTEGER NOT NULL REFERENCES nodes(id) ON DELETE CASCADE, root TEXT, root_short TEXT);
+CREATE TABLE IF NOT EXISTS outputs (node_id INTEGER NOT NULL REFERENCES nodes(id) ON DELETE CASCADE, lod INTEGER,
+                                    fbx_path TEXT, fbx_file TEXT);
+CREATE INDEX IF NOT EXISTS nodes_scene ON nodes (scene_id);
+CREATE INDEX IF NOT EXISTS nodes_asset ON nodes (asset_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS lods_node ON lods (node_id);
+CREATE INDEX IF NOT EXISTS meshes_node ON meshes (node_id);
+CREATE INDEX IF NOT EXISTS meshes_short ON meshes (mesh_short);
+CREATE INDEX IF NOT EXISTS roots_node ON roots (node_id);
+CREATE INDEX IF NOT EXISTS roots_short ON roots (root_short);
+CREATE INDEX IF NOT EXISTS outputs_node ON outputs (node_id);
+CREATE INDEX IF NOT EXISTS outputs_file ON outputs (fbx_file);
+''' % ', '.join(['"%s" %s' % (col, 'INTEGER' if col == 'lodNum' else 'TEXT') for col in NODE_COLUMNS])
+
+
+def text(value):
+    #scanned strings are bytes, sqlite wants unicode
+    if isinstance(value, str):
+        return value.decode('utf-8', 'replace')
+    return value
+
+def shortName(name):
+    return name.split('|')[-1].split(':')[-1] if name else name
+
+def getStoredExportPath(nodeDict):
+    '''
+    Same as uExportCore.getStoredExportPath, for a node dict
+    '''
+    if not nodeDict['folder_path'] or not nodeDict['fbx_name']:
+        return None
+    folder = nodeDict['folder_path'].replace('\\', '/')
+    if not folder.endswith('/'):
+        folder += '/'
+    return folder + nodeDict['fbx_name']
+
+def getLodExportPath(path, lodNum, fbxName=None):
+    #same as uExportCore.getLodExportPath
+    if fbxName:
+        justFilePath = path.replace(path.split('/')[-1],'')
+        return justFilePath + fbxName
+    return path[:-4] + '_LOD' + str(lodNum) + '.fbx'
+
+def getClipExportPath(path, clip):
+    #same as uExportCore.getClipExportPath
+    if clip.get('fbx'):
+        justFilePath = path.replace(path.split('/')[-1],'')
+        return justFilePath + clip['fbx']
+    return path[:-4] + '_' + clip['name'] + '.fbx'
+
+def getClips(nodeDict):
+    try:
+        clips = json.loads(nodeDict['anim_clips'] or '[]')
+    except ValueError:
+        return []
+    return [clip for clip in clips if isinstance(clip, dict) and clip.get('name')]
+
+def getOutputs(nodeDict):
+    '''
+    [(lod, fbxPath)] the stored path exports to: the main fbx and anim clips (lod None) and every LOD with meshes
+    '''
+    path = getStoredExportPath(nodeDict)
+    if not path:
+        return []
+    outputs = [(None, path)]
+    for lod, meshes in enumerate(nodeDict['rendermeshes']):
+        if meshes:
+            outputs.append((lod, getLodExportPath(path, lod, nodeDict['fbx_names'][lod])))
+    for clip in getClips(nodeDict):
+        outputs.append((None, getClipExportPath(path, clip)))
+    return outputs
+
+
+## INDEX
+########################################################################
+
+class SceneIndex(object):
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA foreign_keys = ON')
+        if self.db.execute('PRAGMA user_version').fetchone()[0] != INDEX_VERSION:
+            self.rebuild()
+
+    def rebuild(self):
+        with self.db:
+            for table in ('outputs', 'roots', 'meshes', 'lods', 'nodes', 'scenes'):
+                self.db.execute('DROP TABLE IF EXISTS ' + table)
+            self.db.executescript(SCHEMA)
+            self.db.execute('PRAGMA user_version = %d' % INDEX_VERSION)
+
+    def close(self):
+        self.db.close()
+
+    ## update
+    ########################################################################
+    def update(self, scenes, processes=1, force=False, prune=False, sidecars=True, log=None):
+        '''
+        Indexes scenes, skipping the ones whose mtime and size match the index. A changed file with the
+        same sha1 only gets its stat updated. prune drops indexed scenes that are gone from disk.
+        sidecars takes the nodes from a fresh .uexport.json instead of reading the scene, sha1 is None then.
+        Returns {'scanned', 'unchanged', 'touched', 'failed', 'removed'} counts.
+        '''
+        known = dict([(row['path'], row) for row in self.db.execute('SELECT id, path, mtime, size, sha1 FROM scenes')])
+        counts = {'scanned':0, 'unchanged':0, 'touched':0, 'failed':0, 'removed':0}
+        todo = []
+        for scene in scenes:
+            scene = text(os.path.abspath(scene))
+            row = known.get(scene)
+            try:
+                st = os.stat(scene)
+            except OSError:
+                continue
+            if row and not force and row['mtime'] == st.st_mtime and row['size'] == st.st_size:
+                counts['unchanged'] += 1
+            else:
+                todo.append(scene)
+
+        for result in uExportScan.scanScenes(todo, processes=processes, hashFile=True, useSidecar=sidecars):
+            scene = text(result['scene'])
+            row = known.get(scene)
+            with self.db:
+                if row and not force and row['sha1'] and row['sha1'] == result['sha1']:
+                    #saved again without changes
+                    self.db.execute('UPDATE scenes SET mtime=?, size=? WHERE id=?', (result['mtime'], result['size'], row['id']))
+                    counts['touched'] += 1
+                    continue
+                self.storeScene(scene, result)
+            if result['ok']:
+                counts['scanned'] += 1
+            else:
+                counts['failed'] += 1
+            if log:
+                log('uExportIndex>>> %s: %s' % (scene, ('%d uExport nodes (%s)' % (len(result['nodes']), result['source']))
+                                                     if result['ok'] else result['error']))
+
+        if prune:
+            with self.db:
+                for scene, row in known.items():
+                    if not os.path.exists(scene):
+                        self.db.execute('DELETE FROM scenes WHERE id=?', (row['id'],))
+                        counts['removed'] += 1
+        return counts
+
+    def storeScene(self, scene, result):
+        '''
+        Replaces everything indexed for the scene with a scanSceneResult, call inside a transaction
+        '''
+        self.db.execute('DELETE FROM scenes WHERE path=?', (scene,))
+        sceneId = self.db.execute('INSERT INTO scenes (path, mtime, size, sha1, source, indexed, error) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                  (scene, result['mtime'], result['size'], result['sha1'], result['source'], time.time(),
+                                   text(result['error']))).lastrowid
+        insertNode = 'INSERT INTO nodes (scene_id, attrs, %s) VALUES (?, ?, %s)' % (', '.join(['"%s"' % c for c in NODE_COLUMNS]),
+                                                                                   ', '.join(['?'] * len(NODE_COLUMNS)))
+        for nodeDict in result['nodes']:
+            nodeId = self.db.execute(insertNode, [sceneId, text(' '.join(nodeDict['attrs']))] +
+                                     [text(nodeDict[col]) for col in NODE_COLUMNS]).lastrowid
+            self.db.executemany('INSERT INTO lods (node_id, lod, fbx_name, export_script) VALUES (?, ?, ?, ?)',
+                                [(nodeId, lod, text(nodeDict['fbx_names'][lod]), text(nodeDict['export_scripts'][lod]))
+                                 for lod in range(len(nodeDict['fbx_names']))])
+            self.db.executemany('INSERT INTO meshes (node_id, lod, mesh, mesh_short) VALUES (?, ?, ?, ?)',
+                                [(nodeId, lod, text(mesh), text(shortName(mesh)))
+                                 for lod, meshes in enumerate(nodeDict['rendermeshes']) for mesh in meshes])
+            self.db.executemany('INSERT INTO roots (node_id, root, root_short) VALUES (?, ?, ?)',
+                                [(nodeId, text(root), text(shortName(root))) for root in nodeDict['export_root']])
+            self.db.executemany('INSERT INTO outputs (node_id, lod, fbx_path, fbx_file) VALUES (?, ?, ?, ?)',
+                                [(nodeId, lod, text(path), text(path.split('/')[-1].lower())) for lod, path in getOutputs(nodeDict)])
+
+    ## queries
+    ########################################################################
+    def nodes(self, asset=None, root=None, mesh=None, fbx=None, scene=None):
+        '''
+        Node dicts matching every filter given: asset name, root joint, LOD mesh (short names match
+        any path), fbx file name or full fbx path, scene path
+        '''
+        where = []
+        args = []
+        if asset:
+            where.append('nodes.asset_name = ? COLLATE NOCASE')
+            args.append(text(asset))
+        if root:
+            where.append('nodes.id IN (SELECT node_id FROM roots WHERE root = ? OR root_short = ?)')
+            args.extend([text(root), text(shortName(root))])
+        if mesh:
+            where.append('nodes.id IN (SELECT node_id FROM meshes WHERE mesh = ? OR mesh_short = ?)')
+            args.extend([text(mesh), text(shortName(mesh))])
+        if fbx:
+            fbx = text(fbx).replace('\\', '/')
+            if '/' in fbx:
+                where.append('nodes.id IN (SELECT node_id FROM outputs WHERE fbx_path = ? COLLATE NOCASE)')
+            else:
+                where.append('nodes.id IN (SELECT node_id FROM outputs WHERE fbx_file = ?)')
+                fbx = fbx.lower()
+            args.append(fbx)
+        if scene:
+            where.append('scenes.path = ?')
+            args.append(text(os.path.abspath(scene)))
+
+        query = 'SELECT nodes.*, scenes.path AS scene FROM nodes JOIN scenes ON scenes.id = nodes.scene_id'
+        if where:
+            query += ' WHERE ' + ' AND '.join(where)
+        query += ' ORDER BY scenes.path, nodes.path'
+        rows = self.db.execute(query, args).fetchall()
+        return [self.nodeDict(row) for row in rows]
+
+    def nodeDict(self, row):
+        nodeDict = uExportScan.emptyNodeDict(row['node'])
+        for col in NODE_COLUMNS:
+            nodeDict[col] = row[col]
+        nodeDict['attrs'] = (row['attrs'] or '').split()
+        nodeDict['scene'] = row['scene']
+        for lod in self.db.execute('SELECT lod, fbx_name, export_script FROM lods WHERE node_id=?', (row['id'],)):
+            if lod['lod'] in uExportScan.LOD_RANGE:
+                nodeDict['fbx_names'][lod['lod']] = lod['fbx_name']
+                nodeDict['export_scripts'][lod['lod']] = lod['export_script']
+        for mesh in self.db.execute('SELECT lod, mesh FROM meshes WHERE node_id=? ORDER BY rowid', (row['id'],)):
+            if mesh['lod'] in uExportScan.LOD_RANGE:
+                nodeDict['rendermeshes'][mesh['lod']].append(mesh['mesh'])
+        nodeDict['export_root'] = [r['root'] for r in self.db.execute('SELECT root FROM roots WHERE node_id=? ORDER BY rowid', (row['id'],))]
+        nodeDict['outputs'] = [(o['lod'], o['fbx_path']) for o in
+                               self.db.execute('SELECT lod, fbx_path FROM outputs WHERE node_id=? ORDER BY rowid', (row['id'],))]
+        return nodeDict
+
+    def scenes(self, withNodes=False):
+        '''
+        Indexed scene paths, only the ones with uExport nodes if withNodes
+        '''
+        query = 'SELECT path FROM scenes'
+        if withNodes:
+            query += ' WHERE id IN (SELECT scene_id FROM nodes)'
+        return [row['path'] for row in self.db.execute(query + ' ORDER BY path')]
+
+    def scenesForFbx(self, fbx):
+        '''
+        Which scenes write this fbx, by file name or full path
+        '''
+        return sorted(set([node['scene'] for node in self.nodes(fbx=fbx)]))
+
+    def failedScenes(self):
+        return [(row['path'], row['error']) for row in self.db.execute('SELECT path, error FROM scenes WHERE error IS NOT NULL ORDER BY path')]
+
+
+def main(argv=None):
+    from uExportBatch import expandScenes
+
+    parser = argparse.ArgumentParser(description='SQLite index of uExport scenes')
+    parser.add_argument('--db', default=INDEX_FILE)
+    sub = parser.add_subparsers(dest='mode')
+
+    update = sub.add_parser('update', help='index new and changed scenes')
+    update.add_argument('scenes', nargs='*', help='scene paths or globs')
+    update.add_argument('--list', action='append', default=[], help='text file with one scene path or glob per line')
+    update.add_argument('--processes', type=int, default=1)
+    update.add_argument('--force', action='store_true', help='re-read every scene')
+    update.add_argument('--prune', action='store_true', help='drop indexed scenes that no longer exist')
+    update.add_argument('--no-sidecars', dest='sidecars', action='store_false', help='read every scene even if it has a fresh .uexport.json')
+
+    query = sub.add_parser('query', help='list indexed uExport nodes, filters combine')
+    query.add_argument('--asset')
+    query.add_argument('--root', help='root joint name')
+    query.add_argument('--mesh')
+    query.add_argument('--fbx', help='fbx file name or full path')
+    query.add_argument('--scene')
+    query.add_argument('--json', help='write the node dicts to this file')
+
+    args = parser.parse_args(argv)
+    index = SceneIndex(args.db)
+    try:
+        if args.mode == 'update':
+            scenes = expandScenes(args.scenes, args.list)
+            start = time.time()
+            counts = index.update(scenes, processes=args.processes, force=args.force, prune=args.prune, sidecars=args.sidecars, log=lambda msg: sys.stdout.write(msg + '\n'))
+            print 'uExportIndex>>> %(scanned)d scanned, %(unchanged)d unchanged, %(touched)d touched, %(failed)d failed, %(removed)d removed' % counts,
+            print 'in %.1f seconds' % (time.time() - start)
+            return 0 if not counts['failed'] else 1
+
+        nodes = index.nodes(asset=args.asset, root=args.root, mesh=args.mesh, fbx=args.fbx, scene=args.scene)
+        for node in nodes:
+            print '%s  %s  asset: %s  root: %s' % (node['scene'], node['node'], node['asset_name'], ', '.join(node['export_root']))
+            for lod, path in node['outputs']:
+                print '    %s  %s' % ('main' if lod is None else 'LOD' + str(lod), path)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(nodes, f, indent=2, sort_keys=True)
+        return 0 if nodes else 1
+    finally:
+        index.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,394 @@
+'''
+uExportP4
+Perforce helpers for uExport, no Maya or Qt in here.
+
+Everything takes an already connected P4 object, so the tool, batch jobs and a fake P4 (anything
+with run/run_files/run_fstat/run_sync and exception_level) all go through the same code:
+
+import uExportP4 as uep4
+p4 = uep4.connect(client='my_ws')
+resolved = uep4.resolveTextures(p4, missingFileDict, '//depot/ArtSource/')
+
+Lookups the UI makes over and over (depot location of an fbx, workspaces) go through p4Pool, one
+kept-alive connection per client, and are cached for P4_CACHE_TTL seconds. p4Worker runs them off
+the main thread and hands the result to a callback.
+'''
+
+import os
+import time
+import Queue
+import threading
+import contextlib
+
+#files per command, keeps the command line and the server's arg parsing sane on huge scenes
+P4_BATCH = 500
+#seconds a depot lookup is trusted
+P4_CACHE_TTL = 300.0
+
+
+def getP4Class():
+    from p4python.P4 import P4
+    return P4
+
+def connect(client=None, p4Class=None):
+    '''
+    Returns a connected P4, or None if the server can't be reached
+    '''
+    if p4Class is None:
+        p4Class = getP4Class()
+    p4 = p4Class()
+    if client:
+        p4.client = str(client)
+    try:
+        p4.connect()
+    except Exception as e:
+        print 'Cannot connect to P4!', e
+        return None
+    return p4
+
+def batches(items, size=P4_BATCH):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def runBatched(p4, cmd, args, flags=()):
+    '''
+    One command per P4_BATCH args. Warnings like 'no such file(s)' or 'file(s) up-to-date'
+    are what you get for part of a batch, so only errors raise
+    '''
+    results = []
+    level = p4.exception_level
+    p4.exception_level = 1
+    try:
+        for batch in batches(args):
+            results.extend([r for r in p4.run(cmd, *(list(flags) + batch)) if isinstance(r, dict)])
+    finally:
+        p4.exception_level = level
+    return results
+
+
+## POOL / CACHE
+########################################################################
+
+class P4Pool(object):
+    '''
+    One connection per client, opened on first use and reconnected if it dropped.
+    A connection is only used by one thread at a time:
+
+    with p4Pool.connection() as p4:
+        if p4: p4.run_files(...)
+    '''
+    def __init__(self, p4Class=None):
+        self.p4Class = p4Class
+        self.connections = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def connection(self, client=None):
+        with self.lock:
+            lock = self.locks.setdefault(client, threading.Lock())
+        with lock:
+            p4 = self.connections.get(client)
+            if p4 is None or not p4.connected():
+                p4 = connect(client=client, p4Class=self.p4Class)
+                self.connections[client] = p4
+            yield p4
+
+    def close(self):
+        with self.lock:
+            for p4 in self.connections.values():
+                try:
+                    if p4 and p4.connected():
+                        p4.disconnect()
+                except Exception as e:
+                    print e
+            self.connections = {}
+
+class TTLCache(object):
+    def __init__(self, ttl=P4_CACHE_TTL):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        '''
+        (hit, value), a cached failure is a hit too so missing files aren't searched for every refresh
+        '''
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry and (time.time() - entry[0]) <= self.ttl:
+            return True, entry[1]
+        return False, None
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.time(), value)
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+
+class P4Worker(object):
+    '''
+    Single background thread running queued lookups, callback(result) is called on that thread,
+    so UI code has to get back to the main thread itself (a Qt signal does that)
+    '''
+    def __init__(self):
+        self.queue = Queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, fn, args=(), kwargs=None, callback=None):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.work, name='uExportP4Worker')
+                self.thread.daemon = True
+                self.thread.start()
+        self.queue.put((fn, args, kwargs or {}, callback))
+
+    def work(self):
+        while True:
+            fn, args, kwargs, callback = self.queue.get()
+            try:
+                result = fn(*args, **kwargs)
+                if callback:
+                    callback(result)
+            except Exception as e:
+                print 'uExportP4Worker>>>', e
+
+p4Pool = P4Pool()
+depotCache = TTLCache()
+p4Worker = P4Worker()
+
+
+## DEPOT LOOKUPS
+########################################################################
+
+def getP4Locations(assets, root='//depot/ArtSource/', pool=None, cache=None, debug=1):
+    '''
+    {asset: [user, depotFile, description, change] or False} for file names under root.
+    Uncached names cost one 'files' and one 'describe' for all of them together.
+    '''
+    if pool is None:
+        pool = p4Pool
+    if cache is None:
+        cache = depotCache
+
+    locations = {}
+    todo = []
+    for asset in set(assets):
+        hit, value = cache.get((asset, root))
+        if hit:
+            locations[asset] = value
+        else:
+            todo.append(asset)
+    if not todo:
+        return locations
+
+    with pool.connection() as p4:
+        if not p4:
+            return dict([(asset, locations.get(asset, False)) for asset in assets])
+        try:
+            found = {}
+            for fileDict in runBatched(p4, 'files', [root + '...' + asset for asset in todo]):
+                name = fileDict['depotFile'].split('/')[-1].lower()
+                #first hit per name, like run_files(...)[0]
+                if name not in found:
+                    found[name] = fileDict
+            changes = sorted(set([d['change'] for d in found.values()]))
+            describes = dict([(d['change'], d) for d in runBatched(p4, 'describe', changes, flags=['-s'])])
+        except Exception as e:
+            print 'findFileP4>>>> P4 lookup failed for', len(todo), 'files'
+            if debug: print e
+            return dict([(asset, locations.get(asset, False)) for asset in assets])
+
+    for asset in todo:
+        fileDict = found.get(asset.lower())
+        describe = describes.get(fileDict['change']) if fileDict else None
+        if describe:
+            locations[asset] = [describe['user'], fileDict['depotFile'], describe['desc'], fileDict['change']]
+        else:
+            if debug: print "findFileP4>>>> Cannot find file.", asset
+            locations[asset] = False
+        cache.set((asset, root), locations[asset])
+    return locations
+
+def getP4Location(asset, root='//depot/ArtSource/', pool=None, cache=None, debug=1):
+    if not asset:
+        return None
+    return getP4Locations([asset], root=root, pool=pool, cache=cache, debug=debug)[asset]
+
+def getWorkspaces(host, pool=None, cache=None):
+    '''
+    Names of the current user's clients on this host
+    '''
+    if pool is None:
+        pool = p4Pool
+    if cache is None:
+        cache = depotCache
+    hit, workspaces = cache.get(('clients', host))
+    if hit:
+        return workspaces
+
+    workspaces = []
+    with pool.connection() as p4:
+        if not p4:
+            return workspaces
+        for ws in p4.run('clients', '-u', p4.user):
+            try:
+                if ws['Host'] == host:
+                    workspaces.append(ws['client'])
+            except Exception as e:
+                print e
+    cache.set(('clients', host), workspaces)
+    return workspaces
+
+
+## TEXTURE RESOLVE
+########################################################################
+
+def pickDepotFile(candidates, parent, parentParent):
+    '''
+    Same file name in several depot folders happens a lot: take the one whose parent folder matches
+    the missing path, the grandparent breaks ties. Returns None if no folder matches.
+    '''
+    if len(candidates) == 1:
+        return candidates[0]
+    matches = [c for c in candidates if c.split('/')[-2].lower() == (parent or '').lower()]
+    if len(matches) > 1 and parentParent:
+        better = [c for c in matches if len(c.split('/')) > 2 and c.split('/')[-3].lower() == parentParent.lower()]
+        if better:
+            matches = better
+    if matches:
+        return matches[0]
+    return None
+
+def resolveTextures(p4, missingFileDict, root, sync=True, parallel=0, debug=1):
+    '''
+    Finds, syncs and maps missing textures with a fixed number of server round trips:
+    one 'files' for every name under root, one 'fstat' for the picked files and one 'sync'
+    (sync --parallel=threads=N if parallel). missingFileDict is what uExportCore.missingNodes returns.
+
+    Returns {fileName: {'status': FOUND/NOT FOUND/DELETED, 'depotFile', 'clientFile'}}
+    '''
+    results = dict([(f, {'status':'NOT FOUND', 'depotFile':None, 'clientFile':None}) for f in missingFileDict])
+    if not missingFileDict:
+        return results
+
+    #one files query for all names
+    byName = {}
+    for fileDict in runBatched(p4, 'files', [root + '...' + f for f in missingFileDict]):
+        if 'delete' in fileDict.get('action', ''):
+            continue
+        byName.setdefault(fileDict['depotFile'].split('/')[-1].lower(), []).append(fileDict['depotFile'])
+
+    picked = {}
+    for f in missingFileDict:
+        floppedPath = missingFileDict[f]['path'].replace('\\', '/') + f
+        pathBreak = floppedPath.split('/')
+
+        #find parents since there are dupe files in p4 often
+        parent = pathBreak[-2] if len(pathBreak) > 1 else None
+        parentParent = pathBreak[-3] if len(pathBreak) > 2 else None
+
+        candidates = byName.get(f.lower(), [])
+        if not candidates:
+            print 'rePathFileNodesP4>>>> FILE NOT FOUND IN PERFORCE SEARCH PATH - fName:', f, 'searchPath:', root
+            continue
+        if len(candidates) > 1 and debug:
+            print 'rePathFileNodesP4>>>> Multiple files [', len(candidates), '] found in depot search path with the name: ' + f
+            print 'P4 file paths:'
+            for c in candidates:
+                print c
+        depotFile = pickDepotFile(candidates, parent, parentParent)
+        if depotFile:
+            picked[f] = depotFile
+        else:
+            print 'rePathFileNodesP4>>>> No file path similarities to path:', floppedPath
+
+    if not picked:
+        return results
+
+    #one fstat for everything picked, gives the client path and catches moved/deleted heads
+    fstats = dict([(d['depotFile'], d) for d in runBatched(p4, 'fstat', sorted(set(picked.values())))])
+    toSync = []
+    for f, depotFile in picked.items():
+        fstat = fstats.get(depotFile)
+        if not fstat:
+            continue
+        if 'delete' in fstat.get('headAction', ''):
+            print 'INVALID PATH: p4 asset head revision is deleted or moved. depotFile:', depotFile
+            results[f]['status'] = 'DELETED'
+            continue
+        results[f] = {'status':'FOUND', 'depotFile':depotFile, 'clientFile':fstat['clientFile'].replace('\\','/')}
+        toSync.append(depotFile)
+
+    #one sync, forced since the have list can claim files the disk doesn't have
+    if sync and toSync:
+        flags = ['-f']
+        if parallel:
+            flags.append('--parallel=threads=' + str(parallel))
+        print 'GRABBING: ', len(set(toSync)), 'files'
+        runBatched(p4, 'sync', sorted(set(toSync)), flags=flags)
+
+    return results
+
+
+## CHECKOUT
+########################################################################
+
+def sortForWrite(p4, paths):
+    '''
+    One batched 'fstat' over the local paths. Returns (toEdit, alreadyOpen, toAdd):
+    toAdd are the paths P4 doesn't have yet (or deleted at head), alreadyOpen are open in this client.
+    '''
+    known = {}
+    for fstat in runBatched(p4, 'fstat', paths):
+        if 'clientFile' in fstat:
+            known[os.path.normcase(os.path.normpath(fstat['clientFile']))] = fstat
+
+    toEdit = []
+    alreadyOpen = []
+    toAdd = []
+    for path in paths:
+        fstat = known.get(os.path.normcase(os.path.normpath(path)))
+        if not fstat or 'delete' in fstat.get('headAction', ''):
+            toAdd.append(path)
+        elif 'action' in fstat:
+            alreadyOpen.append(path)
+        else:
+            toEdit.append(path)
+    return toEdit, alreadyOpen, toAdd
+
+def editFiles(p4, paths, changelist=None):
+    if paths:
+        flags = ['-c', str(changelist)] if changelist else []
+        runBatched(p4, 'edit', paths, flags=flags)
+    return paths
+
+def openForWrite(p4, paths, changelist=None):
+    '''
+    Opens every local path P4 knows about for edit with one 'fstat' and one 'edit'.
+    Returns (opened, toAdd): toAdd are the paths P4 doesn't have yet, add them once they're written (addFiles)
+    '''
+    paths = list(paths)
+    if not paths:
+        return [], []
+    toEdit, alreadyOpen, toAdd = sortForWrite(p4, paths)
+    return alreadyOpen + editFiles(p4, toEdit, changelist=changelist), toAdd
+
+def revertUnchanged(p4, paths):
+    '''
+    'revert -a' on the paths: files opened for an export that wrote nothing new go back to their head revision
+    '''
+    if paths:
+        runBatched(p4, 'revert', paths, flags=['-a'])
+    return paths
+
+def addFiles(p4, paths, changelist=None):
+    paths = [path for path in paths if os.path.isfile(path)]
+    if paths:
+        flags = ['-c', str(changelist)] if changelist else []
+        runBatched(p4, 'add', paths, flags=flags)
+    return paths
@@ -0,0 +1,590 @@
+'''
+uExportScan
+Reads uExport nodes straight out of Maya ASCII files, no Maya needed.
+
+The file is read in CHUNK_SIZE blocks and split into MEL statements. Only the statements that can
+matter (createNode, addAttr, select, setAttr on a uExport node, connectAttr to a uExport attr)
+are kept and tokenized, everything else, i.e. the mesh/anim data that makes a scene big, is skipped
+with a few str.find calls per block. Memory is a block plus the node names of the scene.
+
+import uExportScan
+for node in uExportScan.scanScene('D:/chars/hero.ma'):
+    print node['node'], node['asset_name'], node['rendermeshes'][0], node['export_root']
+
+python uExportScan.py "D:/chars/*.ma" --json scan.json
+
+A node dict has the same fields as uExportCore.uExportSnapshot plus the 'path' and 'type' of the node.
+Values are what was saved: a mesh or root is the name connectAttr used, which is unique in that scene.
+Nodes in referenced files are not in the .ma and not found.
+
+readSidecar/getSceneNodes read the .uexport.json uExportCore can write next to a scene on save,
+which also covers .mb scenes, and fall back to scanning when it is missing or older than the scene.
+'''
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import functools
+import multiprocessing
+
+#same as uExportCore, this module can't import it
+UEXPORT_STRING_ATTRS = ('uexport_ver', 'asset_name', 'fbx_name', 'folder_path', 'fbxPropertiesDict', 'anim_clips')
+ART_ATTRS = ('joint_mover_template', 'skeleton_template', 'pre_script', 'post_script', 'export_file', 'anim_file',
+             'skeleton_uasset', 'skelmesh_uasset', 'physics_uasset', 'thumbnail_large', 'thumbnail_small')
+LOD_RANGE = range(0, 5)
+
+#written next to a scene on save by uExportCore.sidecarWriter.install()
+SIDECAR_SUFFIX = '.uexport.json'
+SIDECAR_VERSION = 1
+
+#bytes read at a time
+CHUNK_SIZE = 4 * 1024 * 1024
+MAYA_ASCII_HEADER = '//Maya ASCII'
+
+NON_SPACE = re.compile(r'\S')
+TOKEN = re.compile(r'"((?:[^"\\]|\\.)*)"|([^\s";]+)', re.S)
+FIRST_STRING = re.compile(r'"((?:[^"\\]|\\.)*)"')
+ESCAPE = re.compile(r'\\(.)', re.S)
+ESCAPES = {'n':'\n', 't':'\t', 'r':'\r'}
+CONNECTION_ATTRS = ('rendermesh', 'export_root')
+
+
+def emptyNodeDict(node):
+    '''
+    Fields of uExportCore.uExportSnapshot, with lists instead of sets so it goes to json as is
+    '''
+    nodeDict = {'node':node, 'path':None, 'type':None, 'attrs':[], 'lodNum':None, 'export_root':[],
+                'rendermeshes':[[] for lod in LOD_RANGE],
+                'export_scripts':[None for lod in LOD_RANGE],
+                'fbx_names':[None for lod in LOD_RANGE]}
+    for att in UEXPORT_STRING_ATTRS + ART_ATTRS:
+        nodeDict[att] = None
+    return nodeDict
+
+def unescape(text):
+    return ESCAPE.sub(lambda m: ESCAPES.get(m.group(1), m.group(1)), text)
+
+def tokenize(statement):
+    '''
+    [(isString, value)], strings unescaped and "a" + "b" joined the way MEL does for long strings
+    '''
+    tokens = []
+    joinNext = False
+    for m in TOKEN.finditer(statement):
+        if m.group(1) is not None:
+            value = unescape(m.group(1))
+            if joinNext and tokens and tokens[-1][0]:
+                tokens[-1] = (True, tokens[-1][1] + value)
+            else:
+                tokens.append((True, value))
+            joinNext = False
+        elif m.group(2) == '+':
+            joinNext = True
+        else:
+            tokens.append((False, m.group(2)))
+            joinNext = False
+    return tokens
+
+def flagValues(tokens):
+    '''
+    {flag: value} for '-flag value' pairs, a flag followed by another flag gets True
+    '''
+    flags = {}
+    for i, (isString, value) in enumerate(tokens):
+        if not isString and value.startswith('-') and not value[1:2].isdigit():
+            if i + 1 < len(tokens) and (tokens[i + 1][0] or not tokens[i + 1][1].startswith('-')):
+                flags[value] = tokens[i + 1][1]
+            else:
+                flags[value] = True
+    return flags
+
+def splitPlug(plug):
+    '''
+    'grp|node.attr[0]' -> ('grp|node', 'attr')
+    '''
+    node, attr = plug.rsplit('.', 1) if '.' in plug else ('', plug)
+    return node, attr.split('[')[0]
+
+def pathMatches(path, ref):
+    '''
+    True if the full dag path is what ref names: '|a|b' only itself, 'a|b' or 'b' any path ending that way
+    '''
+    if ref.startswith('|'):
+        return path == ref
+    return path.endswith('|' + ref)
+
+def iterStatements(f, keep, chunkSize=CHUNK_SIZE):
+    '''
+    Yields the text of every MEL statement for which keep(firstLine) is True, without the ;
+    Skipped statements are never held in memory, a kept one is.
+    '''
+    carry = ''
+    parts = None
+    inStatement = False
+    inString = False
+    eof = False
+    while not eof:
+        chunk = f.read(chunkSize)
+        if not chunk:
+            if not carry:
+                break
+            #a last statement without a newline
+            chunk = '\n'
+            eof = True
+        block = carry + chunk if carry else chunk
+        carry = ''
+        pos = 0
+        end = len(block)
+        #next " ; and \ at or after pos, str.find instead of a regex since most of a scene is neither
+        quote = semi = backslash = -1
+        while pos < end:
+            if not inStatement:
+                m = NON_SPACE.search(block, pos)
+                if not m:
+                    break
+                pos = m.start()
+                newline = block.find('\n', pos)
+                if newline == -1:
+                    #need the whole first line to decide
+                    carry = block[pos:]
+                    break
+                if block.startswith('//', pos):
+                    pos = newline + 1
+                    continue
+                inStatement = True
+                parts = [] if keep(block[pos:newline]) else None
+
+            if quote < pos:
+                quote = block.find('"', pos)
+                if quote == -1: quote = end
+            if inString:
+                if backslash < pos:
+                    backslash = block.find('\\', pos)
+                    if backslash == -1: backslash = end
+                if backslash < quote:
+                    if backslash + 1 >= end:
+                        #escaped char is in the next block
+                        if parts is not None: parts.append(block[pos:backslash])
+                        carry = block[backslash:]
+                        break
+                    nextPos = backslash + 2
+                elif quote < end:
+                    inString = False
+                    nextPos = quote + 1
+                else:
+                    if parts is not None: parts.append(block[pos:])
+                    break
+                if parts is not None: parts.append(block[pos:nextPos])
+                pos = nextPos
+            else:
+                if semi < pos:
+                    semi = block.find(';', pos)
+                    if semi == -1: semi = end
+                if quote < semi:
+                    inString = True
+                    if parts is not None: parts.append(block[pos:quote + 1])
+                    pos = quote + 1
+                elif semi < end:
+                    inStatement = False
+                    if parts is not None:
+                        parts.append(block[pos:semi])
+                        yield ''.join(parts)
+                    parts = None
+                    pos = semi + 1
+                else:
+                    if parts is not None: parts.append(block[pos:])
+                    break
+
+
+## SCANNER
+########################################################################
+
+class MayaAsciiScanner(object):
+    '''
+    Collects uExport nodes from the statements of one scene, see scanScene()
+    '''
+    def __init__(self):
+        #short name: [parent as written or None], enough to build dag paths and unique names
+        self.parents = {}
+        self.current = None
+        self.currentType = None
+        #long names of the current node's dynamic attrs, by short and long name
+        self.currentAttrs = {}
+        #(name, parent): nodeDict
+        self.found = {}
+        self.foundNames = set()
+        self.connections = []
+
+    def keep(self, line):
+        cmd = line.split(None, 1)[0]
+        if cmd in ('createNode', 'addAttr', 'select'):
+            return True
+        if cmd == 'setAttr':
+            if self.current in self.found:
+                return True
+            #absolute setAttr "node.attr" on a node we know
+            m = FIRST_STRING.search(line)
+            if m and not m.group(1).startswith('.'):
+                node = splitPlug(m.group(1))[0]
+                return node.split('|')[-1] in self.foundNames
+            return False
+        if cmd == 'connectAttr':
+            return any([att in line for att in CONNECTION_ATTRS])
+        return False
+
+    def feed(self, statement):
+        tokens = tokenize(statement)
+        if not tokens:
+            return
+        cmd = tokens[0][1]
+        args = tokens[1:]
+        if cmd == 'createNode':
+            self.createNode(args)
+        elif cmd == 'select':
+            names = [value for isString, value in args if isString or not value.startswith('-')]
+            if names:
+                self.current = self.nodeKey(names[0].lstrip(':'))
+                self.currentType = None
+                self.currentAttrs = {}
+        elif cmd == 'addAttr':
+            self.addAttr(args)
+        elif cmd == 'setAttr':
+            self.setAttr(args)
+        elif cmd == 'connectAttr':
+            plugs = [value for isString, value in args if isString]
+            if len(plugs) == 2:
+                self.connections.append((plugs[0], plugs[1]))
+
+    def createNode(self, args):
+        flags = flagValues(args)
+        nodeType = args[0][1] if args else None
+        name = flags.get('-n')
+        if not isinstance(name, basestring):
+            return
+        parent = flags.get('-p')
+        parent = parent if isinstance(parent, basestring) else None
+        self.parents.setdefault(name, []).append(parent)
+        self.current = (name, parent)
+        self.currentType = nodeType
+        self.currentAttrs = {}
+
+    def nodeKey(self, ref):
+        '''
+        (name, parent) key of a node written as name, partial or full path
+        '''
+        name = ref.split('|')[-1]
+        parents = self.parents.get(name, [None])
+        if len(parents) == 1 or '|' not in ref:
+            return (name, parents[0])
+        for parent, path in self.dagPaths(name):
+            if pathMatches(path, ref):
+                return (name, parent)
+        return (name, None)
+
+    def addAttr(self, args):
+        if self.current is None:
+            return
+        flags = flagValues(args)
+        longName = flags.get('-ln')
+        if not isinstance(longName, basestring):
+            return
+        shortName = flags.get('-sn')
+        self.currentAttrs[longName] = longName
+        if isinstance(shortName, basestring):
+            self.currentAttrs[shortName] = longName
+
+        nodeDict = self.found.get(self.current)
+        if nodeDict is None and longName == 'uexport_ver':
+            nodeDict = emptyNodeDict(self.current[0])
+            nodeDict['type'] = self.currentType
+            nodeDict['shortNames'] = {}
+            self.found[self.current] = nodeDict
+            self.foundNames.add(self.current[0])
+        if nodeDict is not None:
+            nodeDict['shortNames'].update(self.currentAttrs)
+            for att in set(self.currentAttrs.values()):
+                if att not in nodeDict['attrs']:
+                    nodeDict['attrs'].append(att)
+            if longName == 'lodNum' and '-dv' in flags:
+                nodeDict['lodNum'] = toInt(flags['-dv'])
+
+    def setAttr(self, args):
+        plug = None
+        for isString, value in args:
+            if isString:
+                plug = value
+                break
+        if plug is None:
+            return
+        if plug.startswith('.'):
+            nodeDict = self.found.get(self.current)
+        else:
+            node, plug = plug.rsplit('.', 1)[0], '.' + plug.rsplit('.', 1)[-1]
+            nodeDict = self.found.get(self.nodeKey(node))
+        if nodeDict is None:
+            return
+        att = nodeDict['shortNames'].get(plug[1:], plug[1:])
+
+        flags = flagValues(args)
+        if flags.get('-type') == 'string':
+            value = None
+            for i, (isString, token) in enumerate(args):
+                if not isString and token == '-type' and i + 2 < len(args):
+                    value = args[i + 2][1]
+                    break
+        else:
+            value = args[-1][1] if not args[-1][0] else None
+            if att == 'lodNum':
+                value = toInt(value)
+        setValue(nodeDict, att, value)
+
+    def dagPaths(self, name):
+        '''
+        [(parent as written, full path)] of every node with that short name
+        '''
+        paths = []
+        for parent in self.parents.get(name, []):
+            if not parent:
+                paths.append((parent, '|' + name))
+                continue
+            for grandParent, parentPath in self.dagPaths(parent.split('|')[-1]):
+                if pathMatches(parentPath, parent):
+                    paths.append((parent, parentPath + '|' + name))
+        return paths
+
+    def nodeKeyPath(self, key):
+        for parent, path in self.dagPaths(key[0]):
+            if parent == key[1]:
+                return path
+        return '|' + key[0]
+
+    def uniqueName(self, key):
+        '''
+        Shortest unique name like Maya gives, name if it is unique, else enough of the path
+        '''
+        name = key[0]
+        if len(self.parents.get(name, [])) < 2:
+            return name
+        paths = [path for parent, path in self.dagPaths(name)]
+        parts = self.nodeKeyPath(key).strip('|').split('|')
+        for i in range(len(parts) - 1, -1, -1):
+            partial = '|'.join(parts[i:])
+            if len([p for p in paths if pathMatches(p, partial)]) == 1:
+                return partial
+        return self.nodeKeyPath(key)
+
+    def results(self):
+        '''
+        The node dicts, with connections resolved
+        '''
+        legacy = {}
+        for src, dst in self.connections:
+            srcNode, srcAttr = splitPlug(src)
+            dstNode, dstAttr = splitPlug(dst)
+            #uExport.rendermeshes_LOD0 -> mesh.uExport
+            srcDict = self.found.get(self.nodeKey(srcNode)) if srcNode.split('|')[-1] in self.foundNames else None
+            if srcDict is not None:
+                srcAttr = srcDict['shortNames'].get(srcAttr, srcAttr)
+                if srcAttr.startswith('rendermeshes_LOD'):
+                    lod = toInt(srcAttr[len('rendermeshes_LOD'):])
+                    if lod in LOD_RANGE:
+                        srcDict['rendermeshes'][lod].append(dstNode)
+                elif srcAttr == 'rendermesh':
+                    legacy.setdefault(id(srcDict), (srcDict, []))[1].append(dstNode)
+            #root.export -> uExport.export_root
+            dstDict = self.found.get(self.nodeKey(dstNode)) if dstNode.split('|')[-1] in self.foundNames else None
+            if dstDict is not None and dstDict['shortNames'].get(dstAttr, dstAttr) == 'export_root':
+                dstDict['export_root'].append(srcNode)
+        #pre LOD nodes, same as migrateExportNode
+        for nodeDict, meshes in legacy.values():
+            if not nodeDict['rendermeshes'][0]:
+                nodeDict['rendermeshes'][0] = meshes
+
+        nodes = []
+        for key, nodeDict in self.found.items():
+            nodeDict['node'] = self.uniqueName(key)
+            nodeDict['path'] = self.nodeKeyPath(key)
+            del nodeDict['shortNames']
+            nodes.append(nodeDict)
+        return sorted(nodes, key=lambda n: n['path'])
+
+def toInt(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def setValue(nodeDict, att, value):
+    if att.startswith('export_script_LOD'):
+        lod = toInt(att[len('export_script_LOD'):])
+        if lod in LOD_RANGE:
+            nodeDict['export_scripts'][lod] = value
+    elif att.startswith('fbx_name_LOD'):
+        lod = toInt(att[len('fbx_name_LOD'):])
+        if lod in LOD_RANGE:
+            nodeDict['fbx_names'][lod] = value
+    elif att == 'lodNum':
+        nodeDict['lodNum'] = value
+    elif att in UEXPORT_STRING_ATTRS or att in ART_ATTRS:
+        nodeDict[att] = value
+
+class HashingReader(object):
+    '''
+    File wrapper feeding everything read to a hashlib object, so a scene is hashed and scanned in one pass
+    '''
+    def __init__(self, f, hasher):
+        self.f = f
+        self.hasher = hasher
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.hasher.update(data)
+        return data
+
+def isMayaAscii(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAYA_ASCII_HEADER)) == MAYA_ASCII_HEADER
+
+def scanFile(f, chunkSize=CHUNK_SIZE):
+    scanner = MayaAsciiScanner()
+    for statement in iterStatements(f, scanner.keep, chunkSize=chunkSize):
+        scanner.feed(statement)
+    return scanner.results()
+
+def scanScene(path, chunkSize=CHUNK_SIZE, hasher=None):
+    '''
+    [nodeDict] for every uExport node in a .ma, None if the file is not Maya ASCII (.mb needs Maya).
+    hasher (a hashlib object) gets every byte of the file, Maya ASCII or not.
+    '''
+    ascii = isMayaAscii(path)
+    with open(path, 'rb') as f:
+        if hasher is not None:
+            f = HashingReader(f, hasher)
+        if ascii:
+            return scanFile(f, chunkSize=chunkSize)
+        print 'uExportScan>>> Not a Maya ASCII file:', path
+        if hasher is not None:
+            while f.read(chunkSize):
+                pass
+    return None
+
+def getSidecarPath(scene):
+    return scene + SIDECAR_SUFFIX
+
+def readSidecar(scene):
+    '''
+    [nodeDict] from the sidecar written when the scene was saved, None if there is none or the scene
+    changed after it (the sidecar is written or touched after every save, so it is never older than its scene)
+    '''
+    sidecar = getSidecarPath(scene)
+    try:
+        if os.path.getmtime(sidecar) < os.path.getmtime(scene):
+            return None
+        with open(sidecar, 'rb') as f:
+            data = json.load(f)
+    except (OSError, IOError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('version') != SIDECAR_VERSION:
+        return None
+    nodes = []
+    for compact in data.get('nodes', []):
+        nodeDict = emptyNodeDict(compact['node'])
+        nodeDict.update(compact)
+        nodes.append(nodeDict)
+    return nodes
+
+def getSceneNodes(scene):
+    '''
+    (nodes, source): the sidecar if it is fresh, else a scan of the .ma, (None, None) for a .mb without one
+    '''
+    nodes = readSidecar(scene)
+    if nodes is not None:
+        return nodes, 'sidecar'
+    nodes = scanScene(scene)
+    return nodes, 'scan' if nodes is not None else None
+
+def scanSceneResult(path, hashFile=False, useSidecar=False):
+    '''
+    scanScene as a dict that survives a worker process, with the scene's mtime, size and sha1 if hashFile.
+    useSidecar takes the nodes from a fresh sidecar instead, the scene isn't read and sha1 stays None.
+    '''
+    start = time.time()
+    result = {'scene':path, 'nodes':[], 'ok':False, 'error':None, 'mtime':None, 'size':None, 'sha1':None, 'source':None}
+    try:
+        st = os.stat(path)
+        result['mtime'], result['size'] = st.st_mtime, st.st_size
+        nodes = readSidecar(path) if useSidecar else None
+        if nodes is not None:
+            result['source'] = 'sidecar'
+        else:
+            hasher = hashlib.sha1() if hashFile else None
+            nodes = scanScene(path, hasher=hasher)
+            if hasher is not None:
+                result['sha1'] = hasher.hexdigest()
+            result['source'] = 'scan'
+        if nodes is None:
+            result['error'] = 'not a Maya ASCII file'
+        else:
+            result['nodes'] = nodes
+            result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    result['elapsed'] = time.time() - start
+    return result
+
+def scanScenes(scenes, processes=1, hashFile=False, useSidecar=False):
+    '''
+    Yields scanSceneResult per scene, in order, processes > 1 scans in parallel
+    '''
+    scan = functools.partial(scanSceneResult, hashFile=hashFile, useSidecar=useSidecar)
+    if processes > 1 and len(scenes) > 1:
+        pool = multiprocessing.Pool(processes=min(processes, len(scenes)))
+        try:
+            for result in pool.imap(scan, scenes):
+                yield result
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for scene in scenes:
+            yield scan(scene)
+
+
+def main(argv=None):
+    #expandScenes doesn't pull Maya in
+    from uExportBatch import expandScenes
+
+    parser = argparse.ArgumentParser(description='List uExport nodes of Maya ASCII scenes without Maya')
+    parser.add_argument('scenes', nargs='*', help='scene paths or globs')
+    parser.add_argument('--list', action='append', default=[], help='text file with one scene path or glob per line')
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--sidecars', action='store_true', help='take the nodes from fresh .uexport.json sidecars')
+    parser.add_argument('--json', help='write every node dict to this file')
+    args = parser.parse_args(argv)
+
+    scenes = expandScenes(args.scenes, args.list)
+    if not scenes:
+        print 'uExportScan>>> No scenes found.'
+        return 1
+    results = []
+    for result in scanScenes(scenes, processes=args.processes, useSidecar=args.sidecars):
+        results.append(result)
+        if not result['ok']:
+            print 'uExportScan>>> FAILED', result['scene'], result['error']
+            continue
+        print 'uExportScan>>> %s: %d uExport nodes (%s %.2fs)' % (result['scene'], len(result['nodes']), result['source'], result['elapsed'])
+        for node in result['nodes']:
+            print '    %s  asset: %s  root: %s  LOD meshes: %s' % (node['node'], node['asset_name'], ', '.join(node['export_root']),
+                                                                 [len(meshes) for meshes in node['rendermeshes']])
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    return 0 if all([r['ok'] for r in results]) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
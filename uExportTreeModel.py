@@ -0,0 +1,352 @@
+'''
+uExportTreeModel
+Item model behind the uExport tool's trees.
+
+uExportTreeItem mimics the parts of QTreeWidgetItem the tool uses (setText, setForeground, addChild, child...)
+so the trees are still built item by item. An item can be given a populate function instead of children;
+it only runs when the view asks for the children (canFetchMore/fetchMore), i.e. when the branch is expanded,
+so opening the tool costs what is visible, not what is in the scene.
+'''
+
+from Qtpy.Qt import QtCore, QtGui
+
+
+class uExportTreeItem(object):
+    def __init__(self, populate=None):
+        self._parent = None
+        self._children = []
+        self.model = None
+
+        self.texts = {}
+        self.foregrounds = {}
+        self.backgrounds = {}
+        self.fonts = {}
+        self.toolTips = {}
+        self.checkStates = {}
+        self.flags = QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+        self.expanded = False
+
+        #populate(item) adds the children the first time the view wants them
+        self.populate = populate
+        #itemWidget() returns a widget the view shows in column 0 once the row exists
+        self.itemWidget = None
+
+    ## QTreeWidgetItem-like API
+    ########################################################################
+    def text(self, column):
+        return self.texts.get(column, '')
+
+    def setText(self, column, text):
+        self.texts[column] = text
+        self.changed()
+
+    def font(self, column):
+        return QtGui.QFont(self.fonts.get(column, QtGui.QFont()))
+
+    def setFont(self, column, font):
+        self.fonts[column] = font
+        self.changed()
+
+    def setForeground(self, column, color):
+        self.foregrounds[column] = color
+        self.changed()
+
+    def setBackground(self, column, color):
+        self.backgrounds[column] = color
+        self.changed()
+
+    def setToolTip(self, column, text):
+        self.toolTips[column] = text
+        self.changed()
+
+    def setFlags(self, flags):
+        self.flags = flags
+        self.changed()
+
+    def checkState(self, column):
+        return self.checkStates.get(column, QtCore.Qt.Unchecked)
+
+    def setCheckState(self, column, state):
+        self.checkStates[column] = state
+        self.changed()
+
+    def isExpanded(self):
+        return self.expanded
+
+    def setExpanded(self, expanded):
+        self.expanded = expanded
+        if self.model:
+            self.model.itemsInserted.emit([self])
+
+    def parent(self):
+        #like QTreeWidgetItem, top level items have no parent
+        if self._parent and self._parent._parent is not None:
+            return self._parent
+        return None
+
+    def addChild(self, item):
+        if self.model:
+            self.model.insertItems(self, [item])
+        else:
+            item._parent = self
+            self._children.append(item)
+
+    def child(self, index):
+        self.fetch()
+        return self._children[index]
+
+    def childCount(self):
+        self.fetch()
+        return len(self._children)
+
+    def sortChildren(self, column, order):
+        reverse = order == QtCore.Qt.DescendingOrder
+        self._children.sort(key=lambda item: item.text(column).lower(), reverse=reverse)
+        for item in self._children:
+            item.sortChildren(column, order)
+
+    ## lazy children
+    ########################################################################
+    def canFetch(self):
+        return self.populate is not None
+
+    def fetch(self):
+        if self.populate is None:
+            return
+        populate, self.populate = self.populate, None
+        #build detached so the children go into the model as one insert
+        model, self.model = self.model, None
+        populate(self)
+        self.model = model
+        if model:
+            children, self._children = self._children, []
+            model.insertItems(self, children)
+
+    def changed(self):
+        if self.model:
+            self.model.itemChanged(self)
+
+    def walk(self):
+        '''
+        This item and every child that already exists, without populating anything
+        '''
+        yield self
+        for item in self._children:
+            for child in item.walk():
+                yield child
+
+
+class uExportTreeModel(QtCore.QAbstractItemModel):
+    #items that just got a row in the view, so the view can expand them and install item widgets
+    itemsInserted = QtCore.Signal(object)
+
+    def __init__(self, headers, parent=None):
+        super(uExportTreeModel, self).__init__(parent)
+        self.headers = headers
+        self.sortColumn = None
+        self.sortOrder = QtCore.Qt.AscendingOrder
+        self.root = uExportTreeItem()
+        self.root.model = self
+        #keyPath: (expanded, checkStates) of rebuilt items, see saveState
+        self.savedState = {}
+
+    ## QTreeWidget-like API
+    ########################################################################
+    def clear(self):
+        self.beginResetModel()
+        self.root = uExportTreeItem()
+        self.root.model = self
+        self.endResetModel()
+
+    def invisibleRootItem(self):
+        return self.root
+
+    def addTopLevelItem(self, item):
+        self.insertItems(self.root, [item])
+
+    def addTopLevelItems(self, items):
+        self.insertItems(self.root, items)
+
+    def topLevelItemCount(self):
+        return len(self.root._children)
+
+    def topLevelItem(self, index):
+        return self.root._children[index]
+
+    def itemFromIndex(self, index):
+        if index.isValid():
+            return index.internalPointer()
+        return self.root
+
+    def indexFromItem(self, item, column=0):
+        if item is None or item is self.root or item._parent is None:
+            return QtCore.QModelIndex()
+        return self.createIndex(item._parent._children.index(item), column, item)
+
+    def insertItems(self, parent, items):
+        if not items:
+            return
+        items = list(items)
+        if self.sortColumn is not None:
+            items.sort(key=self.sortKey, reverse=self.sortOrder == QtCore.Qt.DescendingOrder)
+            for item in items:
+                item.sortChildren(self.sortColumn, self.sortOrder)
+
+        parentIndex = self.indexFromItem(parent)
+        if self.sortColumn is not None and parent._children:
+            #keep the level sorted, one insert per item so existing rows never move
+            for item in items:
+                row = 0
+                for sibling in parent._children:
+                    if self.sortOrder == QtCore.Qt.DescendingOrder:
+                        if self.sortKey(sibling) < self.sortKey(item):
+                            break
+                    elif self.sortKey(sibling) > self.sortKey(item):
+                        break
+                    row += 1
+                self.beginInsertRows(parentIndex, row, row)
+                self.adopt(parent, item)
+                parent._children.insert(row, item)
+                self.endInsertRows()
+        else:
+            row = len(parent._children)
+            self.beginInsertRows(parentIndex, row, row + len(items) - 1)
+            for item in items:
+                self.adopt(parent, item)
+            parent._children.extend(items)
+            self.endInsertRows()
+        self.itemsInserted.emit(items)
+
+    def adopt(self, parent, item):
+        item._parent = parent
+        for child in item.walk():
+            child.model = self
+            if self.savedState:
+                state = self.savedState.pop(self.keyPath(child), None)
+                if state:
+                    child.expanded = state[0]
+                    child.checkStates.update(state[1])
+
+    def removeItem(self, item):
+        parent = item._parent
+        row = parent._children.index(item)
+        self.beginRemoveRows(self.indexFromItem(parent), row, row)
+        del parent._children[row]
+        self.endRemoveRows()
+        for child in item.walk():
+            child.model = None
+        item._parent = None
+
+    ## state kept across rebuilds
+    ########################################################################
+    def itemKey(self, item):
+        #the text without its (counts), so 'LOD 0  (3 meshes)' is still 'LOD 0' after a mesh is added
+        return item.text(0).split('(')[0].strip()
+
+    def keyPath(self, item):
+        path = []
+        while item is not None and item is not self.root:
+            path.append(self.itemKey(item))
+            item = item._parent
+        return tuple(reversed(path))
+
+    def saveState(self, item):
+        '''
+        Remembers expansion and check state of the item and its built children,
+        a rebuilt item with the same keyPath picks them up when it is inserted
+        '''
+        for child in item.walk():
+            self.savedState[self.keyPath(child)] = (child.expanded, dict(child.checkStates))
+
+    def findItem(self, keyPath):
+        for item in self.root.walk():
+            if item is not self.root and self.keyPath(item) == keyPath:
+                return item
+        return None
+
+    def sortKey(self, item):
+        return item.text(self.sortColumn).lower()
+
+    def itemChanged(self, item):
+        index = self.indexFromItem(item)
+        if index.isValid():
+            self.dataChanged.emit(index, index.sibling(index.row(), self.columnCount() - 1))
+
+    ## QAbstractItemModel
+    ########################################################################
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        parentItem = self.itemFromIndex(parent)
+        if 0 <= row < len(parentItem._children):
+            return self.createIndex(row, column, parentItem._children[row])
+        return QtCore.QModelIndex()
+
+    def parent(self, index):
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        return self.indexFromItem(index.internalPointer()._parent)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.itemFromIndex(parent)._children)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(self.headers)
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        item = self.itemFromIndex(parent)
+        return bool(item._children) or item.canFetch()
+
+    def canFetchMore(self, parent):
+        return self.itemFromIndex(parent).canFetch()
+
+    def fetchMore(self, parent):
+        self.itemFromIndex(parent).fetch()
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = index.internalPointer()
+        column = index.column()
+        if role == QtCore.Qt.DisplayRole:
+            return item.texts.get(column)
+        elif role == QtCore.Qt.ForegroundRole:
+            return item.foregrounds.get(column)
+        elif role == QtCore.Qt.BackgroundRole:
+            return item.backgrounds.get(column)
+        elif role == QtCore.Qt.FontRole:
+            return item.fonts.get(column)
+        elif role == QtCore.Qt.ToolTipRole:
+            return item.toolTips.get(column)
+        elif role == QtCore.Qt.CheckStateRole:
+            return item.checkStates.get(column)
+        return None
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        if index.isValid() and role == QtCore.Qt.CheckStateRole:
+            index.internalPointer().setCheckState(index.column(), QtCore.Qt.CheckState(value))
+            return True
+        return False
+
+    def flags(self, index):
+        if not index.isValid():
+            return QtCore.Qt.NoItemFlags
+        return index.internalPointer().flags
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole and section < len(self.headers):
+            return self.headers[section]
+        return None
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        '''
+        Sorts everything that exists now, lazily fetched children are sorted as they come in
+        '''
+        self.sortColumn = column
+        self.sortOrder = order
+        self.layoutAboutToBeChanged.emit()
+        oldIndexes = self.persistentIndexList()
+        oldItems = [(index.internalPointer(), index.column()) for index in oldIndexes]
+        self.root.sortChildren(column, order)
+        self.changePersistentIndexList(oldIndexes, [self.indexFromItem(item, col) for item, col in oldItems])
+        self.layoutChanged.emit()